@@ -1,45 +1,211 @@
 import requests
 import os
+import io
 import csv
+import json
+import sys
+import time
+import argparse
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from PIL import Image
+
+try:
+    # Shared pipeline helpers, importable when run through `python -m marketmap` (see marketmap/cli.py)
+    from marketmap.profiling import add_profile_argument, profiled
+except ImportError:
+    def add_profile_argument(parser):
+        parser.add_argument("--profile", nargs="?", const="", default=None, metavar="RUN_DIR",
+                            help="Unavailable: run through `python -m marketmap` to profile")
+
+    def profiled(stage, profile=None):
+        if profile is not None:
+            print(f"--profile ignored for {stage}: marketmap is not importable, run through `python -m marketmap`",
+                  file=sys.stderr)
+        return nullcontext()
 
-load_dotenv()
-LOGO_DEV_PUBLIC_KEY = os.getenv('LOGO_DEV_PUBLIC_KEY')
 save_to = "./images/{ticker}.png"
+svg_save_to = "./images/{ticker}.svg"  # Pillow cannot rasterize SVG, so those logos keep their format
+MANIFEST_PATH = "./logo_manifest.json"
+CSV_PATH = "../cleaned/Company-info.csv"
+
+MAX_WORKERS = 8          # concurrent downloads
+MAX_AGE_HOURS = 24       # skip the request entirely if checked more recently
+REQUEST_TIMEOUT = 20     # seconds
+
+# Leading bytes of the image formats logo.dev may return
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+IMAGE_SIGNATURES = (
+    PNG_SIGNATURE,
+    b"\xff\xd8\xff",            # JPEG
+    b"GIF87a",
+    b"GIF89a",
+)
+
+
+def make_session(pool_size=MAX_WORKERS):
+    """Session with a keep-alive connection pool shared by all workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=2)
+    session.mount("https://", adapter)
+    return session
+
+
+def is_image(content):
+    if content.startswith(IMAGE_SIGNATURES):
+        return True
+    # WebP: RIFF....WEBP
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return True
+    return is_svg(content)
+
+
+def is_svg(content):
+    return content.lstrip()[:5].lower() in (b"<svg ", b"<?xml")
+
+
+def to_png(content):
+    """
+    PNG bytes for a downloaded logo (JPEG, GIF and WebP are converted, the
+    first frame of an animation is kept). None for SVG.
+    """
+    if content.startswith(PNG_SIGNATURE):
+        return content
+    if is_svg(content):
+        return None
+    with Image.open(io.BytesIO(content)) as image:
+        image.seek(0)
+        if image.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+            image = image.convert("RGBA")
+        out = io.BytesIO()
+        image.save(out, format="PNG")
+    return out.getvalue()
+
 
+def load_manifest(path=MANIFEST_PATH):
+    if os.path.isfile(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            pass  # rebuild from scratch
+    return {}
 
-def get_company_logo(ticker):
-    url = f"https://img.logo.dev/ticker/{ticker}?token={LOGO_DEV_PUBLIC_KEY}"
-    response = requests.get(url)
-    return response.content
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def atomic_write(path, content):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def get_company_logo(session, ticker, entry):
+    """
+    Conditionally fetch a logo. Returns (status, content, headers) where
+    status is 'not-modified' or 'downloaded'. Raises on errors.
+    """
+    url = f"https://img.logo.dev/ticker/{ticker}?token={os.getenv('LOGO_DEV_PUBLIC_KEY')}&format=png"
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304:
+        return "not-modified", None, response.headers
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}")
+    content_type = response.headers.get("Content-Type", "")
+    if not content_type.startswith("image/"):
+        raise RuntimeError(f"unexpected content type {content_type!r}")
+    if not is_image(response.content):
+        raise RuntimeError("response body is not a recognised image")
+    return "downloaded", response.content, response.headers
+
+
+def refresh_logo(session, ticker, entry, max_age_hours, force=False):
+    """
+    Download one logo if needed. Returns (ticker, status, new manifest entry);
+    status is 'svg' for a logo only available as SVG.
+    """
+    output_path = save_to.format(ticker=ticker)
+    svg_path = svg_save_to.format(ticker=ticker)
+    have_file = os.path.isfile(output_path) or os.path.isfile(svg_path)
+    if not have_file or force:
+        entry = {}
+    elif time.time() - entry.get("checked_at", 0) < max_age_hours * 3600:
+        return ticker, "fresh", entry
+
+    status, content, headers = get_company_logo(session, ticker, entry)
+    entry = dict(entry, checked_at=time.time())
+    if status == "downloaded":
+        png = to_png(content)
+        if png is None:
+            atomic_write(svg_path, content)
+            status = "svg"
+        else:
+            atomic_write(output_path, png)
+            if os.path.isfile(svg_path):
+                os.remove(svg_path)
+        entry["etag"] = headers.get("ETag")
+        entry["last_modified"] = headers.get("Last-Modified")
+    return ticker, status, entry
 
 
 def main():
-    # Create images directory if it doesn't exist
-    os.makedirs("./images", exist_ok=True)
-    
-    # Read the CSV file
-    csv_path = "../cleaned/Company-info.csv"
-    with open(csv_path, 'r') as csvfile:
-        reader = csv.DictReader(csvfile)
-        
-        for row in reader:
-            ticker = row['Ticker']
-            print(f"Downloading logo for {ticker}...")
-            
-            try:
-                # Get the logo
-                logo_content = get_company_logo(ticker)
-                
-                # Save to file
-                output_path = save_to.format(ticker=ticker)
-                with open(output_path, 'wb') as img_file:
-                    img_file.write(logo_content)
-                    
-                print(f"  ✓ Saved {ticker} logo to {output_path}")
-            except Exception as e:
-                print(f"  ✗ Error downloading {ticker}: {e}")
+    parser = argparse.ArgumentParser(description="Download company logos from logo.dev")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Concurrent downloads")
+    parser.add_argument("--max-age", type=float, default=MAX_AGE_HOURS,
+                        help="Hours before a logo is re-checked with the server")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and re-download everything")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    load_dotenv()
+
+    with profiled("logos", args.profile):
+        # Create images directory if it doesn't exist
+        os.makedirs("./images", exist_ok=True)
+
+        # Read the CSV file
+        with open(CSV_PATH, 'r') as csvfile:
+            tickers = list(dict.fromkeys(row['Ticker'] for row in csv.DictReader(csvfile)))
+
+        manifest = load_manifest()
+        counts = {}
+        session = make_session(args.workers)
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = {
+                pool.submit(refresh_logo, session, ticker, manifest.get(ticker, {}), args.max_age, args.force): ticker
+                for ticker in tickers
+            }
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    _, status, entry = future.result()
+                    manifest[ticker] = entry
+                    if status == "downloaded":
+                        print(f"  ✓ Saved {ticker} logo to {save_to.format(ticker=ticker)}")
+                    elif status == "svg":
+                        print(f"  ! Saved {ticker} logo as {svg_save_to.format(ticker=ticker)}; "
+                              "the front end needs a PNG")
+                except Exception as e:
+                    status = "error"
+                    print(f"  ✗ Error downloading {ticker}: {e}")
+                counts[status] = counts.get(status, 0) + 1
+
+        save_manifest(manifest)
+        print(", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Aggregation stage run after consolidate_data.py.
+Precomputes the rollups the visualizations otherwise rebuild in the browser
+and writes them as compact, versioned JSON artifacts under cleaned/aggregates/:
+
+    role-company-pay   Ticker x Role Name pay stats      (slopeChart.js)
+    ticker-quarter     Ticker x quarter financials        (forest.js)
+    sector-role-pay    Sector x Role Name pay stats
+    sector-quarter     Sector x quarter financials
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from marketmap import frames
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+CLEANED_DIR = BASE_DIR.parent / "cleaned"
+OUTPUT_DIR = CLEANED_DIR / "aggregates"
+
+# Bump when the columns or meaning of any artifact change
+SCHEMA_VERSION = 1
+
+INFO_FILE = "Company-info.csv"
+SALARY_FILE = "Company-salary.csv"
+WEEKLY_FILE = "Company-financials-sentiment-weekly-snapshot.csv"
+BASE_QUARTER = "2022-Q1"  # forest.js normalizes close prices to this quarter
+
+PAY_COLS = {"Total Pay": "avg_pay", "Base Pay": "avg_base", "Stock": "avg_stock", "Bonus": "avg_bonus"}
+
+
+def source_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def valid_pay_rows(salary):
+    """
+    Rows with a positive Total Pay, as slopeChart.js filters them. Empty pay
+    components count as 0, matching `+d["Base Pay"]` on an empty string.
+    """
+    salary = salary.copy()
+    salary["Total Pay"] = pd.to_numeric(salary["Total Pay"], errors="coerce")
+    salary = salary[salary["Total Pay"] > 0]
+    for col in ["Base Pay", "Stock", "Bonus"]:
+        salary[col] = pd.to_numeric(salary[col], errors="coerce").fillna(0)
+    return salary
+
+
+def pay_stats(salary, keys):
+    grouped = salary.groupby(keys, sort=True)
+    stats = grouped[list(PAY_COLS)].mean().rename(columns=PAY_COLS)
+    stats["median_pay"] = grouped["Total Pay"].median()
+    stats["min_pay"] = grouped["Total Pay"].min()
+    stats["max_pay"] = grouped["Total Pay"].max()
+    stats["rows"] = grouped.size()
+    return stats.reset_index()
+
+
+def add_quarter(weekly):
+    """Quarter label in forest.js's dateToQuarter format, e.g. 2024-Q3."""
+    dates = pd.to_datetime(weekly["Date"])
+    weekly = weekly.copy()
+    weekly["Quarter"] = dates.dt.year.astype(str) + "-Q" + dates.dt.quarter.astype(str)
+    return weekly
+
+
+def ticker_quarter(weekly):
+    weekly = add_quarter(weekly)
+    weekly["sentiment_score"] = weekly["sentiment_score"].fillna(0)
+    grouped = weekly.groupby(["Ticker", "Quarter"], sort=True)
+    cube = grouped.agg(
+        avg_close=("Close", "mean"),
+        avg_market_cap=("Market Cap", "mean"),
+        avg_volume=("Volume", "mean"),
+        avg_sentiment=("sentiment_score", "mean"),
+        stock_splits=("Stock Splits", "sum"),
+        weeks=("Close", "size"),
+    ).reset_index()
+    base = cube.loc[cube["Quarter"] == BASE_QUARTER].set_index("Ticker")["avg_close"]
+    cube["norm_close"] = cube["avg_close"] / cube["Ticker"].map(base)
+    return cube
+
+
+def sector_quarter(weekly, info):
+    weekly = add_quarter(weekly).merge(info[["Ticker", "Sector"]], on="Ticker", how="inner")
+    weekly["sentiment_score"] = weekly["sentiment_score"].fillna(0)
+    grouped = weekly.groupby(["Sector", "Quarter"], sort=True)
+    cube = grouped.agg(
+        avg_market_cap=("Market Cap", "mean"),
+        avg_volume=("Volume", "mean"),
+        avg_sentiment=("sentiment_score", "mean"),
+        companies=("Ticker", "nunique"),
+    ).reset_index()
+    return cube
+
+
+def write_artifact(name, df, sources):
+    """
+    Write `df` column-oriented: {"version", "sources", "columns", "data"} where
+    data[i] is the list of values of columns[i]. Column-oriented JSON is much
+    smaller than a list of records and maps straight onto typed arrays.
+    """
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    df = df.round(4).astype(object).where(df.notna(), None)
+    payload = {
+        "version": SCHEMA_VERSION,
+        "sources": sources,
+        "columns": list(df.columns),
+        "data": [df[col].tolist() for col in df.columns],
+    }
+    path = OUTPUT_DIR / f"{name}.v{SCHEMA_VERSION}.json"
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    print(f"✓ Created {path.name} with {len(df)} rows")
+
+
+def main():
+    print("Building aggregate cubes...")
+    info = frames.read_csv(CLEANED_DIR / INFO_FILE)
+    salary = valid_pay_rows(frames.read_csv(CLEANED_DIR / SALARY_FILE))
+    weekly = frames.read_csv(CLEANED_DIR / WEEKLY_FILE)
+    sources = {f: source_hash(CLEANED_DIR / f) for f in (INFO_FILE, SALARY_FILE, WEEKLY_FILE)}
+
+    write_artifact("role-company-pay", pay_stats(salary, ["Ticker", "Role Name"]), sources)
+    sector_salary = salary.merge(info[["Ticker", "Sector"]], on="Ticker", how="inner")
+    write_artifact("sector-role-pay", pay_stats(sector_salary, ["Sector", "Role Name"]), sources)
+    write_artifact("ticker-quarter", ticker_quarter(weekly), sources)
+    write_artifact("sector-quarter", sector_quarter(weekly, info), sources)
+
+
+if __name__ == "__main__":
+    main()
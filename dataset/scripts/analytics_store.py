@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Embedded analytics database of the consolidated MarketMap data.
+Loads the cleaned CSVs into one SQLite file with snake_case columns, indexes
+on ticker, role name and date, and views for the joins every consumer
+otherwise redoes by hand. A `median` aggregate is registered on connect.
+
+    python analytics_store.py build
+    python analytics_store.py pay-by-sector --role software-engineer
+    python analytics_store.py query "SELECT sector, COUNT(*) FROM company_info GROUP BY sector"
+"""
+
+import argparse
+import csv
+import os
+import re
+import sqlite3
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from marketmap import frames
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+CLEANED_DIR = BASE_DIR.parent / "cleaned"
+DB_FILE = CLEANED_DIR / "marketmap.sqlite"
+
+# table -> (source CSV, indexed columns)
+TABLES = {
+    "company_info": ("Company-info.csv", [("ticker",), ("sector",)]),
+    "company_financials": ("Company-financials.csv", [("ticker",)]),
+    "company_salary": ("Company-salary.csv", [("ticker",), ("role_name",), ("role_name", "ticker")]),
+    "company_benefits": ("Company-benefits.csv", [("ticker",)]),
+    "benefits_classified": ("benefits_classified.csv", [("ticker",), ("screen",)]),
+    "weekly_snapshot": ("Company-financials-sentiment-weekly-snapshot.csv", [("ticker", "date"), ("date",)]),
+}
+
+VIEWS = {
+    "company_overview": """
+        SELECT i.*, f.market_cap, f.total_revenue, f.net_profit_ttm, f.dividend_yield,
+               f.dividend_rate, f.trailing_pe, f.forward_pe
+        FROM company_info i LEFT JOIN company_financials f USING (ticker)
+    """,
+    "salary_by_company": """
+        SELECT s.*, i.name, i.sector, i.industry, i.state, i.country
+        FROM company_salary s JOIN company_info i USING (ticker)
+    """,
+    "benefits_by_company": """
+        SELECT b.ticker, b.benefit_category, b.benefit_description, b.screen, b.iconname,
+               i.name, i.sector, i.industry
+        FROM benefits_classified b JOIN company_info i USING (ticker)
+    """,
+    "weekly_by_company": """
+        SELECT w.*, i.name, i.sector, i.industry
+        FROM weekly_snapshot w JOIN company_info i USING (ticker)
+    """,
+}
+
+# Named queries for the CLI; parameters are bound by name
+QUERIES = {
+    "pay-by-sector": (
+        """
+        SELECT sector, COUNT(*) AS rows, median(total_pay) AS median_pay, AVG(total_pay) AS avg_pay
+        FROM salary_by_company
+        WHERE role_name = :role AND total_pay > 0
+        GROUP BY sector ORDER BY median_pay DESC
+        """,
+        ["role"],
+    ),
+    "pay-by-company": (
+        """
+        SELECT ticker, name, COUNT(*) AS rows, median(total_pay) AS median_pay
+        FROM salary_by_company
+        WHERE role_name = :role AND total_pay > 0
+        GROUP BY ticker ORDER BY median_pay DESC
+        """,
+        ["role"],
+    ),
+    "benefits-by-screen": (
+        """
+        SELECT screen, COUNT(DISTINCT ticker) AS companies, COUNT(*) AS benefits
+        FROM benefits_classified WHERE screen IS NOT NULL
+        GROUP BY screen ORDER BY companies DESC
+        """,
+        [],
+    ),
+    "ticker-weeks": (
+        """
+        SELECT date, close, market_cap, volume, sentiment_score
+        FROM weekly_snapshot
+        WHERE ticker = :ticker AND date BETWEEN :start AND :end
+        ORDER BY date
+        """,
+        ["ticker", "start", "end"],
+    ),
+}
+
+
+class Median:
+    """SQLite aggregate: median of the non-NULL values."""
+
+    def __init__(self):
+        self.values = []
+
+    def step(self, value):
+        if value is not None:
+            self.values.append(value)
+
+    def finalize(self):
+        return statistics.median(self.values) if self.values else None
+
+
+def snake_case(name):
+    return re.sub(r"[^0-9a-z]+", "_", name.strip().lower()).strip("_")
+
+
+def connect(path=DB_FILE):
+    conn = sqlite3.connect(path)
+    conn.create_aggregate("median", 1, Median)
+    return conn
+
+
+def build_store(cleaned_dir=CLEANED_DIR, db_path=DB_FILE, fallback_dir=None):
+    """
+    (Re)build the database from the CSVs in `cleaned_dir`. Sources it does
+    not hold are read from `fallback_dir` if given (e.g. the classifier's
+    output in cleaned/ when consolidating elsewhere); sources found in
+    neither are skipped, along with the views that need them. The file is
+    built under a temporary name and swapped in, so readers never see it
+    half-built.
+    """
+    cleaned_dir, db_path = Path(cleaned_dir), Path(db_path)
+    source_dirs = [cleaned_dir] + ([Path(fallback_dir)] if fallback_dir is not None else [])
+    tmp_path = db_path.with_suffix(".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    conn = connect(tmp_path)
+    loaded = set()
+    with conn:
+        for table, (source, indexes) in TABLES.items():
+            path = next((d / source for d in source_dirs if (d / source).is_file()), None)
+            if path is None:
+                print(f"  Skipping {table}: {source} not found")
+                continue
+            df = frames.read_csv(path)
+            df.columns = [snake_case(c) for c in df.columns]
+            df.to_sql(table, conn, index=False)
+            for columns in indexes:
+                conn.execute(f"CREATE INDEX idx_{table}_{'_'.join(columns)} ON {table} ({', '.join(columns)})")
+            loaded.add(table)
+            print(f"  {table}: {len(df)} rows" + (f" (from {path.parent})" if path.parent != cleaned_dir else ""))
+        for view, sql in VIEWS.items():
+            needed = set(re.findall(r"\b(?:FROM|JOIN) (\w+)", sql))
+            if needed <= loaded:
+                conn.execute(f"CREATE VIEW {view} AS {sql}")
+    conn.execute("ANALYZE")
+    conn.close()
+    os.replace(tmp_path, db_path)
+    print(f"✓ Created {db_path.name} with {len(loaded)} tables")
+
+
+def run_query(sql, params=(), db_path=DB_FILE, out=sys.stdout):
+    """Run a query and write the result as CSV. Returns (row count, seconds)."""
+    conn = connect(db_path)
+    start = time.perf_counter()
+    cur = conn.execute(sql, params)
+    rows = cur.fetchall()
+    elapsed = time.perf_counter() - start
+    writer = csv.writer(out)
+    writer.writerow([d[0] for d in cur.description])
+    writer.writerows(rows)
+    conn.close()
+    return len(rows), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the MarketMap analytics database")
+    parser.add_argument("--db", type=Path, default=DB_FILE, help="Database file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Load the cleaned CSVs into the database")
+    build.add_argument("--cleaned-dir", type=Path, default=CLEANED_DIR)
+
+    query = sub.add_parser("query", help="Run an SQL query and print CSV")
+    query.add_argument("sql")
+    for name, (_, params) in QUERIES.items():
+        named = sub.add_parser(name, help="Named query")
+        for param in params:
+            named.add_argument(f"--{param}", required=True)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_store(args.cleaned_dir, args.db)
+        return
+    if not args.db.is_file():
+        raise SystemExit(f"{args.db} not found: run `analytics_store.py build` first")
+    if args.command == "query":
+        sql, params = args.sql, ()
+    else:
+        sql, names = QUERIES[args.command]
+        params = {name: getattr(args, name) for name in names}
+    rows, elapsed = run_query(sql, params, args.db)
+    print(f"({rows} rows in {elapsed * 1000:.1f} ms)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
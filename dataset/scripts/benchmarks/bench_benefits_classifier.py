@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark for benefits_classifier.classify on a synthetic benefits table.
+Rows are sampled from the real Company-benefits.csv with random tickers, so the
+keyword mix matches production while the table size is configurable.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from benefits_classifier import classify  # noqa: E402
+
+BENEFITS_CSV = SCRIPTS_DIR.parent / "cleaned" / "Company-benefits.csv"
+
+
+def synthetic_benefits(n_rows, n_tickers=10_000, seed=0):
+    """Sample `n_rows` benefit rows spread over `n_tickers` synthetic tickers."""
+    source = pd.read_csv(BENEFITS_CSV)
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(source), n_rows)
+    df = source.iloc[picks].reset_index(drop=True)
+    df["Ticker"] = pd.Series(rng.integers(0, n_tickers, n_rows)).map("T{:05d}".format)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark benefit classification")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 3_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        df = synthetic_benefits(n_rows)
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            classify(df)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f"{n_rows:>10,} rows  best {best:7.2f}s  ({n_rows / best:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
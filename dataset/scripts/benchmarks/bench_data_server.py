@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for data_server.py.
+Starts the server in-process on a free port and hits it from concurrent
+keep-alive clients with a mix of filtered queries, a share of them
+conditional (If-None-Match), then reports requests/sec and latency percentiles.
+"""
+
+import argparse
+import http.client
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+import numpy as np
+import pandas as pd
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from data_server import CLEANED_DIR, make_server  # noqa: E402
+
+
+def request_mix(seed=0, size=500):
+    """Representative front-end requests: per-ticker, per-role, per-sector slices."""
+    info = pd.read_csv(CLEANED_DIR / "Company-info.csv")
+    roles = pd.read_csv(CLEANED_DIR / "Company-salary.csv")["Role Name"].dropna().value_counts().index[:20]
+    tickers, sectors = list(info["Ticker"]), list(info["Sector"].dropna().unique())
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(size):
+        kind = rng.random()
+        if kind < 0.3:
+            paths.append(f"/api/salary?ticker={rng.choice(tickers)}")
+        elif kind < 0.5:
+            paths.append("/api/salary?" + urlencode({"role": rng.choice(roles), "sector": rng.choice(sectors)}))
+        elif kind < 0.75:
+            year = rng.choice([2022, 2023, 2024, 2025])
+            paths.append(f"/api/weekly?ticker={rng.choice(tickers)}&start={year}-01-01&end={year}-12-31")
+        elif kind < 0.9:
+            paths.append(f"/api/benefits?ticker={rng.choice(tickers)}")
+        else:
+            paths.append("/api/info?" + urlencode({"sector": rng.choice(sectors)}))
+    return paths
+
+
+def client(port, paths, conditional, deadline, latencies, seed):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    etags = {}
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        headers = {"Accept-Encoding": "gzip"}
+        if path in etags and rng.random() < conditional:
+            headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status == 200:
+            etags[path] = response.getheader("ETag")
+    conn.close()
+
+
+def run(port, paths, clients, duration, conditional):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=client, args=(port, paths, conditional, deadline, latencies, i))
+        for i in range(clients)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local data API under concurrent load")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per client count")
+    parser.add_argument("--conditional", type=float, default=0.5,
+                        help="Share of repeat requests sent with If-None-Match")
+    args = parser.parse_args()
+
+    server = make_server(port=0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    paths = request_mix()
+
+    for clients in args.clients:
+        latencies = run(port, paths, clients, args.duration, args.conditional)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f"{clients:>4} clients  {len(latencies) / args.duration:8,.0f} req/s  "
+              f"p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark for the levels.fyi and consolidation stages.
+For each scale, generates a synthetic input tree (synthetic_data.py), then
+runs every stage as its own process on it, the way it runs in production:
+
+    parse              levels-scraping/parse_data.py
+    consolidate        consolidate_data.py
+    classify           benefits_classifier.py --no-cache
+    sentiment-rollups  sentiment_rollups.py --full
+    stream-pipeline    stream_pipeline.py --no-scrape (parse + normalize + classify)
+
+Wall time, rows/sec and peak RSS per stage are printed and written as JSON
+(benchmarks/results/pipeline-<commit>.json by default) so runs on different
+commits can be compared with --compare.
+
+    python bench_pipeline.py --companies 100 1000 10000
+    python bench_pipeline.py --compare results/pipeline-abc1234.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from synthetic_data import generate
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+RESULTS_VERSION = 1
+STAGES = ["parse", "consolidate", "classify", "sentiment-rollups", "stream-pipeline"]
+
+# Runs a stage script as __main__ and writes its own peak RSS (VmHWM) on exit.
+# The child's rusage ru_maxrss is no good here: Linux carries the parent's
+# high-water mark across fork+exec, so every stage would report at least the
+# memory of this (pandas-loaded) benchmark process.
+RUNNER = """
+import atexit, os, runpy, sys
+rss_path, script = sys.argv[1], sys.argv[2]
+sys.argv = sys.argv[2:]
+sys.path[0] = os.path.dirname(os.path.abspath(script))
+def report():
+    with open('/proc/self/status') as f:
+        kib = next(line.split()[1] for line in f if line.startswith('VmHWM:'))
+    with open(rss_path, 'w') as f:
+        f.write(kib)
+atexit.register(report)
+runpy.run_path(script, run_name='__main__')
+"""
+
+
+def stage_commands(gen_dir, work_dir):
+    """stage -> (argv relative to dataset/scripts, function returning the rows processed)."""
+    levels, cleaned, stream = work_dir / "levels", work_dir / "cleaned", work_dir / "stream"
+    for path in (levels, cleaned, stream):
+        path.mkdir(parents=True, exist_ok=True)
+    company_csv = gen_dir / "levels" / "nasdaq_100_levels.csv"
+
+    def parsed_rows():
+        return count_rows(levels / "salaries.csv") + count_rows(levels / "benefits.csv")
+
+    return {
+        "parse": (["levels-scraping/parse_data.py", gen_dir / "levels" / "data",
+                   "--company-csv", company_csv, "--output-dir", levels], parsed_rows),
+        "consolidate": (["consolidate_data.py", "--source-dir", gen_dir / "source",
+                         "--levels-dir", levels, "--output-dir", cleaned], parsed_rows),
+        "classify": (["benefits_classifier.py", "--input", cleaned / "Company-benefits.csv",
+                      "--output", cleaned / "benefits_classified.csv", "--no-cache"],
+                     lambda: count_rows(cleaned / "Company-benefits.csv")),
+        "sentiment-rollups": (["sentiment_rollups.py", "--full", "--weekly-dir", gen_dir / "weekly-sentiment",
+                               "--output-dir", cleaned],
+                              lambda: count_rows(cleaned / "combined_sentiment.csv")),
+        "stream-pipeline": (["stream_pipeline.py", "--no-scrape", "--levels-csv", company_csv,
+                             "--data-dir", gen_dir / "levels" / "data", "--output-dir", stream,
+                             "--cache", work_dir / "keywords.json"],
+                            lambda: count_rows(stream / "Company-salary.csv") + count_rows(stream / "Company-benefits.csv")),
+    }
+
+
+def count_rows(path):
+    return len(pd.read_csv(path, usecols=[0]))
+
+
+def run_stage(argv, log_path):
+    """Run one stage to completion; returns (exit code, seconds, peak RSS in MiB)."""
+    rss_path = log_path.with_suffix(".rss")
+    cmd = [sys.executable, "-c", RUNNER, str(rss_path)] + [str(arg) for arg in argv]
+    with open(log_path, "w") as log:
+        start = time.perf_counter()
+        code = subprocess.run(cmd, cwd=SCRIPTS_DIR, stdout=log, stderr=subprocess.STDOUT).returncode
+        elapsed = time.perf_counter() - start
+    rss = int(rss_path.read_text()) / 1024 if rss_path.is_file() else float("nan")
+    return code, elapsed, rss
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPTS_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_scale(n_companies, base_dir, stages, seed=0):
+    gen_dir, work_dir = base_dir / f"synthetic-{n_companies}", base_dir / f"work-{n_companies}"
+    start = time.perf_counter()
+    counts = generate(gen_dir, n_companies, seed)
+    print(f"\n{n_companies:,} companies: {counts['salary_rows']:,} salary rows, {counts['benefit_rows']:,} benefits, "
+          f"{counts['weekly_rows']:,} ticker-weeks (generated in {time.perf_counter() - start:.1f}s)")
+
+    results = []
+    commands = stage_commands(gen_dir, work_dir)
+    for stage in stages:
+        argv, rows_fn = commands[stage]
+        code, seconds, rss = run_stage(argv, work_dir / f"{stage}.log")
+        if code != 0:
+            last_line = (work_dir / f"{stage}.log").read_text().strip().splitlines()[-1:] or [""]
+            print(f"  {stage:<18} FAILED (exit {code}): {last_line[0]}")
+            results.append({"companies": n_companies, "stage": stage, "exit_code": code})
+            continue
+        rows = rows_fn()
+        result = {"companies": n_companies, "stage": stage, "rows": rows, "seconds": round(seconds, 3),
+                  "rows_per_sec": round(rows / seconds, 1), "peak_rss_mb": round(rss, 1), "exit_code": 0}
+        results.append(result)
+        print(f"  {stage:<18} {seconds:8.2f}s  {rows:>10,} rows  {result['rows_per_sec']:>12,.0f} rows/s  "
+              f"{rss:8.1f} MiB peak RSS")
+    return results
+
+
+def compare(results, previous_path):
+    previous = json.loads(Path(previous_path).read_text())
+    before = {(r["companies"], r["stage"]): r for r in previous["results"] if r.get("exit_code") == 0}
+    print(f"\nvs {previous.get('commit')} ({previous_path}):")
+    for r in results:
+        old = before.get((r["companies"], r["stage"]))
+        if r.get("exit_code") != 0 or old is None:
+            continue
+        print(f"  {r['companies']:>7,} {r['stage']:<18} {r['rows_per_sec'] / old['rows_per_sec']:6.2f}x rows/s  "
+              f"{r['peak_rss_mb'] - old['peak_rss_mb']:+8.1f} MiB peak RSS")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic inputs")
+    parser.add_argument("--companies", type=int, nargs="+", default=[100, 1_000])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="Stages to run; each reads the outputs of the ones before it")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", type=Path, default=None, help="Keep generated inputs and outputs here")
+    parser.add_argument("--output", type=Path, default=None, help="Results JSON (default: results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as tmp:
+        base_dir = args.work_dir or Path(tmp)
+        results = [r for n in args.companies for r in bench_scale(n, base_dir, args.stages, args.seed)]
+
+    commit = git_commit()
+    report = {
+        "version": RESULTS_VERSION,
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"pipeline-{commit or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n✓ Created {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Synthetic scale-out inputs for the levels.fyi and consolidation pipeline.
+Each synthetic company copies a real company as its template: its roles,
+whether each role page had a full table, a median box or only a salary
+range, its pay levels (jittered) and its benefits, plus its snapshot and
+glassdoor rows. Any number of companies therefore keeps the real data's mix
+of shapes while the volume grows.
+
+Layout under the output directory:
+    levels/nasdaq_100_levels.csv                      company list (parse_data.py --company-csv)
+    levels/data/<company>/<role>/<role>.csv           as written by main.py
+    levels/data/<company>/benefits.csv
+    source/nasdaq100_snapshot.csv, glassdoorData.csv  (consolidate_data.py --source-dir)
+    weekly-sentiment/nasdaq100_weekly_s<year>.csv     (sentiment_rollups.py --weekly-dir)
+
+    python synthetic_data.py /tmp/synthetic --companies 10000
+"""
+
+import argparse
+import csv
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+RAW_DIR = SCRIPTS_DIR.parent / "raw-data"
+
+WEEKS_START = "2022-01-03"
+WEEKS = 195  # through September 2025, like the real backfill
+
+TABLE_HEADER = ["Level Name", "Total", "Base", "Stock (/yr)", "Bonus"]
+MEDIAN_HEADER = ["Total per year", "Base", "Stock (/yr)", "Bonus", "Years at company", "Years experience", "Level"]
+RANGE_HEADER = ["Lower Bound", "Upper Bound"]
+PAY_COLS = ["total pay (USD)", "base pay (USD)", "stock (USD)", "bonus (USD)"]
+
+
+def usd(value):
+    """Format pay the way levels.fyi shows it ($185K, $1.2M, --)."""
+    if value is None or np.isnan(value):
+        return "--"
+    if value >= 1_000_000:
+        return f"${value / 1_000_000:.1f}M"
+    if value >= 1_000:
+        return f"${value / 1_000:.0f}K"
+    return f"${value:.0f}"
+
+
+def load_templates():
+    """Per real company: (name, roles {role: (variant, rows)}, benefits frame)."""
+    salaries = pd.read_csv(RAW_DIR / "salaries.csv")
+    benefits = pd.read_csv(RAW_DIR / "benefits.csv")
+    templates = []
+    for company, rows in salaries.groupby("company name", sort=False):
+        roles = {}
+        for role, role_rows in rows.groupby("role name", sort=False):
+            if role_rows["lower bound (USD)"].notna().any():
+                variant = "range"
+            elif role_rows["role rank"].isna().all():
+                variant = "median"
+            else:
+                variant = "table"
+            roles[role] = (variant, role_rows)
+        templates.append((company, roles, benefits[benefits["company name"] == company]))
+    return templates
+
+
+def text(value):
+    return "" if pd.isna(value) else value
+
+
+def write_role(path, variant, rows, scale):
+    pay = rows[PAY_COLS].to_numpy(dtype=float) * scale
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if variant == "table":
+            writer.writerow(TABLE_HEADER)
+            for level, row_pay in zip(rows["role level"], pay):
+                writer.writerow([text(level)] + [usd(v) for v in row_pay])
+        elif variant == "median":
+            first = rows.iloc[0]
+            writer.writerow(MEDIAN_HEADER)
+            writer.writerow([usd(v) for v in pay[0]] + [text(first["years at company"]),
+                                                        text(first["years of experience"]), text(first["role level"])])
+        else:
+            first = rows.iloc[0]
+            writer.writerow(RANGE_HEADER)
+            writer.writerow([usd(first["lower bound (USD)"] * scale), usd(first["upper bound (USD)"] * scale)])
+
+
+def write_scrape_tree(levels_dir, companies, templates, rng):
+    """data/<company>/... for every company; returns (role files, benefit rows)."""
+    data_dir = levels_dir / "data"
+    role_files = benefit_rows = 0
+    for (name, slug, _), template in zip(companies, templates):
+        _, roles, benefits = template
+        company_dir = data_dir / slug
+        scale = rng.lognormal(0, 0.15)
+        for role, (variant, rows) in roles.items():
+            os.makedirs(company_dir / role, exist_ok=True)
+            write_role(company_dir / role / f"{role}.csv", variant, rows, scale)
+            role_files += 1
+        os.makedirs(company_dir, exist_ok=True)
+        out = benefits[["benefit category", "benefit"]].rename(columns={"benefit category": "benefit_category"})
+        out["benefit_category"] = out["benefit_category"].str.replace(r"^Unique To .*", f"Unique To {name}", regex=True)
+        out.to_csv(company_dir / "benefits.csv", index=False)
+        benefit_rows += len(out)
+    return role_files, benefit_rows
+
+
+def write_sources(source_dir, companies, picks, rng):
+    """Snapshot and glassdoor rows copied from the template companies."""
+    snapshot = pd.read_csv(RAW_DIR / "nasdaq100_snapshot.csv")
+    glassdoor = pd.read_csv(RAW_DIR / "glassdoorData.csv")
+    tickers = [ticker for _, _, ticker in companies]
+    names = [name for name, _, _ in companies]
+
+    snap = snapshot.iloc[picks % len(snapshot)].reset_index(drop=True)
+    snap["Ticker"], snap["Company"] = tickers, names
+    for col in ["Market Cap", "Total Revenue", "Net Profit (TTM)", "Full-Time Employees"]:
+        snap[col] = (snap[col] * rng.lognormal(0, 0.3, len(snap))).round()
+    snap.to_csv(source_dir / "nasdaq100_snapshot.csv", index=False)
+
+    glass = glassdoor.iloc[picks % len(glassdoor)].reset_index(drop=True)
+    glass["Symbol"], glass["Company"] = tickers, names
+    glass.to_csv(source_dir / "glassdoorData.csv", index=False)
+
+
+def write_weekly_sentiment(weekly_dir, tickers, rng, weeks=WEEKS):
+    """One row per ticker-week, split into yearly files like the real backfill."""
+    starts = pd.date_range(WEEKS_START, periods=weeks, freq="7D")
+    ticker_col = np.repeat(np.asarray(tickers, dtype=object), weeks)
+    start_col = np.tile(starts, len(tickers))
+    # Each ticker drifts around its own mean, so rollups have something to average
+    base = rng.uniform(-0.2, 0.6, len(tickers))
+    score = np.clip(np.repeat(base, weeks) + rng.normal(0, 0.25, len(ticker_col)), -1, 1).round(4)
+    weekly = pd.DataFrame({
+        "ticker": ticker_col,
+        "start_date": start_col,
+        "end_date": start_col + pd.Timedelta(days=6),
+        "sentiment_score": score,
+    })
+    for year, rows in weekly.groupby(weekly["start_date"].dt.year):
+        out = rows.assign(start_date=rows["start_date"].dt.strftime("%Y-%m-%d"),
+                          end_date=rows["end_date"].dt.strftime("%Y-%m-%d"))
+        out.to_csv(weekly_dir / f"nasdaq100_weekly_s{year}.csv", index=False)
+    return len(weekly)
+
+
+def generate(out_dir, n_companies, seed=0, weeks=WEEKS):
+    """Write every synthetic input under `out_dir`; returns row/file counts."""
+    out_dir = Path(out_dir)
+    levels_dir, source_dir, weekly_dir = out_dir / "levels", out_dir / "source", out_dir / "weekly-sentiment"
+    for path in (levels_dir, source_dir, weekly_dir):
+        path.mkdir(parents=True, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    templates = load_templates()
+    picks = rng.integers(0, len(templates), n_companies)
+    chosen = [templates[i] for i in picks]
+    companies = []
+    for i, (company, _, _) in enumerate(chosen):
+        name = f"{company} {i:05d}"
+        companies.append((name, name.lower().replace(" ", "-"), f"S{i:05d}"))
+
+    with open(levels_dir / "nasdaq_100_levels.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Company Name", "Stock Ticker", "country", "exists-on-levels", "scraped", "skip"])
+        writer.writerows([name, ticker, "United States", "true", "true", "false"] for name, _, ticker in companies)
+
+    role_files, benefit_rows = write_scrape_tree(levels_dir, companies, chosen, rng)
+    write_sources(source_dir, companies, picks, rng)
+    weekly_rows = write_weekly_sentiment(weekly_dir, [t for *_, t in companies], rng, weeks)
+    return {
+        "companies": n_companies,
+        "role_files": role_files,
+        "salary_rows": sum(len(rows) for _, roles, _ in chosen for _, rows in roles.values()),
+        "benefit_rows": benefit_rows,
+        "weekly_rows": weekly_rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic scrape trees and pipeline inputs")
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--companies", type=int, default=1_000)
+    parser.add_argument("--weeks", type=int, default=WEEKS, help="Weekly sentiment rows per ticker")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    counts = generate(args.out_dir, args.companies, args.seed, args.weeks)
+    print(f"✓ Created {counts['companies']:,} companies: {counts['role_files']:,} role files, "
+          f"{counts['salary_rows']:,} salary rows, {counts['benefit_rows']:,} benefits, "
+          f"{counts['weekly_rows']:,} ticker-weeks in {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
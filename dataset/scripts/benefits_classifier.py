@@ -1,184 +1,262 @@
+"""
+Benefit classifier for the Benefits Visualization.
+Assigns each benefit row a Screen and IconName from an ordered rule table.
+
+Usage as a library:
+    from benefits_classifier import classify
+    classified = classify(benefits_df, cache_path=DEFAULT_CACHE)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
-df = pd.read_csv("../cleaned/Company-benefits.csv") 
+from marketmap import frames
+from marketmap.profiling import add_profile_argument, profiled
+
+BASE_DIR = Path(__file__).resolve().parent
+CLEANED_DIR = BASE_DIR.parent / "cleaned"
+DEFAULT_INPUT = CLEANED_DIR / "Company-benefits.csv"
+DEFAULT_OUTPUT = CLEANED_DIR / "benefits_classified.csv"
+DEFAULT_CACHE = BASE_DIR / ".cache" / "benefit_keywords.json"
+
+# Ordered rule table: the first rule that matches a row assigns its Screen.
+#   keywords   - row matches if its lowercased description contains any of these
+#   categories - row also matches if its Benefit Category is one of these
+#   icons      - ordered (IconName, keywords) pairs; first hit wins, else ""
+#   tier       - instead of icons, pick <tier>1..<tier>N from the number of
+#                rows of the same ticker that contain any of the keywords
+#   icon       - constant IconName
+RULES = [
+    # --- Insurance view ---
+    {
+        "screen": "insurance",
+        "keywords": ["insurance"],
+        "icons": [
+            ("life", ["life insurance"]),
+            ("vision", ["vision insurance"]),
+            ("health", ["health insurance"]),
+            ("dental", ["dental insurance"]),
+            ("disability", ["disability insurance"]),
+            ("PET INSURANCE", ["pet insurance"]),
+            ("business travel", ["business travel"]),
+            ("AD&D", ["ad&d", "accidental death and dismemberment"]),
+            ("insurance", ["insurance"]),
+        ],
+    },
+    # --- Transportation view ---
+    {
+        "screen": "transportation",
+        "keywords": ["transport", "transit", "shuttle", "bike"],
+        "categories": ["Transportation"],
+        "icons": [
+            ("shuttle", ["shuttle"]),
+            ("transit", ["transit"]),
+            ("bike", ["bike"]),
+            ("transport", ["transport"]),
+        ],
+    },
+    # --- Food view ---
+    {
+        "screen": "food",
+        "keywords": ["breakfast", "lunch", "dinner", "snack", "drink"],
+        "icons": [
+            ("breakfast", ["breakfast"]),
+            ("lunch", ["lunch"]),
+            ("dinner", ["dinner"]),
+            ("snack", ["snack"]),
+            ("drink", ["drink"]),
+        ],
+    },
+    # --- Office icons ---
+    {"screen": "office", "keywords": ["gym", "fitness"], "tier": ("gym", 3)},
+    {"screen": "office", "keywords": ["maternity", "fertility", "paternity", "mother", "adoption"], "tier": ("child", 3)},
+    {"screen": "office", "keywords": ["roth", "401k", "employee stock purchase program (espp)",
+                                      "flexible spending account (fsa)"], "tier": ("roth", 3)},
+    {"screen": "office", "keywords": ["phone"], "tier": ("phone", 2)},
+    {"screen": "office", "keywords": ["pet friendly workplace"], "icon": "pet friendly WORKPLACE"},
+    {"screen": "office", "keywords": ["tuition", "learning and development"], "icon": "tuition"},
+]
+
+# Changes whenever the rule table changes, invalidating cached keyword matches
+RULESET_VERSION = hashlib.sha1(json.dumps(RULES, sort_keys=True).encode()).hexdigest()[:12]
+
+UNIQUE_PREFIX = "Unique To"
+DEFAULT_SCREEN = "other"
+
+
+def compile_rules(rules=RULES):
+    """
+    Build one regex over every keyword in the rule table.
+
+    The pattern is a zero-width lookahead so that a match is reported at every
+    position. Keywords are tried longest first, so when several start at the
+    same position the one reported contains the others as a prefix; `implies`
+    maps each keyword to the bits of every keyword it contains, which restores
+    the full set of keywords present in a description.
+    """
+    keywords = []
+    for rule in rules:
+        groups = [rule["keywords"]] + [kws for _, kws in rule.get("icons", [])]
+        for kws in groups:
+            for kw in kws:
+                if kw not in keywords:
+                    keywords.append(kw)
+    if len(keywords) > 63:
+        raise ValueError("Rule table has more than 63 distinct keywords")
+
+    bit = {kw: np.int64(1) << np.int64(i) for i, kw in enumerate(keywords)}
+    implies = {kw: sum(b for other, b in bit.items() if other in kw) for kw in keywords}
+    alternation = "|".join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True))
+    return {
+        "pattern": re.compile(f"(?=({alternation}))"),
+        "bit": bit,
+        "implies": implies,
+    }
+
+
+COMPILED_RULES = compile_rules()
+
+
+def scan_keywords(descriptions, compiled=COMPILED_RULES):
+    """Scan each description once and return an int64 bitmask of keywords present."""
+    descriptions = pd.Series(descriptions, dtype=object).reset_index(drop=True)
+    hits = descriptions.str.findall(compiled["pattern"]).explode().dropna()
+    bits = np.zeros(len(descriptions), dtype=np.int64)
+    if len(hits):
+        row = hits.index.to_numpy()
+        np.bitwise_or.at(bits, row, hits.map(compiled["implies"]).to_numpy(dtype=np.int64))
+    return bits
+
+
+def load_cache(cache_path):
+    """Return {normalized description: keyword bits} for the current rule set."""
+    if cache_path is None or not os.path.isfile(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+    if data.get("version") != RULESET_VERSION:
+        return {}
+    return data.get("descriptions", {})
+
 
-def classify(df):
+def save_cache(cache_path, cache):
+    """Write the cache atomically so an interrupted run never leaves it corrupt."""
+    cache_path = Path(cache_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(cache_path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": RULESET_VERSION, "descriptions": cache}, f, sort_keys=True)
+    os.replace(tmp_path, cache_path)
+
+
+def keyword_bits(desc_lower, cache_path=None, compiled=COMPILED_RULES):
+    """
+    Keyword bitmask per row. Text matching runs once per distinct normalized
+    description that is not already in the on-disk cache, and the results are
+    broadcast back to every row sharing it.
+    """
+    # Keywords never start or end with whitespace, so stripping cannot change a match
+    normalized = desc_lower.fillna("").str.strip()
+    codes, uniques = pd.factorize(normalized)
+    cache = load_cache(cache_path)
+
+    unseen = [d for d in uniques if d not in cache]
+    if unseen:
+        cache.update(zip(unseen, scan_keywords(unseen, compiled).tolist()))
+        if cache_path is not None:
+            save_cache(cache_path, cache)
+
+    unique_bits = np.fromiter((cache[d] for d in uniques), dtype=np.int64, count=len(uniques))
+    return unique_bits[codes]
+
+
+def any_bits(keywords, compiled=COMPILED_RULES):
+    return np.int64(sum(compiled["bit"][kw] for kw in keywords))
+
+
+def tier_icons(mask, tickers, name, max_tier):
+    """<name>1..<name><max_tier> from the per-ticker count of matching rows."""
+    counts = pd.Series(mask, index=tickers.index).groupby(tickers).transform("sum")
+    tier = counts.clip(lower=1, upper=max_tier).astype(int).astype(str)
+    return (name + tier).to_numpy(dtype=object)
+
+
+def classify(df, cache_path=None, compiled=COMPILED_RULES):
+    """
+    Return a copy of `df` with desc_lower, cat_lower, Screen and IconName columns.
+    Pass `cache_path` to reuse keyword matches from previous runs; the per-ticker
+    count icons (gym/child/roth/phone tiers) are always recomputed.
+    """
     df = df.copy()
     df["desc_lower"] = df["Benefit Description"].str.lower()
     df["cat_lower"] = df["Benefit Category"].str.lower()
 
-    # --- helper ---
-    def contains_any(s, keywords):
-        s = s.lower()
-        return any(k in s for k in keywords)
+    bits = keyword_bits(df["desc_lower"], cache_path, compiled)
+    category = df["Benefit Category"]
 
-    # masks for counts
-    gym_keywords   = ["gym", "fitness"]
-    child_keywords = ["maternity", "fertility", "paternity", "mother", "adoption"]
-    roth_keywords  = ["roth", "401k", "employee stock purchase program (espp)", "flexible spending account (fsa)"]
-    phone_keywords = ["phone"]
+    screen = np.full(len(df), "", dtype=object)
+    icon = np.full(len(df), "", dtype=object)
 
-    gym_mask   = df["desc_lower"].apply(lambda x: contains_any(x, gym_keywords))
-    child_mask = df["desc_lower"].apply(lambda x: contains_any(x, child_keywords))
-    roth_mask  = df["desc_lower"].apply(lambda x: contains_any(x, roth_keywords))
-    phone_mask = df["desc_lower"].apply(lambda x: contains_any(x, phone_keywords))
+    # --- Unique section ---
+    unassigned = ~category.str.startswith(UNIQUE_PREFIX).to_numpy(dtype=bool)
+    screen[~unassigned] = "unique"
 
-    gym_count   = gym_mask.groupby(df["Ticker"]).sum().to_dict()
-    child_count = child_mask.groupby(df["Ticker"]).sum().to_dict()
-    roth_count  = roth_mask.groupby(df["Ticker"]).sum().to_dict()
-    phone_count = phone_mask.groupby(df["Ticker"]).sum().to_dict()
+    for rule in RULES:
+        matched = (bits & any_bits(rule["keywords"], compiled)) != 0
+        if rule.get("categories"):
+            matched |= category.isin(rule["categories"]).to_numpy()
 
-    df["Screen"]   = ""
-    df["IconName"] = ""
+        if "tier" in rule:
+            rule_icon = tier_icons(matched, df["Ticker"], *rule["tier"])
+        elif "icon" in rule:
+            rule_icon = rule["icon"]
+        else:
+            conds = [(bits & any_bits(kws, compiled)) != 0 for _, kws in rule["icons"]]
+            rule_icon = np.select(conds, [name for name, _ in rule["icons"]], default="").astype(object)
 
-    # --- Unique section ---
-    unique_mask = df["Benefit Category"].str.startswith("Unique To")
-    df.loc[unique_mask, "Screen"] = "unique"
+        take = matched & unassigned
+        screen[take] = rule["screen"]
+        icon[take] = rule_icon[take] if isinstance(rule_icon, np.ndarray) else rule_icon
+        unassigned &= ~take
 
-    non_unique = ~unique_mask
+    # --- Default: other ---
+    screen[unassigned] = DEFAULT_SCREEN
 
-    # helper to apply only where Screen still empty
-    def apply_where(condition, screen_val, icon_func):
-        mask = condition & non_unique & (df["Screen"] == "")
-        df.loc[mask, "Screen"] = screen_val
-        df.loc[mask, "IconName"] = df.loc[mask].apply(icon_func, axis=1)
+    df["Screen"] = screen
+    df["IconName"] = icon
+    return df
 
-    # --- Insurance view ---
-    def insurance_icon(row):
-        t = row["desc_lower"]
-        if "life insurance" in t:
-            return "life"
-        if "vision insurance" in t:
-            return "vision"
-        if "health insurance" in t:
-            return "health"
-        if "dental insurance" in t:
-            return "dental"
-        if "disability insurance" in t:
-            return "disability"
-        if "pet insurance" in t:
-            return "PET INSURANCE"
-        if "business travel" in t and "insurance" in t:
-            return "business travel"
-        if "ad&d" in t or "accidental death and dismemberment" in t:
-            return "AD&D"
-        if "auto and home insurance" in t or "auto & home insurance" in t or "personal accident insurance" in t or "accident insurance" in t:
-            return "insurance"
-        if "insurance" in t:
-            return "insurance"
-        return ""
-
-    ins_cond = non_unique & df["desc_lower"].str.contains("insurance")
-    apply_where(ins_cond, "insurance", insurance_icon)
 
-    # --- Transportation view ---
-    def transport_icon(row):
-        t = row["desc_lower"]
-        if "shuttle" in t:
-            return "shuttle"
-        if "transit" in t:
-            return "transit"
-        if "bike" in t:
-            return "bike"
-        if "transport" in t:
-            return "transport"
-        return ""
-
-    trans_cond = non_unique & (
-        (df["Benefit Category"] == "Transportation")
-        | df["desc_lower"].str.contains("transport")
-        | df["desc_lower"].str.contains("transit")
-        | df["desc_lower"].str.contains("shuttle")
-        | df["desc_lower"].str.contains("bike")
-    )
-    apply_where(trans_cond, "transportation", transport_icon)
+def classify_file(input_path=DEFAULT_INPUT, output_path=DEFAULT_OUTPUT, cache_path=DEFAULT_CACHE):
+    df = frames.read_csv(input_path)
+    classified = classify(df, cache_path=cache_path)
+    classified.to_csv(output_path, index=False)
+    return classified
 
-    # --- Food view ---
-    def food_icon(row):
-        t = row["desc_lower"]
-        if "breakfast" in t:
-            return "breakfast"
-        if "lunch" in t:
-            return "lunch"
-        if "dinner" in t:
-            return "dinner"
-        if "snack" in t:
-            return "snack"
-        if "drinks" in t or "drink" in t:
-            return "drink"
-        return ""
-
-    food_cond = non_unique & (
-        df["desc_lower"].str.contains("breakfast")
-        | df["desc_lower"].str.contains("lunch")
-        | df["desc_lower"].str.contains("dinner")
-        | df["desc_lower"].str.contains("snack")
-        | df["desc_lower"].str.contains("drinks")
-        | df["desc_lower"].str.contains("drink")
-    )
-    apply_where(food_cond, "food", food_icon)
-
-    # --- Office icons: gym ---
-    def gym_icon(row):
-        c = gym_count.get(row["Ticker"], 0)
-        if c <= 1:
-            return "gym1"
-        if c == 2:
-            return "gym2"
-        return "gym3"
-
-    gym_cond = non_unique & gym_mask
-    apply_where(gym_cond, "office", gym_icon)
-
-    # --- Office icons: child ---
-    def child_icon(row):
-        c = child_count.get(row["Ticker"], 0)
-        if c <= 1:
-            return "child1"
-        if c == 2:
-            return "child2"
-        return "child3"
-
-    child_cond = non_unique & child_mask
-    apply_where(child_cond, "office", child_icon)
-
-    # --- Office icons: roth / 401k / ESPP / FSA ---
-    def roth_icon(row):
-        c = roth_count.get(row["Ticker"], 0)
-        if c <= 1:
-            return "roth1"
-        if c == 2:
-            return "roth2"
-        return "roth3"
-
-    roth_cond = non_unique & roth_mask
-    apply_where(roth_cond, "office", roth_icon)
-
-    # --- Office icons: phone ---
-    def phone_icon(row):
-        c = phone_count.get(row["Ticker"], 0)
-        if c <= 1:
-            return "phone1"
-        return "phone2"
-
-    phone_cond = non_unique & phone_mask
-    apply_where(phone_cond, "office", phone_icon)
-
-    # --- Office icons: pet friendly workplace ---
-    pfw_cond = non_unique & df["desc_lower"].str.contains("pet friendly workplace")
-    apply_where(pfw_cond, "office", lambda r: "pet friendly WORKPLACE")
-
-    # --- Office icons: tuition / learning ---
-    tuition_cond = non_unique & (
-        df["desc_lower"].str.contains("tuition")
-        | df["desc_lower"].str.contains("learning and development")
-    )
-    apply_where(tuition_cond, "office", lambda r: "tuition")
 
-    # --- Default: other ---
-    df.loc[df["Screen"] == "", "Screen"] = "other"
+def main():
+    parser = argparse.ArgumentParser(description="Classify benefits into Screen / IconName for the benefits vis")
+    parser.add_argument("--input", type=Path, default=DEFAULT_INPUT, help="Company-benefits.csv to classify")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Where to write benefits_classified.csv")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE, help="Keyword match cache file")
+    parser.add_argument("--no-cache", action="store_true", help="Classify every description from scratch")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled("classify", args.profile):
+        classified = classify_file(args.input, args.output, None if args.no_cache else args.cache)
+    print(f"✓ Created {args.output.name} with {len(classified)} rows")
 
-    return df
 
-classified = classify(df)
-classified.to_csv("benefits_classified.csv", index=False)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Static data bundle build stage, run after consolidate_data.py.
+Copies each data artifact the site loads to a content-hashed name with
+precompressed gzip and brotli variants, and writes a manifest mapping
+logical names to the hashed files, so a deploy only invalidates caches of
+the files that actually changed. The map view reads the manifest when
+APP_CONFIG.dataManifest in index.html points at it.
+
+Outputs (under dataset/build/data/):
+    <name>.<hash>.<ext>        immutable copy, safe to serve with a long max-age
+    <name>.<hash>.<ext>.gz     gzip variant (for gzip_static and similar)
+    <name>.<hash>.<ext>.br     brotli variant, when the brotli module is installed
+    manifest.json              {"version", "files": {name: {"path", "source", "bytes", "gzip", "brotli"}}}
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # brotli variants are optional
+    brotli = None
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+DATASET_DIR = BASE_DIR.parent
+OUTPUT_DIR = DATASET_DIR / "build" / "data"
+MANIFEST_FILE = OUTPUT_DIR / "manifest.json"
+
+MANIFEST_VERSION = 1
+
+# logical name -> source, relative to dataset/
+ARTIFACTS = {
+    "info": "cleaned/Company-info.csv",
+    "salary": "cleaned/Company-salary.csv",
+    "financials": "cleaned/Company-financials.csv",
+    "prices": "raw-data/nasdaq100_yearly_prices.csv",
+    "benefits": "cleaned/Company-benefits.csv",
+    "weekly": "cleaned/Company-financials-sentiment-weekly-snapshot.csv",
+    "monthly-sentiment": "raw-data/nasdaq100_monthly_s2024.csv",
+}
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def write_atomic(path, data):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def build_artifact(name, source):
+    """
+    Write the hashed copy and its compressed variants unless they already
+    exist (same hash, same bytes). Returns the manifest entry.
+    """
+    data = source.read_bytes()
+    hashed = OUTPUT_DIR / f"{name}.{content_hash(data)}{source.suffix}"
+    entry = {"path": hashed.name, "source": source.relative_to(DATASET_DIR).as_posix(), "bytes": len(data)}
+
+    if not hashed.is_file():
+        write_atomic(hashed, data)
+    gz_path = hashed.with_name(hashed.name + ".gz")
+    if not gz_path.is_file():
+        # mtime=0 keeps the gzip bytes reproducible across builds
+        write_atomic(gz_path, gzip.compress(data, compresslevel=9, mtime=0))
+    entry["gzip"] = gz_path.stat().st_size
+
+    if brotli is not None:
+        br_path = hashed.with_name(hashed.name + ".br")
+        if not br_path.is_file():
+            write_atomic(br_path, brotli.compress(data, quality=11))
+        entry["brotli"] = br_path.stat().st_size
+    return entry
+
+
+def remove_stale(manifest):
+    """Delete hashed copies of artifacts no longer referenced by the manifest."""
+    current = {entry["path"] for entry in manifest["files"].values()}
+    removed = 0
+    for name in ARTIFACTS:
+        for path in OUTPUT_DIR.glob(f"{name}.*"):
+            base = path.name.removesuffix(".gz").removesuffix(".br")
+            if base not in current:
+                path.unlink()
+                removed += 1
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build content-hashed, precompressed data files and a manifest")
+    parser.add_argument("--keep-stale", action="store_true",
+                        help="Keep superseded hashed files (e.g. while an older deploy is still live)")
+    args = parser.parse_args()
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    if brotli is None:
+        print("  brotli not installed: writing gzip variants only")
+
+    manifest = {"version": MANIFEST_VERSION, "files": {}}
+    for name, source in ARTIFACTS.items():
+        path = DATASET_DIR / source
+        if not path.is_file():
+            print(f"  Skipping {name}: {source} not found")
+            continue
+        entry = build_artifact(name, path)
+        manifest["files"][name] = entry
+        print(f"  {name}: {entry['path']} ({entry['bytes']:,} B, gzip {entry['gzip']:,} B)")
+
+    write_atomic(MANIFEST_FILE, json.dumps(manifest, indent=2).encode())
+    removed = 0 if args.keep_stale else remove_stale(manifest)
+    print(f"✓ Created {MANIFEST_FILE.name} with {len(manifest['files'])} files ({removed} stale files removed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Image asset build stage for the MarketMap site.
+Resizes logos, benefit icons and building icons to the sizes the
+visualizations display, converts them to WebP and packs each family into a
+sprite atlas with a JSON coordinate manifest.
+
+Outputs (under dataset/build/images/):
+    <family>/<name>.webp           individual resized images
+    <family>.<hash>.webp           sprite atlas
+    <family>.json                  {"image": ..., "frames": {name: {x, y, w, h}}}
+
+SVG sources (most benefit icons) are rasterized with cairosvg; without it
+the build stops with the list of icons it could not render, rather than
+shipping an atlas that is missing them.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+try:
+    import cairosvg
+except ImportError:  # only needed to rasterize SVG sources
+    cairosvg = None
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+DATASET_DIR = BASE_DIR.parent
+OUTPUT_DIR = DATASET_DIR / "build" / "images"
+CACHE_FILE = BASE_DIR / ".cache" / "image_assets.json"
+
+# family -> source directory and the box (px) images are fitted into.
+# Boxes are 2x the largest on-screen size so they stay sharp on HiDPI screens.
+FAMILIES = {
+    "logos": {"source": DATASET_DIR / "logos" / "images", "box": 128},
+    "benefit-icons": {"source": DATASET_DIR / "Icons", "box": 256},
+    "building-icons": {"source": DATASET_DIR / "building-icons", "box": 128},
+}
+RASTER_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+SVG_SUFFIX = ".svg"
+WEBP_QUALITY = 85
+ATLAS_PADDING = 2
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_cache(path=CACHE_FILE):
+    if path.is_file():
+        try:
+            return json.loads(path.read_text())
+        except json.JSONDecodeError:
+            pass  # rebuild everything
+    return {}
+
+
+def save_cache(cache, path=CACHE_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(cache, indent=2, sort_keys=True))
+    os.replace(tmp_path, path)
+
+
+def fit(image, box):
+    """Convert to RGBA and downscale (never upscale) to fit a box x box square."""
+    image = image.convert("RGBA")
+    image.thumbnail((box, box), Image.LANCZOS)
+    return image
+
+
+def open_source(src, box):
+    """Open a source image; SVGs are rendered `box` px wide first."""
+    if src.suffix.lower() != SVG_SUFFIX:
+        return Image.open(src)
+    return Image.open(io.BytesIO(cairosvg.svg2png(url=str(src), output_width=box)))
+
+
+def save_webp(image, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    image.save(tmp_path, "WEBP", quality=WEBP_QUALITY, method=6)
+    os.replace(tmp_path, path)
+
+
+def build_images(family, spec, cache):
+    """
+    Resize every image of a family to WebP, reusing cached outputs whose
+    source content hash and size spec are unchanged.
+    Returns ({name: Image}, number of images rebuilt).
+    Exits if an SVG needs rendering and cairosvg is not installed.
+    """
+    out_dir = OUTPUT_DIR / family
+    images = {}
+    rebuilt = 0
+    unrendered = []
+    for src in sorted(spec["source"].iterdir()):
+        suffix = src.suffix.lower()
+        if suffix not in RASTER_SUFFIXES and suffix != SVG_SUFFIX:
+            continue
+        name = src.stem
+        out_path = out_dir / f"{name}.webp"
+        key = f"{family}/{src.name}"
+        digest = f"{file_hash(src)}:{spec['box']}:{WEBP_QUALITY}"
+        if cache.get(key) == digest and out_path.is_file():
+            images[name] = Image.open(out_path).convert("RGBA")
+            continue
+        if suffix == SVG_SUFFIX and cairosvg is None:
+            unrendered.append(src.name)
+            continue
+        with open_source(src, spec["box"]) as img:
+            images[name] = fit(img, spec["box"])
+        save_webp(images[name], out_path)
+        cache[key] = digest
+        rebuilt += 1
+    if unrendered:
+        sys.exit(f"✗ {family}: cannot rasterize {len(unrendered)} SVG images without cairosvg "
+                 f"(pip install cairosvg): {', '.join(unrendered)}")
+    print(f"  {family}: {len(images)} images ({rebuilt} rebuilt)")
+    return images, rebuilt
+
+
+def pack_atlas(images, padding=ATLAS_PADDING):
+    """
+    Shelf-pack images into one roughly square sheet.
+    Returns (atlas image, {name: {x, y, w, h}}).
+    """
+    if not images:
+        return None, {}
+    order = sorted(images, key=lambda n: (-images[n].height, n))
+    area = sum((img.width + padding) * (img.height + padding) for img in images.values())
+    sheet_width = max(max(img.width for img in images.values()) + padding, int(math.sqrt(area)) + 1)
+
+    frames = {}
+    x = y = shelf_height = 0
+    for name in order:
+        img = images[name]
+        if x + img.width > sheet_width:
+            x, y = 0, y + shelf_height + padding
+            shelf_height = 0
+        frames[name] = {"x": x, "y": y, "w": img.width, "h": img.height}
+        x += img.width + padding
+        shelf_height = max(shelf_height, img.height)
+
+    atlas = Image.new("RGBA", (sheet_width, y + shelf_height), (0, 0, 0, 0))
+    for name, frame in frames.items():
+        atlas.paste(images[name], (frame["x"], frame["y"]))
+    return atlas, dict(sorted(frames.items()))
+
+
+def atlas_is_current(family, images):
+    """True if the family's manifest lists exactly these images and its atlas exists."""
+    manifest_path = OUTPUT_DIR / f"{family}.json"
+    if not manifest_path.is_file():
+        return False
+    manifest = json.loads(manifest_path.read_text())
+    return set(manifest["frames"]) == set(images) and (OUTPUT_DIR / manifest["image"]).is_file()
+
+
+def write_atlas(family, images):
+    atlas, frames = pack_atlas(images)
+    if atlas is None:
+        return
+    tmp_path = OUTPUT_DIR / f"{family}.atlas.tmp"
+    atlas.save(tmp_path, "WEBP", quality=WEBP_QUALITY, method=6)
+    digest = file_hash(tmp_path)[:10]
+    atlas_name = f"{family}.{digest}.webp"
+    for stale in OUTPUT_DIR.glob(f"{family}.*.webp"):
+        if stale.name != atlas_name:
+            stale.unlink()
+    os.replace(tmp_path, OUTPUT_DIR / atlas_name)
+
+    manifest = {
+        "image": atlas_name,
+        "width": atlas.width,
+        "height": atlas.height,
+        "frames": frames,
+    }
+    manifest_path = OUTPUT_DIR / f"{family}.json"
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    print(f"✓ Created {atlas_name} ({atlas.width}x{atlas.height}, {len(frames)} frames)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resize, convert and atlas the site's images")
+    parser.add_argument("--family", choices=sorted(FAMILIES), action="append",
+                        help="Only build these families (default: all)")
+    parser.add_argument("--force", action="store_true", help="Ignore the cache and rebuild every image")
+    args = parser.parse_args()
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    cache = {} if args.force else load_cache()
+    print("Building image assets...")
+    try:
+        for family in args.family or FAMILIES:
+            images, rebuilt = build_images(family, FAMILIES[family], cache)
+            if rebuilt or not atlas_is_current(family, images):
+                write_atlas(family, images)
+    finally:
+        save_cache(cache)  # keep what was resized even if a family failed
+
+
+if __name__ == "__main__":
+    main()
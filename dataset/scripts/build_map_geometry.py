@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Map geometry build stage for mapvis.js.
+Converts the vendored us-atlas TopoJSON to ready-to-draw GeoJSON at several
+detail levels, so the page neither fetches us-atlas from unpkg nor runs
+topojson.feature / topojson.mesh on every load.
+
+Source (vendored; `--fetch` downloads it once, after that the stage runs offline):
+    dataset/vendor/us-atlas/states-10m.json   (https://unpkg.com/us-atlas@3/states-10m.json)
+
+Outputs (under dataset/build/geo/):
+    us-states.<level>.json   {"version", "source", "level", "abbr": {name: abbr},
+                              "states": FeatureCollection, "borders": MultiLineString}
+
+Commit the source and the outputs together. index.html points
+APP_CONFIG.stateGeometry at us-states.medium.json; mapvis.js only goes to
+unpkg if that bundle fails to load.
+
+    python build_map_geometry.py --fetch
+
+Arcs are simplified before features are assembled, so neighbouring states
+keep sharing exactly the same border points at every level.
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import os
+import urllib.request
+from pathlib import Path
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+DATASET_DIR = BASE_DIR.parent
+SOURCE_FILE = DATASET_DIR / "vendor" / "us-atlas" / "states-10m.json"
+SOURCE_URL = "https://unpkg.com/us-atlas@3/states-10m.json"
+OUTPUT_DIR = DATASET_DIR / "build" / "geo"
+
+SCHEMA_VERSION = 1
+
+# level -> share of arc points kept (by Visvalingam weight) and coordinate decimals
+LEVELS = {
+    "high": {"retain": 1.0, "decimals": 4},
+    "medium": {"retain": 0.2, "decimals": 3},
+    "low": {"retain": 0.04, "decimals": 2},
+}
+
+# Previously hard-coded as stateNameToAbbr in mapvis.js
+STATE_ABBR = {
+    "Alabama": "AL", "Alaska": "AK", "Arizona": "AZ", "Arkansas": "AR", "California": "CA", "Colorado": "CO",
+    "Connecticut": "CT", "Delaware": "DE", "District of Columbia": "DC", "Florida": "FL", "Georgia": "GA",
+    "Hawaii": "HI", "Idaho": "ID", "Illinois": "IL", "Indiana": "IN", "Iowa": "IA", "Kansas": "KS",
+    "Kentucky": "KY", "Louisiana": "LA", "Maine": "ME", "Maryland": "MD", "Massachusetts": "MA",
+    "Michigan": "MI", "Minnesota": "MN", "Mississippi": "MS", "Missouri": "MO", "Montana": "MT",
+    "Nebraska": "NE", "Nevada": "NV", "New Hampshire": "NH", "New Jersey": "NJ", "New Mexico": "NM",
+    "New York": "NY", "North Carolina": "NC", "North Dakota": "ND", "Ohio": "OH", "Oklahoma": "OK",
+    "Oregon": "OR", "Pennsylvania": "PA", "Rhode Island": "RI", "South Carolina": "SC", "South Dakota": "SD",
+    "Tennessee": "TN", "Texas": "TX", "Utah": "UT", "Vermont": "VT", "Virginia": "VA", "Washington": "WA",
+    "West Virginia": "WV", "Wisconsin": "WI", "Wyoming": "WY",
+    # Territories included in us-atlas
+    "American Samoa": "AS", "Guam": "GU", "Commonwealth of the Northern Mariana Islands": "MP",
+    "Puerto Rico": "PR", "United States Virgin Islands": "VI",
+}
+
+
+def decode_arcs(topology):
+    """Absolute [lon, lat] arcs from a (possibly quantized, delta-encoded) topology."""
+    transform = topology.get("transform")
+    if not transform:
+        return [[list(p[:2]) for p in arc] for arc in topology["arcs"]]
+    (sx, sy), (tx, ty) = transform["scale"], transform["translate"]
+    arcs = []
+    for arc in topology["arcs"]:
+        x = y = 0
+        points = []
+        for dx, dy, *_ in arc:
+            x += dx
+            y += dy
+            points.append([x * sx + tx, y * sy + ty])
+        arcs.append(points)
+    return arcs
+
+
+def triangle_area(a, b, c):
+    """Planar area of a lon/lat triangle, with longitude shrunk by cos(latitude)."""
+    k = math.cos(math.radians((a[1] + b[1] + c[1]) / 3))
+    return abs((b[0] - a[0]) * (c[1] - a[1]) - (c[0] - a[0]) * (b[1] - a[1])) * k / 2
+
+
+def visvalingam_weights(points):
+    """
+    Effective area of every point of an arc (Visvalingam-Whyatt). Endpoints get
+    infinite weight; a point's weight never drops below that of a point
+    removed before it, so thresholding keeps a consistent, nested subset.
+    """
+    n = len(points)
+    weights = [math.inf] * n
+    if n < 3:
+        return weights
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+    heap = [(triangle_area(points[i - 1], points[i], points[i + 1]), i) for i in range(1, n - 1)]
+    heapq.heapify(heap)
+    current = {i: area for area, i in heap}
+    max_area = 0.0
+    while heap:
+        area, i = heapq.heappop(heap)
+        if current.get(i) != area:
+            continue  # stale entry
+        del current[i]
+        max_area = max(max_area, area)
+        weights[i] = max_area
+        p, q = prev[i], nxt[i]
+        nxt[p], prev[q] = q, p
+        for j in (p, q):
+            if j in current:
+                current[j] = triangle_area(points[prev[j]], points[j], points[nxt[j]])
+                heapq.heappush(heap, (current[j], j))
+    return weights
+
+
+def weight_threshold(all_weights, retain):
+    """Minimum weight that keeps roughly `retain` of the interior points."""
+    finite = sorted(w for weights in all_weights for w in weights if w != math.inf)
+    if retain >= 1 or not finite:
+        return 0.0
+    return finite[min(len(finite) - 1, int(len(finite) * (1 - retain)))]
+
+
+def simplify_arc(points, weights, min_weight, decimals):
+    """Keep points at or above `min_weight`, rounded, without repeated points."""
+    keep = [i for i, w in enumerate(weights) if w >= min_weight]
+    if points[0] == points[-1] and len(keep) < 4:
+        # A closed arc is a whole ring on its own: keep its two heaviest points
+        interior = sorted(range(1, len(points) - 1), key=lambda i: -weights[i])[:2]
+        keep = sorted(set(keep) | set(interior))
+    simplified = []
+    for i in keep:
+        point = [round(points[i][0], decimals), round(points[i][1], decimals)]
+        if not simplified or simplified[-1] != point:
+            simplified.append(point)
+    if len(simplified) == 1:
+        simplified.append(simplified[0])
+    return simplified
+
+
+def ring(arcs, indexes):
+    """Stitch a ring from arc indexes; ~i means arc i reversed."""
+    points = []
+    for index in indexes:
+        arc = arcs[index] if index >= 0 else arcs[~index][::-1]
+        if points:
+            points.pop()
+        points.extend(arc)
+    return points
+
+
+def polygon(arcs, rings):
+    """Polygon rings, dropping any that collapsed at this detail level."""
+    assembled = [ring(arcs, r) for r in rings]
+    if len(assembled[0]) < 4:
+        return None
+    return [assembled[0]] + [r for r in assembled[1:] if len(r) >= 4]
+
+
+def to_feature(geometry, arcs):
+    properties = dict(geometry.get("properties", {}))
+    if properties.get("name") in STATE_ABBR:
+        properties["abbr"] = STATE_ABBR[properties["name"]]
+    if geometry["type"] == "Polygon":
+        polygons = [polygon(arcs, geometry["arcs"])]
+    else:
+        polygons = [polygon(arcs, rings) for rings in geometry["arcs"]]
+    polygons = [p for p in polygons if p]
+    if not polygons:
+        shape = None
+    elif len(polygons) == 1:
+        shape = {"type": "Polygon", "coordinates": polygons[0]}
+    else:
+        shape = {"type": "MultiPolygon", "coordinates": polygons}
+    feature = {"type": "Feature"}
+    if "id" in geometry:
+        feature["id"] = geometry["id"]
+    feature.update(properties=properties, geometry=shape)
+    return feature
+
+
+def arc_indexes(geometry):
+    """Every arc index (as non-negative) a Polygon or MultiPolygon references."""
+    rings = geometry["arcs"] if geometry["type"] == "Polygon" else [r for p in geometry["arcs"] for r in p]
+    return {i if i >= 0 else ~i for r in rings for i in r}
+
+
+def interior_borders(geometries, arcs):
+    """topojson.mesh(topology, object, (a, b) => a !== b): arcs shared by two states."""
+    owners = {}
+    for n, geometry in enumerate(geometries):
+        for i in arc_indexes(geometry):
+            owners.setdefault(i, set()).add(n)
+    lines = [arcs[i] for i in sorted(owners) if len(owners[i]) > 1]
+    return {"type": "MultiLineString", "coordinates": lines}
+
+
+def build_level(topology, arcs, weights, level, source_digest, object_name="states"):
+    spec = LEVELS[level]
+    min_weight = weight_threshold(weights, spec["retain"])
+    simplified = [simplify_arc(a, w, min_weight, spec["decimals"]) for a, w in zip(arcs, weights)]
+    geometries = [g for g in topology["objects"][object_name]["geometries"] if g.get("type")]
+    features = [to_feature(g, simplified) for g in geometries]
+    names = {f["properties"].get("name") for f in features}
+    bundle = {
+        "version": SCHEMA_VERSION,
+        "source": source_digest,
+        "level": level,
+        "abbr": {name: abbr for name, abbr in STATE_ABBR.items() if name in names},
+        "states": {"type": "FeatureCollection", "features": features},
+        "borders": interior_borders(geometries, simplified),
+    }
+    points = sum(len(a) for a in simplified)
+    return bundle, points
+
+
+def write_bundle(bundle, level):
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    path = OUTPUT_DIR / f"us-states.{level}.json"
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(bundle, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+def fetch_source(path, url=SOURCE_URL):
+    """Download the us-atlas TopoJSON into the vendor folder (atomically)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with urllib.request.urlopen(url, timeout=60) as response:
+        raw = response.read()
+    json.loads(raw)  # refuse to vendor an error page
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(raw)
+    os.replace(tmp_path, path)
+    print(f"✓ Vendored {url} as {path} ({len(raw) / 1024:.0f} KB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build pre-simplified US state geometry for the map")
+    parser.add_argument("--source", type=Path, default=SOURCE_FILE, help="us-atlas states TopoJSON")
+    parser.add_argument("--level", choices=sorted(LEVELS), action="append",
+                        help="Only build these detail levels (default: all)")
+    parser.add_argument("--fetch", action="store_true", help=f"Download --source from {SOURCE_URL} first")
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_source(args.source)
+    if not args.source.is_file():
+        raise SystemExit(f"{args.source} not found: vendor us-atlas@3/states-10m.json there first (--fetch)")
+    raw = args.source.read_bytes()
+    topology = json.loads(raw)
+    source_digest = hashlib.sha1(raw).hexdigest()[:12]
+
+    print("Building map geometry...")
+    arcs = decode_arcs(topology)
+    weights = [visvalingam_weights(a) for a in arcs]
+    total = sum(len(a) for a in arcs)
+    for level in args.level or LEVELS:
+        bundle, points = build_level(topology, arcs, weights, level, source_digest)
+        path = write_bundle(bundle, level)
+        size_kb = path.stat().st_size / 1024
+        print(f"✓ Created {path.name}: {points}/{total} points, {size_kb:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Offline layout of the building icons on the US map (mapvis.js).
+Projects each US company's Latitude/Longitude with the map's Albers USA
+projection and resolves icon overlaps for a set of zoom levels and for every
+industry filter of the legend, so the browser only has to place icons.
+Placement is a port of constrainToState / resolveCollisions in mapvis.js:
+state by state, inside the state polygon of the geometry bundle the page
+draws (build_map_geometry.py), with the same spacing rule and seeded search.
+
+Output: cleaned/aggregates/building-layouts.v1.json
+
+    {"version", "sources", "map": {width, height, scale, translate},
+     "zoom_levels": [...], "columns": ["Ticker", "category", "size"], "data": [...],
+     "layouts": {filter: {zoom: {"rows": [...], "x": [...], "y": [...]}}}}
+
+`rows` index into the column-oriented company table; x/y are map coordinates
+(before the zoom transform) of the icon centers.
+"""
+
+import argparse
+import json
+import math
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from aggregate_cubes import CLEANED_DIR, OUTPUT_DIR, source_hash
+
+DATASET_DIR = CLEANED_DIR.parent
+INFO_FILE = "Company-info.csv"
+FINANCIALS_FILE = "Company-financials.csv"
+INDUSTRY_MAPPING = DATASET_DIR / "building-icons" / "industry-mapping.json"
+GEOMETRY_FILE = DATASET_DIR / "build" / "geo" / "us-states.medium.json"  # APP_CONFIG.stateGeometry
+
+SCHEMA_VERSION = 1
+
+# Must match the projection and icon sizing in mapvis.js
+MAP_W, MAP_H = 900, 650
+MAP_SCALE = 1300
+MAP_TRANSLATE = (MAP_W / 2.5, MAP_H / 2)
+BUILDING_ZOOM_FACTOR = 0.6
+ZOOM_LEVELS = (1, 2, 4, 8)  # 8 is the largest state zoom mapvis.js applies
+
+# Must match constrainToState, renderBuildings and resolveCollisions in mapvis.js
+CONSTRAIN_PAD = 0.08  # share of a state's bounds kept clear around geocoded positions
+MISSING_PAD = 0.15    # ... around the positions picked for companies without coordinates
+STATE_PAD = 0.12      # ... around every placed icon
+RANDOM_TRIES = 250
+TIGHT_TRIES = 150
+SHIFT_TRIES = 100
+REFINE_ITERATIONS = 50
+
+EPSILON = 1e-6
+
+
+class ConicEqualArea:
+    """d3.geoConicEqualArea() with rotate([lambda, 0]), center, scale and translate."""
+
+    def __init__(self, parallels, rotate, center, scale, translate, extent=None):
+        phi0, phi1 = (math.radians(p) for p in parallels)
+        sy0 = math.sin(phi0)
+        self.n = (sy0 + math.sin(phi1)) / 2
+        self.c = 1 + sy0 * (2 * self.n - sy0)
+        self.r0 = math.sqrt(self.c) / self.n
+        self.rotate = math.radians(rotate)
+        self.k = scale
+        self.tx, self.ty = translate
+        self.cx, self.cy = self._raw(*(math.radians(v) for v in center))
+        self.extent = extent
+
+    def _raw(self, lam, phi):
+        r = math.sqrt(self.c - 2 * self.n * math.sin(phi)) / self.n
+        return r * math.sin(lam * self.n), self.r0 - r * math.cos(lam * self.n)
+
+    def __call__(self, lon, lat):
+        lam = math.radians(lon) + self.rotate
+        if lam > math.pi:
+            lam -= 2 * math.pi
+        elif lam < -math.pi:
+            lam += 2 * math.pi
+        px, py = self._raw(lam, math.radians(lat))
+        x = self.tx + self.k * (px - self.cx)
+        y = self.ty - self.k * (py - self.cy)
+        if self.extent is not None:
+            (x0, y0), (x1, y1) = self.extent
+            if not (x0 <= x <= x1 and y0 <= y <= y1):
+                return None
+        return x, y
+
+
+class AlbersUsa:
+    """
+    d3.geoAlbersUsa(): the lower 48 plus inset Alaska and Hawaii. A point is
+    projected by the first sub-projection whose clip extent contains it.
+    """
+
+    def __init__(self, scale=MAP_SCALE, translate=MAP_TRANSLATE):
+        k = scale
+        x, y = translate
+        e = EPSILON
+        self.projections = [
+            ConicEqualArea((29.5, 45.5), 96, (-0.6, 38.7), k, (x, y),
+                           ((x - 0.455 * k, y - 0.238 * k), (x + 0.455 * k, y + 0.238 * k))),
+            ConicEqualArea((55, 65), 154, (-2, 58.5), k * 0.35, (x - 0.307 * k, y + 0.201 * k),
+                           ((x - 0.425 * k + e, y + 0.120 * k + e), (x - 0.214 * k - e, y + 0.234 * k - e))),
+            ConicEqualArea((8, 18), 157, (-3, 19.9), k, (x - 0.205 * k, y + 0.212 * k),
+                           ((x - 0.214 * k + e, y + 0.166 * k + e), (x - 0.115 * k - e, y + 0.234 * k - e))),
+        ]
+
+    def __call__(self, lon, lat):
+        for projection in self.projections:
+            point = projection(lon, lat)
+            if point is not None:
+                return point
+        return None
+
+
+def icon_size(market_cap):
+    """Icon size in px, as resolveCollisions() in mapvis.js computes it."""
+    multiplier = math.log(market_cap) / 20 if market_cap and market_cap > 0 else 1
+    return max(20.0, min(60.0, 30 * multiplier))
+
+
+def zoom_scale(zoom):
+    """Map units per on-screen px of a building icon at a zoom level (getBuildingIconScale)."""
+    if zoom <= 1 or BUILDING_ZOOM_FACTOR <= 0:
+        return 1.0
+    return (1 + (zoom - 1) * BUILDING_ZOOM_FACTOR) / zoom
+
+
+def industry_categories(path=INDUSTRY_MAPPING):
+    """{industry: icon category} from the legend's industry mapping."""
+    with open(path) as f:
+        mapping = json.load(f)
+    return {industry: category for category, industries in mapping.items() for industry in industries}
+
+
+def min_spacing(count):
+    """Gap in px between icon edges for a state with `count` icons (resolveCollisions)."""
+    return max(8, min(15, 60 / math.sqrt(count)))
+
+
+def seeded_random(seed):
+    """seededRandom() in mapvis.js: the same sequence for the same seed."""
+    value = seed
+
+    def rng():
+        nonlocal value
+        value = (value * 9301 + 49297) % 233280
+        return value / 233280
+
+    return rng
+
+
+def ticker_seed(ticker):
+    return sum(ord(char) for char in ticker)
+
+
+def ring_area_centroid(ring):
+    """Signed area and area-weighted centroid sums of a closed ring."""
+    area = cx = cy = 0.0
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+        cross = x0 * y1 - x1 * y0
+        area += cross
+        cx += (x0 + x1) * cross
+        cy += (y0 + y1) * cross
+    return area / 2, cx, cy
+
+
+class StateShape:
+    """
+    A state's polygons in map coordinates, for the path.bounds, path.centroid
+    and isPointInState checks resolveCollisions makes.
+    """
+
+    def __init__(self, polygons):
+        self.polygons = [[ring for ring in rings if len(ring) >= 3] for rings in polygons]
+        self.polygons = [rings for rings in self.polygons if rings]
+        xs = [x for rings in self.polygons for ring in rings for x, _ in ring]
+        ys = [y for rings in self.polygons for ring in rings for _, y in ring]
+        self.bounds = (min(xs), min(ys), max(xs), max(ys))
+
+    @classmethod
+    def from_geometry(cls, geometry, projection):
+        """Project a GeoJSON (Multi)Polygon; None if nothing of it is on the map."""
+        if not geometry:
+            return None
+        polygons = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+        projected = [[[point for point in (projection(lon, lat) for lon, lat, *_ in ring) if point is not None]
+                      for ring in rings] for rings in polygons]
+        if not any(len(ring) >= 3 for rings in projected for ring in rings):
+            return None
+        return cls(projected)
+
+    def contains(self, x, y):
+        x0, y0, x1, y1 = self.bounds
+        if not (x0 <= x <= x1 and y0 <= y <= y1):
+            return False
+        inside = False
+        for rings in self.polygons:
+            for ring in rings:  # even-odd across the outer ring and its holes
+                for (ax, ay), (bx, by) in zip(ring, ring[1:] + ring[:1]):
+                    if (ay > y) != (by > y) and x < ax + (y - ay) * (bx - ax) / (by - ay):
+                        inside = not inside
+        return inside
+
+    def centroid(self):
+        area = cx = cy = 0.0
+        for rings in self.polygons:
+            for ring in rings:
+                a, rx, ry = ring_area_centroid(ring)
+                area, cx, cy = area + a, cx + rx, cy + ry
+        if area == 0:
+            return None
+        return cx / (6 * area), cy / (6 * area)
+
+
+def load_state_shapes(path=GEOMETRY_FILE, projection=None):
+    """{state name and abbreviation: StateShape} from a build_map_geometry.py bundle."""
+    projection = projection or AlbersUsa()
+    with open(path) as f:
+        bundle = json.load(f)
+    shapes = {}
+    for feature in bundle["states"]["features"]:
+        shape = StateShape.from_geometry(feature["geometry"], projection)
+        name = feature["properties"].get("name")
+        if shape is None or not name:
+            continue
+        shapes[name] = shape
+        if name in bundle["abbr"]:
+            shapes[bundle["abbr"][name]] = shape
+    return shapes
+
+
+def start_position(ticker, x, y, shape):
+    """
+    renderBuildings' position for a company: the projected point clamped into
+    the state's padded bounds, or (without coordinates) a point inside the
+    state. mapvis.js picks that point with Math.random; here it is seeded by
+    the ticker so the layout is reproducible.
+    """
+    if shape is None:
+        return (x, y) if x is not None else None
+    x0, y0, x1, y1 = shape.bounds
+    width, height = x1 - x0, y1 - y0
+    if x is not None:
+        pad_x, pad_y = width * CONSTRAIN_PAD, height * CONSTRAIN_PAD
+        return max(x0 + pad_x, min(x1 - pad_x, x)), max(y0 + pad_y, min(y1 - pad_y, y))
+
+    pad_x, pad_y = width * MISSING_PAD, height * MISSING_PAD
+    rng = seeded_random(ticker_seed(ticker))
+    for _ in range(200):
+        tx = x0 + pad_x + rng() * (width - 2 * pad_x)
+        ty = y0 + pad_y + rng() * (height - 2 * pad_y)
+        if shape.contains(tx, ty):
+            return tx, ty
+    center = ((x0 + x1) / 2, (y0 + y1) / 2)
+    if shape.contains(*center):
+        return center
+    return shape.centroid() or center
+
+
+def load_companies(cleaned_dir=CLEANED_DIR, shapes=None, projection=None):
+    """
+    US companies that mapvis.js draws as buildings: state, start position,
+    market cap, icon size and category, in resolveCollisions' placement order
+    (market cap descending, then ticker). Companies without a position or
+    category are dropped.
+    """
+    projection = projection or AlbersUsa()
+    shapes = shapes or {}
+    info = pd.read_csv(Path(cleaned_dir) / INFO_FILE)
+    financials = pd.read_csv(Path(cleaned_dir) / FINANCIALS_FILE)
+    info = info[info["Country"].fillna("").str.strip().str.lower() == "united states"]
+    market_cap = pd.to_numeric(financials.drop_duplicates("Ticker").set_index("Ticker")["Market Cap"], errors="coerce")
+
+    categories = industry_categories()
+    companies = info[["Ticker", "State"]].copy()
+    companies["category"] = info["Industry"].map(categories)
+    companies["mc"] = info["Ticker"].map(market_cap).fillna(0.0)
+    companies["size"] = companies["mc"].map(icon_size)
+    points = []
+    for ticker, state, lon, lat in zip(info["Ticker"], info["State"], info["Longitude"], info["Latitude"]):
+        point = projection(lon, lat) if pd.notna(lon) and pd.notna(lat) else None
+        x, y = point if point else (None, None)
+        points.append(start_position(ticker, x, y, shapes.get(state)))
+    companies["px"] = [p[0] if p else None for p in points]
+    companies["py"] = [p[1] if p else None for p in points]
+
+    dropped = companies[companies["px"].isna() | companies["category"].isna()]
+    for ticker in dropped["Ticker"]:
+        print(f"  Skipping {ticker}: no projected position or industry category")
+    companies = companies.drop(dropped.index)
+    companies = companies.sort_values(["mc", "Ticker"], ascending=[False, True])
+    return companies[["Ticker", "State", "category", "mc", "size", "px", "py"]].reset_index(drop=True)
+
+
+def place_state(tickers, starts, radii, shape, spacing):
+    """
+    resolveCollisions for one state: greedy placement in the given order,
+    each icon at its start position if that is free, else at a seeded random
+    point, then on rings around the state center, then with tighter spacing,
+    then forced near the centroid; followed by a short repulsion pass. Every
+    candidate stays inside the state polygon and its padded bounds.
+    """
+    x0, y0, x1, y1 = shape.bounds
+    width, height = x1 - x0, y1 - y0
+    center_x, center_y = (x0 + x1) / 2, (y0 + y1) / 2
+    pad_x, pad_y = width * STATE_PAD, height * STATE_PAD
+
+    def in_bounds(x, y):
+        return x0 + pad_x <= x <= x1 - pad_x and y0 + pad_y <= y <= y1 - pad_y
+
+    def overlaps(x, y, r):
+        for px, py, pr in placed:
+            dx, dy = x - px, y - py
+            if math.sqrt(dx * dx + dy * dy) < r + pr + spacing:
+                return True
+        return False
+
+    def random_point(rng):
+        return x0 + pad_x + rng() * (width - 2 * pad_x), y0 + pad_y + rng() * (height - 2 * pad_y)
+
+    # Start positions outside the polygon or its padded bounds move inside first
+    initial = []
+    for ticker, (x, y) in zip(tickers, starts):
+        if not shape.contains(x, y) or not in_bounds(x, y):
+            rng = seeded_random(ticker_seed(ticker) + 2000)  # Math.random in mapvis.js
+            for _ in range(60):
+                tx, ty = random_point(rng)
+                if shape.contains(tx, ty):
+                    x, y = tx, ty
+                    break
+            else:
+                x, y = center_x, center_y
+                if not shape.contains(x, y):
+                    x, y = shape.centroid() or (x, y)
+        initial.append((x, y))
+
+    placed = []
+    for ticker, (x, y), r in zip(tickers, initial, radii):
+        seed = ticker_seed(ticker)
+        positioned = shape.contains(x, y) and not overlaps(x, y, r)
+
+        if not positioned:
+            rng = seeded_random(seed)
+            for _ in range(RANDOM_TRIES):
+                tx, ty = random_point(rng)
+                if shape.contains(tx, ty) and not overlaps(tx, ty, r):
+                    x, y, positioned = tx, ty, True
+                    break
+
+        if not positioned:
+            step = r * 1.8
+            max_ring = max(width, height) * 0.6
+            ring = step
+            while ring < max_ring and not positioned:
+                points = max(12, math.floor(2 * math.pi * ring / step))
+                for i in range(points):
+                    angle = (i / points) * 2 * math.pi
+                    tx, ty = center_x + math.cos(angle) * ring, center_y + math.sin(angle) * ring
+                    if in_bounds(tx, ty) and shape.contains(tx, ty) and not overlaps(tx, ty, r):
+                        x, y, positioned = tx, ty, True
+                        break
+                ring += step
+
+        if not positioned:
+            rng = seeded_random(seed + 1000)
+            for _ in range(TIGHT_TRIES):
+                tx, ty = random_point(rng)
+                if shape.contains(tx, ty):
+                    gap = math.inf
+                    for px, py, pr in placed:
+                        dx, dy = tx - px, ty - py
+                        gap = min(gap, math.sqrt(dx * dx + dy * dy) - pr)
+                    if gap >= r * 0.7:
+                        x, y, positioned = tx, ty, True
+                        break
+
+        if not positioned:
+            centroid = shape.centroid()
+            x, y = centroid if centroid and shape.contains(*centroid) else (center_x, center_y)
+            for _ in range(SHIFT_TRIES):
+                heavy = False
+                for px, py, pr in placed:
+                    dx, dy = x - px, y - py
+                    if math.sqrt(dx * dx + dy * dy) < (r + pr) * 0.5:
+                        heavy = True
+                        angle = math.atan2(dy, dx)
+                        shift = (r + pr) * 0.7
+                        candidates = ((x + math.cos(angle) * shift, y + math.sin(angle) * shift),
+                                      (x - math.cos(angle) * shift, y - math.sin(angle) * shift))
+                        moved = next(((sx, sy) for sx, sy in candidates if in_bounds(sx, sy) and shape.contains(sx, sy)),
+                                     None)
+                        if moved:
+                            x, y = moved
+                            break
+                if not heavy:
+                    break
+
+        if not (math.isfinite(x) and math.isfinite(y)):
+            x, y = center_x, center_y
+        placed.append((x, y, r))
+
+    # Repulsion pass over what is still closer than the spacing
+    xs, ys = [p[0] for p in placed], [p[1] for p in placed]
+    for iteration in range(REFINE_ITERATIONS):
+        alpha = 0.25 * (1 - iteration / REFINE_ITERATIONS)
+        vx, vy = [0.0] * len(placed), [0.0] * len(placed)
+        for i in range(len(placed)):
+            for j in range(i + 1, len(placed)):
+                dx, dy = xs[j] - xs[i], ys[j] - ys[i]
+                dist = math.sqrt(dx * dx + dy * dy)
+                min_dist = radii[i] + radii[j] + spacing
+                if min_dist > dist > 0.1:
+                    force = ((min_dist - dist) / min_dist) * alpha * 12
+                    fx, fy = (dx / dist) * force, (dy / dist) * force
+                    vx[i] -= fx
+                    vy[i] -= fy
+                    vx[j] += fx
+                    vy[j] += fy
+        for i in range(len(placed)):
+            nx = max(x0 + pad_x, min(x1 - pad_x, xs[i] + vx[i]))
+            ny = max(y0 + pad_y, min(y1 - pad_y, ys[i] + vy[i]))
+            if shape.contains(nx, ny):
+                xs[i], ys[i] = nx, ny
+    return xs, ys
+
+
+def resolve_layout(companies, shapes, zoom):
+    """
+    Icon centers for `companies` (in load_companies order) at a zoom level,
+    placed state by state. Icon radii and spacing shrink with the zoom as
+    getBuildingIconScale shrinks the icons; at zoom 1 this is exactly
+    resolveCollisions. Companies in a state without geometry keep their
+    start position, as in mapvis.js. Returns lists of x and y, aligned with
+    `companies`.
+    """
+    scale = zoom_scale(zoom)
+    xs, ys = companies["px"].tolist(), companies["py"].tolist()
+    positions = {label: i for i, label in enumerate(companies.index)}
+    for state, group in companies.groupby("State", sort=False):
+        shape = shapes.get(state)
+        if shape is None:
+            continue
+        radii = [size * 0.8 * scale for size in group["size"]]
+        placed_x, placed_y = place_state(group["Ticker"].tolist(), list(zip(group["px"], group["py"])), radii,
+                                         shape, min_spacing(len(group)) * scale)
+        for label, x, y in zip(group.index, placed_x, placed_y):
+            xs[positions[label]], ys[positions[label]] = x, y
+    return [round(x, 2) for x in xs], [round(y, 2) for y in ys]
+
+
+def build_layouts(companies, shapes, zoom_levels=ZOOM_LEVELS):
+    """{filter: {zoom: {"rows", "x", "y"}}} for "all" and every category."""
+    filters = ["all"] + sorted(companies["category"].unique())
+    layouts = {}
+    for name in filters:
+        subset = companies if name == "all" else companies[companies["category"] == name]
+        layouts[name] = {}
+        for zoom in zoom_levels:
+            xs, ys = resolve_layout(subset, shapes, zoom)
+            layouts[name][str(zoom)] = {"rows": subset.index.tolist(), "x": xs, "y": ys}
+    return layouts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute building icon positions for the US map")
+    parser.add_argument("--geometry", type=Path, default=GEOMETRY_FILE,
+                        help="State geometry bundle from build_map_geometry.py")
+    args = parser.parse_args()
+    if not args.geometry.is_file():
+        raise SystemExit(f"{args.geometry} not found: run build_map_geometry.py first")
+
+    print("Building map icon layouts...")
+    shapes = load_state_shapes(args.geometry)
+    companies = load_companies(shapes=shapes)
+    layouts = build_layouts(companies, shapes)
+    table = companies[["Ticker", "category", "size"]]
+    payload = {
+        "version": SCHEMA_VERSION,
+        "sources": {f.name: source_hash(f) for f in (CLEANED_DIR / INFO_FILE, CLEANED_DIR / FINANCIALS_FILE,
+                                                      args.geometry)},
+        "map": {"width": MAP_W, "height": MAP_H, "scale": MAP_SCALE, "translate": list(MAP_TRANSLATE)},
+        "zoom_levels": list(ZOOM_LEVELS),
+        "columns": list(table.columns),
+        "data": [table[col].round(2).tolist() if col == "size" else table[col].tolist() for col in table.columns],
+        "layouts": layouts,
+    }
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    path = OUTPUT_DIR / f"building-layouts.v{SCHEMA_VERSION}.json"
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    print(f"✓ Created {path.name}: {len(companies)} companies, "
+          f"{len(layouts)} filters x {len(ZOOM_LEVELS)} zoom levels")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,24 @@ Data consolidation script for NASDAQ 100 market data.
 Reads multiple CSV files and outputs consolidated datasets.
 """
 
+import argparse
 import pandas as pd
 from pathlib import Path
 
+from analytics_store import CLEANED_DIR, build_store
+from dataset_versions import snapshot_all
+from geocode_companies import add_coordinates
+from marketmap import frames
+from marketmap.metrics import StepTimer, add_metrics_arguments, exported, record_write, timed
+from marketmap.profiling import add_profile_argument, profiled
+from partition_exports import partition_dataset
+
 # Define base paths
 BASE_DIR = Path(__file__).parent
 DATASET_DIR = BASE_DIR / "dataset"
 LEVELS_DIR = DATASET_DIR / "levels"
 OUTPUT_DIR = BASE_DIR / "consolidated_data"
 
-# Create output directory if it doesn't exist
-OUTPUT_DIR.mkdir(exist_ok=True)
-
 def clean_ceo_approval(value):
     """Extract percentage from CEO approval string."""
     if pd.isna(value) or value == 'X% approve of CEO':
@@ -40,19 +46,73 @@ def clean_founding_year(value):
         return None
     return int(value) if value != 0 else None
 
-def main():
+def normalize_salaries(salaries):
+    """Company-salary.csv rows from parse_data.py salary rows."""
+    company_salary = salaries[[
+        'company ticker',
+        'role name',
+        'role rank',
+        'role level',
+        'total pay (USD)',
+        'base pay (USD)',
+        'stock (USD)',
+        'bonus (USD)'
+    ]].copy()
+    
+    company_salary.columns = [
+        'Ticker',
+        'Role Name',
+        'Role Rank',
+        'Role Rank Name',
+        'Total Pay',
+        'Base Pay',
+        'Stock',
+        'Bonus'
+    ]
+    
+    # Convert ticker to uppercase for consistency
+    company_salary['Ticker'] = company_salary['Ticker'].str.upper()
+    
+    # Convert Role Rank to int to avoid float representation
+    company_salary['Role Rank'] = company_salary['Role Rank'].astype('Int64')  # nullable int
+    return company_salary
+
+def normalize_benefits(benefits):
+    """Company-benefits.csv rows from parse_data.py benefit rows."""
+    company_benefits = benefits[[
+        'company ticker',
+        'benefit category',
+        'benefit'
+    ]].copy()
+    
+    company_benefits.columns = [
+        'Ticker',
+        'Benefit Category',
+        'Benefit Description'
+    ]
+    
+    # Convert ticker to uppercase for consistency
+    company_benefits['Ticker'] = company_benefits['Ticker'].str.upper()
+    return company_benefits
+
+def consolidate(source_dir=DATASET_DIR, levels_dir=LEVELS_DIR, output_dir=OUTPUT_DIR):
+    # Create output directory if it doesn't exist
+    output_dir.mkdir(parents=True, exist_ok=True)
+    steps = StepTimer("consolidate")
+
     print("Loading source data files...")
     
     # Load all source CSV files
-    nasdaq_snapshot = pd.read_csv(DATASET_DIR / "nasdaq100_snapshot.csv")
-    glassdoor = pd.read_csv(DATASET_DIR / "glassdoorData.csv")
-    salaries = pd.read_csv(LEVELS_DIR / "salaries.csv")
-    benefits = pd.read_csv(LEVELS_DIR / "benefits.csv")
+    nasdaq_snapshot = frames.read_csv(source_dir / "nasdaq100_snapshot.csv")
+    glassdoor = frames.read_csv(source_dir / "glassdoorData.csv")
+    salaries = frames.read_csv(levels_dir / "salaries.csv")
+    benefits = frames.read_csv(levels_dir / "benefits.csv")
     
     print(f"Loaded {len(nasdaq_snapshot)} rows from nasdaq100_snapshot.csv")
     print(f"Loaded {len(glassdoor)} rows from glassdoorData.csv")
     print(f"Loaded {len(salaries)} rows from salaries.csv")
     print(f"Loaded {len(benefits)} rows from benefits.csv")
+    steps.mark("load")
     
     # ===================================================================
     # 1. Company-info.csv
@@ -60,7 +120,7 @@ def main():
     print("\nCreating Company-info.csv...")
     
     # Start with nasdaq snapshot for basic company info (includes State)
-    company_info = nasdaq_snapshot[['Ticker', 'Company', 'Address', 'State', 'Sector', 'Industry']].copy()
+    company_info = nasdaq_snapshot[['Ticker', 'Company', 'Address', 'City', 'State', 'Sector', 'Industry']].copy()
     
     # Merge with glassdoor data (Symbol -> Ticker) to get Country
     glassdoor_subset = glassdoor[['Symbol', 'CompanyType', 'FoundingYear', 
@@ -89,6 +149,9 @@ def main():
     company_info['FoundingYear'] = company_info['FoundingYear'].astype('Int64')  # nullable int
     company_info['CEO Approval Percentage'] = company_info['CEO Approval Percentage'].astype('Int64')  # nullable int
     
+    # Headquarters coordinates from the geocode cache (run geocode_companies.py to fill it)
+    company_info = add_coordinates(company_info)
+    
     # Rename and select final columns
     company_info_final = company_info[[
         'Ticker',
@@ -102,7 +165,9 @@ def main():
         'FoundingYear',
         'Employee Count',
         'Rating',
-        'CEO Approval Percentage'
+        'CEO Approval Percentage',
+        'Latitude',
+        'Longitude'
     ]].copy()
     
     company_info_final.columns = [
@@ -117,10 +182,14 @@ def main():
         'Founding Year',
         'Employee Count',
         'Employee Rating',
-        'CEO Approval Percentage'
+        'CEO Approval Percentage',
+        'Latitude',
+        'Longitude'
     ]
     
-    company_info_final.to_csv(OUTPUT_DIR / "Company-info.csv", index=False)
+    company_info_final.to_csv(output_dir / "Company-info.csv", index=False)
+    record_write("consolidate", output_dir / "Company-info.csv", len(company_info_final))
+    steps.mark("info")
     print(f"✓ Created Company-info.csv with {len(company_info_final)} rows")
     
     # ===================================================================
@@ -150,7 +219,9 @@ def main():
         'Forward PE'
     ]
     
-    company_financials.to_csv(OUTPUT_DIR / "Company-financials.csv", index=False)
+    company_financials.to_csv(output_dir / "Company-financials.csv", index=False)
+    record_write("consolidate", output_dir / "Company-financials.csv", len(company_financials))
+    steps.mark("financials")
     print(f"✓ Created Company-financials.csv with {len(company_financials)} rows")
     
     # ===================================================================
@@ -158,59 +229,43 @@ def main():
     # ===================================================================
     print("\nCreating Company-salary.csv...")
     
-    company_salary = salaries[[
-        'company ticker',
-        'role name',
-        'role rank',
-        'role level',
-        'total pay (USD)',
-        'base pay (USD)',
-        'stock (USD)',
-        'bonus (USD)'
-    ]].copy()
-    
-    company_salary.columns = [
-        'Ticker',
-        'Role Name',
-        'Role Rank',
-        'Role Rank Name',
-        'Total Pay',
-        'Base Pay',
-        'Stock',
-        'Bonus'
-    ]
-    
-    # Convert ticker to uppercase for consistency
-    company_salary['Ticker'] = company_salary['Ticker'].str.upper()
-    
-    # Convert Role Rank to int to avoid float representation
-    company_salary['Role Rank'] = company_salary['Role Rank'].astype('Int64')  # nullable int
+    company_salary = normalize_salaries(salaries)
     
-    company_salary.to_csv(OUTPUT_DIR / "Company-salary.csv", index=False)
+    company_salary.to_csv(output_dir / "Company-salary.csv", index=False)
+    record_write("consolidate", output_dir / "Company-salary.csv", len(company_salary))
     print(f"✓ Created Company-salary.csv with {len(company_salary)} rows")
     
+    # Per-ticker / per-role shards for lazy loading in the front end
+    partition_dataset("salary", company_salary, partitions_dir=output_dir / "partitions")
+    steps.mark("salary")
+    
     # ===================================================================
     # 4. Company-benefits.csv
     # ===================================================================
     print("\nCreating Company-benefits.csv...")
     
-    company_benefits = benefits[[
-        'company ticker',
-        'benefit category',
-        'benefit'
-    ]].copy()
+    company_benefits = normalize_benefits(benefits)
     
-    company_benefits.columns = [
-        'Ticker',
-        'Benefit Category',
-        'Benefit Description'
-    ]
+    company_benefits.to_csv(output_dir / "Company-benefits.csv", index=False)
+    record_write("consolidate", output_dir / "Company-benefits.csv", len(company_benefits))
+    steps.mark("benefits")
+    print(f"✓ Created Company-benefits.csv with {len(company_benefits)} rows")
     
-    # Convert ticker to uppercase for consistency
-    company_benefits['Ticker'] = company_benefits['Ticker'].str.upper()
+    # ===================================================================
+    # 5. Analytics database (tables, indexes and join views of the CSVs)
+    # ===================================================================
+    print("\nCreating marketmap.sqlite...")
+    # The classifier output and weekly snapshot are not rebuilt here; take them from cleaned/
+    build_store(output_dir, output_dir / "marketmap.sqlite", fallback_dir=CLEANED_DIR)
+    record_write("consolidate", output_dir / "marketmap.sqlite")
+    steps.mark("sqlite")
     
-    company_benefits.to_csv(OUTPUT_DIR / "Company-benefits.csv", index=False)
-    print(f"✓ Created Company-benefits.csv with {len(company_benefits)} rows")
+    # ===================================================================
+    # 6. Versioned snapshots (base + keyed deltas) of the cleaned CSVs
+    # ===================================================================
+    print("\nVersioning cleaned datasets...")
+    snapshot_all(output_dir, output_dir / "versions")
+    steps.mark("versions")
     
     # ===================================================================
     # Summary
@@ -218,15 +273,30 @@ def main():
     print("\n" + "="*60)
     print("Data consolidation complete!")
     print("="*60)
-    print(f"\nOutput directory: {OUTPUT_DIR}")
+    print(f"\nOutput directory: {output_dir}")
     print("\nGenerated files:")
     print(f"  1. Company-info.csv       ({len(company_info_final)} companies)")
     print(f"  2. Company-financials.csv ({len(company_financials)} companies)")
     print(f"  3. Company-salary.csv     ({len(company_salary)} salary records)")
     print(f"  4. Company-benefits.csv   ({len(company_benefits)} benefit records)")
+    print("  5. marketmap.sqlite       (tables, indexes and views of the above)")
+    print("  6. versions/              (snapshots and deltas, see dataset_versions.py)")
     print("\nNote: Company-sentiment.csv skipped (WIP)")
     print("="*60)
 
+def main():
+    parser = argparse.ArgumentParser(description="Consolidate the raw NASDAQ 100 sources into the cleaned datasets")
+    parser.add_argument("--source-dir", type=Path, default=DATASET_DIR, help="nasdaq100_snapshot.csv and glassdoorData.csv")
+    parser.add_argument("--levels-dir", type=Path, default=LEVELS_DIR, help="salaries.csv and benefits.csv from parse_data.py")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    add_metrics_arguments(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled("consolidate", args.profile), exported(args.metrics_port, args.metrics_file, stage="consolidate"), \
+            timed("consolidate", "total"):
+        consolidate(args.source_dir, args.levels_dir, args.output_dir)
+
 if __name__ == "__main__":
     main()
 
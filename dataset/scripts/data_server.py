@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Local data API for the MarketMap front end.
+Loads the cleaned datasets once, indexes them by ticker, role, sector and
+date, and serves filtered slices as column-oriented JSON
+({"columns": [...], "data": [[column values]...]}) with gzip, strong ETags
+and conditional GET, instead of every chart downloading whole CSVs:
+
+    GET /api                                        datasets, filters, row counts
+    GET /api/salary?ticker=AAPL,MSFT&role=software-engineer
+    GET /api/weekly?sector=Technology&start=2025-01-01&end=2025-06-30
+
+    python data_server.py --port 8000
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from marketmap import frames
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+CLEANED_DIR = BASE_DIR.parent / "cleaned"
+
+# dataset -> (source CSV in cleaned/, role column or None, date column or None, dropped columns)
+DATASETS = {
+    "info": ("Company-info.csv", None, None, []),
+    "financials": ("Company-financials.csv", None, None, []),
+    "salary": ("Company-salary.csv", "Role Name", None, []),
+    "benefits": ("benefits_classified.csv", None, None, ["desc_lower", "cat_lower"]),
+    "weekly": ("Company-financials-sentiment-weekly-snapshot.csv", None, "Date", []),
+}
+
+CACHE_ENTRIES = 1024     # encoded responses kept in memory
+GZIP_MIN_BYTES = 512     # smaller bodies are sent uncompressed
+CACHE_CONTROL = "public, max-age=300"
+
+
+class Dataset:
+    """
+    One table held as per-column Python lists (NaN -> None, ready for JSON)
+    plus position indexes: ticker -> rows and optionally role -> rows.
+    Rows are sorted by ticker (and date), so each ticker's rows are contiguous.
+    """
+
+    def __init__(self, df, role_col=None, date_col=None):
+        sort_cols = ["Ticker"] + ([date_col] if date_col else [])
+        df = df.sort_values(sort_cols, kind="stable").reset_index(drop=True)
+        self.columns = list(df.columns)
+        self.values = [df[c].astype(object).where(df[c].notna(), None).tolist() for c in self.columns]
+        self.rows = len(df)
+        self.by_ticker = df.groupby("Ticker").indices
+        self.by_role = df.groupby(role_col).indices if role_col else None
+        self.dates = df[date_col].astype(str).to_numpy() if date_col else None
+
+    def select(self, tickers=None, roles=None, start=None, end=None):
+        """Row positions matching every given filter, in table order."""
+        positions = None
+        if tickers is not None:
+            parts = [self.by_ticker[t] for t in tickers if t in self.by_ticker]
+            positions = np.sort(np.concatenate(parts)) if parts else np.array([], dtype=int)
+        if roles is not None:
+            parts = [self.by_role[r] for r in roles if r in self.by_role]
+            role_rows = np.sort(np.concatenate(parts)) if parts else np.array([], dtype=int)
+            positions = role_rows if positions is None else np.intersect1d(positions, role_rows)
+        if positions is None:
+            positions = np.arange(self.rows)
+        if self.dates is not None and (start or end):
+            dates = self.dates[positions]
+            mask = np.ones(len(positions), dtype=bool)
+            if start:
+                mask &= dates >= start
+            if end:
+                mask &= dates <= end
+            positions = positions[mask]
+        return positions
+
+    def payload(self, positions):
+        if len(positions) == self.rows:
+            data = self.values
+        else:
+            data = [[column[i] for i in positions] for column in self.values]
+        return {"columns": self.columns, "data": data}
+
+
+class DataIndex:
+    """All datasets plus the sector -> tickers mapping from Company-info.csv."""
+
+    def __init__(self, cleaned_dir=CLEANED_DIR):
+        self.datasets = {}
+        for name, (source, role_col, date_col, dropped) in DATASETS.items():
+            path = Path(cleaned_dir) / source
+            if not path.is_file():
+                print(f"  Skipping {name}: {source} not found")
+                continue
+            df = frames.read_csv(path).drop(columns=dropped, errors="ignore")
+            self.datasets[name] = Dataset(df, role_col, date_col)
+        info = frames.read_csv(Path(cleaned_dir) / DATASETS["info"][0], usecols=["Ticker", "Sector"])
+        self.sectors = info.dropna().groupby("Sector")["Ticker"].apply(list).to_dict()
+
+    def filters(self, name):
+        _, role_col, date_col, _ = DATASETS[name]
+        return ["ticker", "sector"] + (["role"] if role_col else []) + (["start", "end"] if date_col else [])
+
+    def describe(self):
+        return {
+            "datasets": {name: {"rows": ds.rows, "columns": ds.columns, "filters": self.filters(name)}
+                         for name, ds in self.datasets.items()},
+            "sectors": sorted(self.sectors),
+        }
+
+    def query(self, name, params):
+        """Payload for a dataset and {filter: [values]}; raises KeyError/ValueError."""
+        dataset = self.datasets[name]
+        unknown = set(params) - set(self.filters(name))
+        if unknown:
+            raise ValueError(f"unknown filter(s) for {name}: {', '.join(sorted(unknown))}")
+        tickers = params.get("ticker")
+        if "sector" in params:
+            sector_tickers = [t for s in params["sector"] for t in self.sectors.get(s, [])]
+            tickers = sector_tickers if tickers is None else [t for t in tickers if t in set(sector_tickers)]
+        start = params.get("start", [None])[0]
+        end = params.get("end", [None])[0]
+        positions = dataset.select(tickers, params.get("role"), start, end)
+        return dataset.payload(positions)
+
+
+def parse_params(query):
+    """{filter: sorted distinct values}; values may be repeated or comma-separated."""
+    params = {}
+    for key, values in parse_qs(query).items():
+        items = {v.strip() for value in values for v in value.split(",") if v.strip()}
+        if items:
+            params[key] = sorted(items)
+    return params
+
+
+class ResponseCache:
+    """LRU of encoded responses: key -> (etag, body, gzipped body or None)."""
+
+    def __init__(self, size=CACHE_ENTRIES):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+def encode(payload):
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    etag = hashlib.sha1(body).hexdigest()[:20]
+    gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+    return etag, body, gzipped
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def make_handler(index, cache):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Buffer headers and body into one write and skip Nagle, otherwise each
+        # keep-alive response stalls on the client's delayed ACK (~40 ms)
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def send_body(self, status, body, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_error_json(self, status, message):
+            body = json.dumps({"error": message}).encode()
+            self.send_body(status, body, {"Content-Type": "application/json"})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            if not parts or parts[0] != "api" or len(parts) > 2:
+                self.send_error_json(404, "not found")
+                return
+            name = parts[1] if len(parts) == 2 else ""
+            params = parse_params(url.query)
+            key = (name, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+
+            entry = cache.get(key)
+            if entry is None:
+                try:
+                    payload = index.query(name, params) if name else index.describe()
+                except KeyError:
+                    self.send_error_json(404, f"unknown dataset {name!r}")
+                    return
+                except ValueError as e:
+                    self.send_error_json(400, str(e))
+                    return
+                entry = encode(payload)
+                cache.put(key, entry)
+            digest, body, gzipped = entry
+
+            # Each encoding is its own representation, so it gets its own strong ETag
+            use_gzip = gzipped is not None and "gzip" in self.headers.get("Accept-Encoding", "")
+            etag = f'"{digest}-gz"' if use_gzip else f'"{digest}"'
+            headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+            if etag_matches(self.headers.get("If-None-Match"), etag):
+                self.send_body(304, b"", headers)
+                return
+            headers["Content-Type"] = "application/json"
+            if use_gzip:
+                headers["Content-Encoding"] = "gzip"
+                body = gzipped
+            self.send_body(200, body, headers)
+
+    return Handler
+
+
+def make_server(host="127.0.0.1", port=8000, cleaned_dir=CLEANED_DIR):
+    index = DataIndex(cleaned_dir)
+    return ThreadingHTTPServer((host, port), make_handler(index, ResponseCache()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve filtered slices of the cleaned datasets")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--cleaned-dir", type=Path, default=CLEANED_DIR)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.cleaned_dir)
+    print(f"MarketMap data API listening on http://{args.host}:{args.port}/api")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Versioned snapshots of the cleaned datasets.
+Every refresh overwrites cleaned/*.csv; this keeps each distinct state as a
+numbered version, stored as a full base plus keyed row-level deltas, so old
+versions can be rebuilt and clients can sync only what changed since the
+version they hold. Storage grows with churn: an unchanged refresh adds
+nothing, and a new base is only written when a delta would be nearly as
+large as the table itself (or the columns changed).
+
+Layout (under cleaned/versions/<dataset>/):
+    manifest.json        key columns and one entry per version (kind, file, row counts, sha256)
+    v0001.base.csv.gz    every row of that version
+    v0002.delta.csv.gz   rows added (+), changed (~) and removed (-) since the version before
+
+Rows are identified by the dataset's key columns plus their occurrence
+number within the key, since some sources repeat keys. Versions hold rows
+sorted by key and values, so a materialized version is byte-for-byte
+reproducible whatever order the refresh wrote them in.
+
+    python dataset_versions.py snapshot                   # consolidate_data.py runs this
+    python dataset_versions.py list salary
+    python dataset_versions.py materialize salary 3 -o salary-v3.csv
+    python dataset_versions.py delta salary --since 3 -o salary-since-v3.csv.gz
+    python dataset_versions.py apply salary salary-v3.csv salary-since-v3.csv.gz -o salary.csv
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+CLEANED_DIR = BASE_DIR.parent / "cleaned"
+VERSIONS_DIR = CLEANED_DIR / "versions"
+
+# dataset -> (source CSV in cleaned/, key columns)
+VERSIONED = {
+    "info": ("Company-info.csv", ["Ticker"]),
+    "financials": ("Company-financials.csv", ["Ticker"]),
+    "salary": ("Company-salary.csv", ["Ticker", "Role Name", "Role Rank"]),
+    "benefits": ("Company-benefits.csv", ["Ticker", "Benefit Category", "Benefit Description"]),
+    "weekly": ("Company-financials-sentiment-weekly-snapshot.csv", ["Ticker", "Date"]),
+    "sentiment": ("combined_sentiment.csv", ["ticker", "start_date"]),
+}
+
+MANIFEST_VERSION = 1
+OP = "_op"           # delta column: + added, ~ changed (new values), - removed (key only)
+OCCURRENCE = "_n"    # 0 for the first row with a key, 1 for a repeat, ...
+REBASE_FRACTION = 0.5  # write a full base instead of a delta with more rows than this share of the table
+
+
+def canonical(df, key):
+    """
+    Sort by key, then by the remaining values, and number repeats of a key
+    in that order, so the file's row order never shows up as a change.
+    Values stay as the CSV's strings.
+    """
+    df = df.sort_values(key + [c for c in df.columns if c not in key], kind="stable").reset_index(drop=True)
+    return df.assign(**{OCCURRENCE: df.groupby(key, sort=False).cumcount()})
+
+
+def read_table(path, key):
+    return canonical(pd.read_csv(path, dtype=str, keep_default_na=False), key)
+
+
+def to_csv_bytes(df):
+    """A version as its consumers see it: the CSV without the occurrence column."""
+    return df.drop(columns=[OCCURRENCE]).to_csv(index=False).encode()
+
+
+def table_hash(df):
+    return hashlib.sha256(to_csv_bytes(df)).hexdigest()
+
+
+def diff(old, new, key):
+    """Delta rows turning `old` into `new` (both canonical, same columns)."""
+    ids = key + [OCCURRENCE]
+    values = [c for c in new.columns if c not in ids]
+    merged = old.merge(new, on=ids, how="outer", suffixes=("\0old", ""), indicator=True)
+    added = merged[merged["_merge"] == "right_only"]
+    both = merged[merged["_merge"] == "both"]
+    changed = both[(both[[f"{c}\0old" for c in values]].to_numpy() != both[values].to_numpy()).any(axis=1)]
+    removed = merged.loc[merged["_merge"] == "left_only", ids]
+    delta = pd.concat([
+        added[new.columns].assign(**{OP: "+"}),
+        changed[new.columns].assign(**{OP: "~"}),
+        removed.assign(**{c: "" for c in values}, **{OP: "-"})[list(new.columns) + [OP]],
+    ], ignore_index=True)
+    return delta[[OP] + list(new.columns)]
+
+
+def apply_delta(base, delta, key):
+    """`base` (canonical, or a materialized CSV read as strings) with `delta` applied."""
+    if OCCURRENCE not in base.columns:
+        base = canonical(base, key)
+    ids = key + [OCCURRENCE]
+    delta = delta.astype({OCCURRENCE: int})
+    replaced = pd.MultiIndex.from_frame(delta.loc[delta[OP] != "+", ids])
+    kept = base[~pd.MultiIndex.from_frame(base[ids]).isin(replaced)]
+    out = pd.concat([kept, delta.loc[delta[OP] != "-", base.columns]], ignore_index=True)
+    return out.sort_values(ids, kind="stable").reset_index(drop=True)
+
+
+def write_gzip_csv(df, path):
+    tmp_path = path.with_name(path.name + ".tmp")
+    # mtime=0 keeps the gzip bytes reproducible
+    df.to_csv(tmp_path, index=False, compression={"method": "gzip", "mtime": 0})
+    os.replace(tmp_path, path)
+
+
+def read_gzip_csv(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False, compression="gzip").astype({OCCURRENCE: int})
+
+
+def load_manifest(name, versions_dir=VERSIONS_DIR):
+    path = Path(versions_dir) / name / "manifest.json"
+    if not path.is_file():
+        source, key = VERSIONED[name]
+        return {"version": MANIFEST_VERSION, "dataset": name, "source": source, "key": key, "versions": []}
+    return json.loads(path.read_text())
+
+
+def save_manifest(manifest, versions_dir=VERSIONS_DIR):
+    path = Path(versions_dir) / manifest["dataset"] / "manifest.json"
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, path)
+
+
+def materialize(name, version=None, versions_dir=VERSIONS_DIR):
+    """
+    Version `version` (default: latest) as a canonical frame, rebuilt from
+    the nearest base at or before it. Checked against the recorded sha256.
+    """
+    manifest = load_manifest(name, versions_dir)
+    entries = manifest["versions"]
+    if not entries:
+        raise ValueError(f"{name} has no versions yet")
+    version = version or entries[-1]["version"]
+    if not 1 <= version <= len(entries):
+        raise ValueError(f"{name} has versions 1-{len(entries)}, not {version}")
+
+    base_idx = max(i for i in range(version) if entries[i]["kind"] == "base")
+    dataset_dir = Path(versions_dir) / name
+    df = read_gzip_csv(dataset_dir / entries[base_idx]["file"])
+    for entry in entries[base_idx + 1:version]:
+        df = apply_delta(df, read_gzip_csv(dataset_dir / entry["file"]), manifest["key"])
+    if table_hash(df) != entries[version - 1]["sha256"]:
+        raise ValueError(f"{name} v{version} does not match its recorded sha256")
+    return df
+
+
+def snapshot(name, cleaned_dir=CLEANED_DIR, versions_dir=VERSIONS_DIR):
+    """Record the current cleaned CSV as a new version; returns its entry, or None if unchanged."""
+    source, key = VERSIONED[name]
+    new = read_table(Path(cleaned_dir) / source, key)
+    manifest = load_manifest(name, versions_dir)
+    entries = manifest["versions"]
+    digest = table_hash(new)
+    if entries and entries[-1]["sha256"] == digest:
+        return None
+
+    version = len(entries) + 1
+    columns = [c for c in new.columns if c != OCCURRENCE]
+    entry = {"version": version, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "kind": "base",
+             "rows": len(new), "columns": columns, "sha256": digest}
+    data = new
+    if entries and entries[-1]["columns"] == columns:
+        delta = diff(materialize(name, versions_dir=versions_dir), new, key)
+        entry.update({op: int((delta[OP] == sign).sum())
+                      for op, sign in (("added", "+"), ("changed", "~"), ("removed", "-"))})
+        if len(delta) <= REBASE_FRACTION * len(new):
+            entry["kind"], data = "delta", delta
+
+    dataset_dir = Path(versions_dir) / name
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    entry["file"] = f"v{version:04d}.{entry['kind']}.csv.gz"
+    write_gzip_csv(data, dataset_dir / entry["file"])
+    entry["bytes"] = (dataset_dir / entry["file"]).stat().st_size
+    entries.append(entry)
+    save_manifest(manifest, versions_dir)
+    return entry
+
+
+def snapshot_all(cleaned_dir=CLEANED_DIR, versions_dir=VERSIONS_DIR, names=None):
+    for name in names or VERSIONED:
+        source, _ = VERSIONED[name]
+        if not (Path(cleaned_dir) / source).is_file():
+            continue
+        entry = snapshot(name, cleaned_dir, versions_dir)
+        if entry is None:
+            print(f"  {name} unchanged")
+        elif entry["kind"] == "delta":
+            print(f"✓ Versioned {name} v{entry['version']}: +{entry['added']} ~{entry['changed']} "
+                  f"-{entry['removed']} rows ({entry['bytes']:,} bytes)")
+        else:
+            print(f"✓ Versioned {name} v{entry['version']}: base of {entry['rows']} rows ({entry['bytes']:,} bytes)")
+
+
+def delta_since(name, since, to=None, versions_dir=VERSIONS_DIR):
+    """Net delta from version `since` (0: nothing) to `to` (default: latest)."""
+    key = load_manifest(name, versions_dir)["key"]
+    new = materialize(name, to, versions_dir)
+    old = materialize(name, since, versions_dir) if since else new.iloc[0:0]
+    if list(old.columns) != list(new.columns):
+        raise ValueError(f"{name} columns changed after v{since}; materialize the full version instead")
+    return diff(old, new, key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Versioned snapshots and deltas of the cleaned datasets")
+    parser.add_argument("--cleaned-dir", type=Path, default=CLEANED_DIR)
+    parser.add_argument("--versions-dir", type=Path, default=None, help="Default: <cleaned-dir>/versions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    snap = commands.add_parser("snapshot", help="Record the current cleaned CSVs as new versions")
+    snap.add_argument("datasets", nargs="*", help=f"Default: every dataset ({', '.join(VERSIONED)})")
+
+    listing = commands.add_parser("list", help="Show the versions of a dataset")
+    listing.add_argument("dataset", choices=VERSIONED)
+
+    mat = commands.add_parser("materialize", help="Write a version as CSV")
+    mat.add_argument("dataset", choices=VERSIONED)
+    mat.add_argument("version", type=int, nargs="?", default=None, help="Default: latest")
+    mat.add_argument("-o", "--output", type=Path, required=True)
+
+    since = commands.add_parser("delta", help="Write the delta from a client's version to a later one")
+    since.add_argument("dataset", choices=VERSIONED)
+    since.add_argument("--since", type=int, required=True, help="Version the client holds (0: none)")
+    since.add_argument("--to", type=int, default=None, help="Default: latest")
+    since.add_argument("-o", "--output", type=Path, required=True, help="Delta file (.csv.gz)")
+
+    apply = commands.add_parser("apply", help="Apply a delta file to a materialized CSV")
+    apply.add_argument("dataset", choices=VERSIONED)
+    apply.add_argument("base", type=Path)
+    apply.add_argument("delta", type=Path)
+    apply.add_argument("-o", "--output", type=Path, required=True)
+
+    args = parser.parse_args()
+    versions_dir = args.versions_dir or args.cleaned_dir / "versions"
+    unknown = [name for name in getattr(args, "datasets", []) if name not in VERSIONED]
+    if unknown:
+        parser.error(f"unknown datasets: {', '.join(unknown)} (choose from {', '.join(VERSIONED)})")
+
+    try:
+        if args.command == "snapshot":
+            snapshot_all(args.cleaned_dir, versions_dir, args.datasets)
+        elif args.command == "list":
+            for entry in load_manifest(args.dataset, versions_dir)["versions"]:
+                changes = (f"+{entry['added']} ~{entry['changed']} -{entry['removed']}"
+                           if entry["kind"] == "delta" else "")
+                print(f"v{entry['version']:<4} {entry['created']}  {entry['kind']:<5} {entry['rows']:>7} rows  "
+                      f"{entry['bytes']:>9,} bytes  {changes}")
+        elif args.command == "materialize":
+            df = materialize(args.dataset, args.version, versions_dir)
+            args.output.write_bytes(to_csv_bytes(df))
+            print(f"✓ Created {args.output} with {len(df)} rows")
+        elif args.command == "delta":
+            delta = delta_since(args.dataset, args.since, args.to, versions_dir)
+            write_gzip_csv(delta, args.output)
+            print(f"✓ Created {args.output}: {len(delta)} delta rows ({args.output.stat().st_size:,} bytes)")
+        elif args.command == "apply":
+            key = VERSIONED[args.dataset][1]
+            base = pd.read_csv(args.base, dtype=str, keep_default_na=False)
+            df = apply_delta(base, read_gzip_csv(args.delta), key)
+            args.output.write_bytes(to_csv_bytes(df))
+            print(f"✓ Created {args.output} with {len(df)} rows")
+    except ValueError as e:
+        parser.exit(1, f"{e}\n")
+
+
+if __name__ == "__main__":
+    main()
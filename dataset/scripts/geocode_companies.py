@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+Geocoding stage for the Latitude/Longitude columns of Company-info.csv.
+Reads headquarters addresses from the NASDAQ snapshot (country from the
+Glassdoor data), normalizes and deduplicates them and resolves only the ones
+missing from a persistent cache, in batches, through a pluggable provider:
+
+    census      US Census batch geocoder (US addresses, up to 10k per request)
+    nominatim   OpenStreetMap Nominatim (worldwide, one address per second)
+    gazetteer   local CSV of address -> coordinates, for offline runs
+    stub        deterministic fake coordinates, for tests
+
+    python geocode_companies.py --provider census --provider nominatim
+    python geocode_companies.py --seed      # cache the coordinates already in Company-info.csv
+    python geocode_companies.py --refresh AAPL --refresh "1 COMCAST CENTER|PHILADELPHIA|PA|US"
+
+The cache (raw-data/geocode_cache.json) is keyed by normalized address, so an
+address is geocoded once across all refreshes. consolidate_data.py only
+reads it, through add_coordinates().
+
+Seeded and geocoded points must fall inside the bounding box of the
+address's US state (or its country elsewhere); points that do not are
+skipped, and cached ones are flagged on every run until refreshed.
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+DATASET_DIR = BASE_DIR.parent
+RAW_DIR = DATASET_DIR / "raw-data"
+SNAPSHOT_FILE = RAW_DIR / "nasdaq100_snapshot.csv"
+GLASSDOOR_FILE = RAW_DIR / "glassdoorData.csv"
+INFO_FILE = DATASET_DIR / "cleaned" / "Company-info.csv"
+CACHE_FILE = RAW_DIR / "geocode_cache.json"
+
+USER_AGENT = "marketmap-geocoder/1.0"
+REQUEST_TIMEOUT = 60  # seconds
+
+# Street suffixes and directions in their USPS abbreviations
+ABBREVIATIONS = {
+    "STREET": "ST", "AVENUE": "AVE", "ROAD": "RD", "DRIVE": "DR", "BOULEVARD": "BLVD",
+    "PARKWAY": "PKWY", "PLACE": "PL", "LANE": "LN", "COURT": "CT", "CIRCLE": "CIR",
+    "HIGHWAY": "HWY", "EXPRESSWAY": "EXPY", "SQUARE": "SQ", "TERRACE": "TER", "PLAZA": "PLZ",
+    "SUITE": "STE", "FLOOR": "FL", "EXTENSION": "EXT",
+    "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+    "NORTHEAST": "NE", "NORTHWEST": "NW", "SOUTHEAST": "SE", "SOUTHWEST": "SW",
+    "ONE": "1",
+}
+COUNTRY_ALIASES = {"UNITED STATES": "US", "USA": "US", "UNITED STATES OF AMERICA": "US",
+                   "UNITED KINGDOM": "UK", "GREAT BRITAIN": "UK"}
+
+# (south, north, west, east) in degrees, by US state and by country elsewhere
+STATE_BOUNDS = {
+    "AL": (30.14, 35.01, -88.47, -84.89), "AK": (51.2, 71.5, -179.2, -129.9), "AZ": (31.33, 37.0, -114.82, -109.04),
+    "AR": (33.0, 36.5, -94.62, -89.64), "CA": (32.53, 42.01, -124.41, -114.13), "CO": (36.99, 41.0, -109.06, -102.04),
+    "CT": (40.98, 42.05, -73.73, -71.79), "DE": (38.45, 39.84, -75.79, -75.05), "DC": (38.79, 39.0, -77.12, -76.91),
+    "FL": (24.4, 31.0, -87.63, -80.03), "GA": (30.36, 35.0, -85.61, -80.84), "HI": (18.91, 22.24, -160.25, -154.81),
+    "ID": (41.99, 49.0, -117.24, -111.04), "IL": (36.97, 42.51, -91.51, -87.02), "IN": (37.77, 41.76, -88.1, -84.78),
+    "IA": (40.38, 43.5, -96.64, -90.14), "KS": (36.99, 40.0, -102.05, -94.59), "KY": (36.5, 39.15, -89.57, -81.96),
+    "LA": (28.93, 33.02, -94.04, -88.82), "ME": (43.06, 47.46, -71.08, -66.95), "MD": (37.91, 39.72, -79.49, -75.05),
+    "MA": (41.24, 42.89, -73.51, -69.93), "MI": (41.7, 48.31, -90.42, -82.41), "MN": (43.5, 49.38, -97.24, -89.49),
+    "MS": (30.17, 35.01, -91.66, -88.1), "MO": (35.99, 40.61, -95.77, -89.1), "MT": (44.36, 49.0, -116.05, -104.04),
+    "NE": (40.0, 43.0, -104.05, -95.31), "NV": (35.0, 42.0, -120.01, -114.04), "NH": (42.7, 45.31, -72.56, -70.61),
+    "NJ": (38.93, 41.36, -75.56, -73.89), "NM": (31.33, 37.0, -109.05, -103.0), "NY": (40.5, 45.02, -79.76, -71.86),
+    "NC": (33.84, 36.59, -84.32, -75.46), "ND": (45.94, 49.0, -104.05, -96.55), "OH": (38.4, 41.98, -84.82, -80.52),
+    "OK": (33.62, 37.0, -103.0, -94.43), "OR": (41.99, 46.29, -124.57, -116.46), "PA": (39.72, 42.27, -80.52, -74.69),
+    "RI": (41.15, 42.02, -71.86, -71.12), "SC": (32.03, 35.22, -83.35, -78.54), "SD": (42.48, 45.95, -104.06, -96.44),
+    "TN": (34.98, 36.68, -90.31, -81.65), "TX": (25.84, 36.5, -106.65, -93.51), "UT": (37.0, 42.0, -114.05, -109.04),
+    "VT": (42.73, 45.02, -73.44, -71.46), "VA": (36.54, 39.47, -83.68, -75.24), "WA": (45.54, 49.0, -124.85, -116.92),
+    "WV": (37.2, 40.64, -82.64, -77.72), "WI": (42.49, 47.31, -92.89, -86.25), "WY": (40.99, 45.01, -111.06, -104.05),
+    "PR": (17.88, 18.52, -67.95, -65.22),
+}
+COUNTRY_BOUNDS = {
+    "CANADA": (41.7, 83.1, -141.0, -52.6), "UK": (49.9, 60.9, -8.65, 1.77), "NETHERLANDS": (50.75, 53.56, 3.36, 7.23),
+    "IRELAND": (51.4, 55.4, -10.5, -5.99), "GERMANY": (47.27, 55.06, 5.87, 15.04), "CHINA": (18.2, 53.56, 73.5, 134.8),
+    "AUSTRALIA": (-43.7, -10.7, 113.3, 153.6), "BRAZIL": (-33.75, 5.27, -73.99, -34.79),
+    "ARGENTINA": (-55.1, -21.8, -73.6, -53.6), "ISRAEL": (29.5, 33.3, 34.27, 35.9),
+}
+BOUNDS_MARGIN = 0.25  # degrees of slack around each box
+
+
+def normalize_part(value):
+    """Upper-case, drop punctuation, collapse spaces and abbreviate street words."""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ""
+    words = re.sub(r"[^\w\s]", " ", str(value).upper()).split()
+    return " ".join(ABBREVIATIONS.get(w, w) for w in words)
+
+
+def address_key(address, city, state, country):
+    """Cache key of an address: its normalized parts joined with '|'."""
+    country = normalize_part(country)
+    return "|".join([normalize_part(address), normalize_part(city), normalize_part(state),
+                     COUNTRY_ALIASES.get(country, country)])
+
+
+def expected_bounds(key):
+    """
+    Bounding box an address key's point must fall in, or None if unknown.
+    A US state code wins over the country, which comes from Glassdoor and is
+    sometimes wrong (e.g. SAN DIEGO|CA|BRAZIL). Without a state the country
+    alone is not trusted.
+    """
+    state, country = key.split("|")[-2:]
+    if state in STATE_BOUNDS:
+        return STATE_BOUNDS[state]
+    return COUNTRY_BOUNDS.get(country) if state else None
+
+
+def plausible(key, point):
+    """False if `point` lies outside the bounding box of the address's state (or country)."""
+    bounds = expected_bounds(key)
+    if point is None or bounds is None:
+        return True
+    south, north, west, east = bounds
+    lat, lon = point
+    return (south - BOUNDS_MARGIN <= lat <= north + BOUNDS_MARGIN
+            and west - BOUNDS_MARGIN <= lon <= east + BOUNDS_MARGIN)
+
+
+def load_addresses(snapshot_file=SNAPSHOT_FILE, glassdoor_file=GLASSDOOR_FILE):
+    """Ticker, Address, City, State, Country and address key of every company."""
+    snapshot = pd.read_csv(snapshot_file, usecols=["Ticker", "Address", "City", "State"])
+    countries = pd.read_csv(glassdoor_file, usecols=["Symbol", "Country"]).drop_duplicates("Symbol")
+    addresses = snapshot.merge(countries.rename(columns={"Symbol": "Ticker"}), on="Ticker", how="left")
+    return with_keys(addresses)
+
+
+def with_keys(addresses):
+    addresses = addresses.copy()
+    addresses["key"] = [
+        address_key(*parts)
+        for parts in zip(addresses["Address"], addresses["City"], addresses["State"], addresses["Country"])
+    ]
+    return addresses
+
+
+class Provider:
+    """
+    A geocoding backend. geocode() takes {key: query} for at most batch_size
+    addresses, where query is a dict with address/city/state/country, and
+    returns {key: (lat, lon) or None} for the keys it could decide on.
+    """
+
+    name = "base"
+    batch_size = 100
+
+    def geocode(self, queries):
+        raise NotImplementedError
+
+
+class StubProvider(Provider):
+    """
+    Deterministic coordinates derived from the key, inside the address's
+    state (or country) box, or the contiguous US if it has none.
+    """
+
+    name = "stub"
+    batch_size = 1000
+    default_bounds = (30.0, 47.0, -122.0, -72.0)
+
+    def geocode(self, queries):
+        results = {}
+        for key in queries:
+            south, north, west, east = expected_bounds(key) or self.default_bounds
+            digest = hashlib.sha1(key.encode()).digest()
+            lat = south + digest[0] / 255 * (north - south)
+            lon = west + digest[1] / 255 * (east - west)
+            results[key] = (round(lat, 6), round(lon, 6))
+        return results
+
+
+class GazetteerProvider(Provider):
+    """
+    Offline lookup in a CSV with Address, City, State, Country, Latitude and
+    Longitude columns. Matches the full address first, then the city.
+    """
+
+    name = "gazetteer"
+    batch_size = 10000
+
+    def __init__(self, path):
+        table = with_keys(pd.read_csv(path))
+        table = table.dropna(subset=["Latitude", "Longitude"])
+        self.addresses = {k: (lat, lon) for k, lat, lon in zip(table["key"], table["Latitude"], table["Longitude"])}
+        cities = table.assign(city_key=table["key"].str.split("|", n=1).str[1])
+        cities = cities.groupby("city_key")[["Latitude", "Longitude"]].mean()
+        self.cities = {k: (row.Latitude, row.Longitude) for k, row in cities.iterrows()}
+
+    def geocode(self, queries):
+        results = {}
+        for key in queries:
+            point = self.addresses.get(key) or self.cities.get(key.split("|", 1)[1])
+            if point:
+                results[key] = (round(float(point[0]), 7), round(float(point[1]), 7))
+        return results
+
+
+class CensusProvider(Provider):
+    """US Census Bureau batch geocoder; only answers for US addresses."""
+
+    name = "census"
+    batch_size = 10000
+    url = "https://geocoding.geo.census.gov/geocoder/locations/addressbatch"
+
+    def __init__(self, session):
+        self.session = session
+
+    def geocode(self, queries):
+        us = {key: q for key, q in queries.items() if key.rsplit("|", 1)[1] == "US"}
+        if not us:
+            return {}
+        ids = {str(i): key for i, key in enumerate(us)}
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for i, key in ids.items():
+            q = us[key]
+            writer.writerow([i, q["address"], q["city"], q["state"], ""])
+        response = self.session.post(
+            self.url,
+            files={"addressFile": ("addresses.csv", buf.getvalue(), "text/csv")},
+            data={"benchmark": "Public_AR_Current"},
+            timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        results = {}
+        for row in csv.reader(io.StringIO(response.text)):
+            if not row or row[0] not in ids:
+                continue
+            key = ids[row[0]]
+            if len(row) > 5 and row[2] == "Match":
+                lon, lat = (float(v) for v in row[5].split(","))
+                results[key] = (round(lat, 7), round(lon, 7))
+            else:
+                results[key] = None
+        return results
+
+
+class NominatimProvider(Provider):
+    """OpenStreetMap Nominatim search, throttled to its one request per second policy."""
+
+    name = "nominatim"
+    batch_size = 25
+    url = "https://nominatim.openstreetmap.org/search"
+    min_interval = 1.0
+
+    def __init__(self, session):
+        self.session = session
+        self.last_request = 0.0
+
+    def geocode(self, queries):
+        results = {}
+        for key, q in queries.items():
+            wait = self.min_interval - (time.monotonic() - self.last_request)
+            if wait > 0:
+                time.sleep(wait)
+            self.last_request = time.monotonic()
+            params = {"street": q["address"], "city": q["city"], "state": q["state"],
+                      "country": q["country"], "format": "jsonv2", "limit": 1}
+            response = self.session.get(self.url, params={k: v for k, v in params.items() if v},
+                                        timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            hits = response.json()
+            results[key] = (round(float(hits[0]["lat"]), 7), round(float(hits[0]["lon"]), 7)) if hits else None
+        return results
+
+
+def make_provider(name, gazetteer=None, session=None):
+    if name == "stub":
+        return StubProvider()
+    if name == "gazetteer":
+        if gazetteer is None:
+            raise ValueError("the gazetteer provider needs a --gazetteer CSV")
+        return GazetteerProvider(gazetteer)
+    if session is None:
+        import requests
+        session = requests.Session()
+        session.headers["User-Agent"] = USER_AGENT
+    if name == "census":
+        return CensusProvider(session)
+    if name == "nominatim":
+        return NominatimProvider(session)
+    raise ValueError(f"unknown geocoding provider {name!r}")
+
+
+def load_cache(path=CACHE_FILE):
+    if path.is_file():
+        try:
+            return json.loads(path.read_text())
+        except json.JSONDecodeError:
+            pass  # start over
+    return {}
+
+
+def save_cache(cache, path=CACHE_FILE):
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(cache, indent=1, sort_keys=True))
+    os.replace(tmp_path, path)
+
+
+def cache_entry(point, provider):
+    lat, lon = point if point else (None, None)
+    return {"lat": lat, "lon": lon, "provider": provider,
+            "resolved_at": datetime.now(timezone.utc).strftime("%Y-%m-%d")}
+
+
+def pending_queries(addresses, cache, retry_failed=False):
+    """{key: query} of distinct addresses with no cache entry (or a failed one)."""
+    queries = {}
+    for row in addresses.drop_duplicates("key").itertuples(index=False):
+        entry = cache.get(row.key)
+        if entry is not None and (entry["lat"] is not None or not retry_failed):
+            continue
+        queries[row.key] = {part: "" if pd.isna(value) else str(value) for part, value in
+                            (("address", row.Address), ("city", row.City), ("state", row.State),
+                             ("country", row.Country))}
+    return queries
+
+
+def geocode(queries, providers, cache, cache_path=CACHE_FILE):
+    """
+    Resolve `queries` through `providers` in order; addresses a provider
+    cannot place (or places outside their state) go on to the next one. The
+    cache is saved after every batch, so an interrupted run keeps its
+    progress. Returns resolved count.
+    """
+    resolved = 0
+    for provider in providers:
+        keys = [k for k in queries if cache.get(k, {}).get("lat") is None]
+        for start in range(0, len(keys), provider.batch_size):
+            batch = {k: queries[k] for k in keys[start:start + provider.batch_size]}
+            for key, point in provider.geocode(batch).items():
+                if not plausible(key, point):
+                    print(f"  {provider.name}: ignoring {point} for {key}, outside its state or country")
+                    point = None
+                if point is not None or key not in cache:
+                    cache[key] = cache_entry(point, provider.name)
+                resolved += point is not None
+            save_cache(cache, cache_path)
+            print(f"  {provider.name}: {min(start + provider.batch_size, len(keys))}/{len(keys)} addresses")
+    return resolved
+
+
+def coordinates(keys, cache):
+    """(Latitude, Longitude) Series for address keys, NaN where not cached."""
+    lat = [cache.get(k, {}).get("lat") for k in keys]
+    lon = [cache.get(k, {}).get("lon") for k in keys]
+    return pd.Series(lat, dtype="float64"), pd.Series(lon, dtype="float64")
+
+
+def add_coordinates(df, cache_path=CACHE_FILE):
+    """
+    Add Latitude/Longitude to a frame with Address, City, State and Country
+    columns from the geocode cache only; uncached addresses stay empty.
+    """
+    keyed = with_keys(df)
+    lat, lon = coordinates(keyed["key"], load_cache(cache_path))
+    df = df.copy()
+    df["Latitude"] = lat.values
+    df["Longitude"] = lon.values
+    return df
+
+
+def seed_cache(addresses, cache, info_file=INFO_FILE):
+    """
+    Cache the coordinates already present in Company-info.csv for uncached
+    addresses. Points outside the address's state (or country) are not
+    cached; returns (seeded count, [(ticker, key) skipped]).
+    """
+    info = pd.read_csv(info_file, usecols=["Ticker", "Latitude", "Longitude"]).dropna()
+    seeded, skipped = 0, []
+    for row in addresses.merge(info, on="Ticker").itertuples(index=False):
+        if row.key in cache:
+            continue
+        if not plausible(row.key, (row.Latitude, row.Longitude)):
+            skipped.append((row.Ticker, row.key))
+            continue
+        cache[row.key] = cache_entry((row.Latitude, row.Longitude), "seed")
+        seeded += 1
+    return seeded, skipped
+
+
+def refresh_keys(values, addresses, cache):
+    """
+    Drop the cache entries named by `values` (address keys or tickers) so they
+    are geocoded again. Returns the keys removed.
+    """
+    by_ticker = dict(zip(addresses["Ticker"], addresses["key"]))
+    removed = []
+    for value in values:
+        key = by_ticker.get(value, value)
+        if cache.pop(key, None) is not None:
+            removed.append(key)
+        else:
+            print(f"  Nothing cached for {value!r}")
+    return removed
+
+
+def implausible_entries(cache):
+    """Cached keys whose point lies outside their state (or country)."""
+    return sorted(key for key, entry in cache.items()
+                  if entry["lat"] is not None and not plausible(key, (entry["lat"], entry["lon"])))
+
+
+def update_info(addresses, cache, info_file=INFO_FILE):
+    """Rewrite the Latitude/Longitude columns of Company-info.csv from the cache."""
+    info = pd.read_csv(info_file)
+    lat, lon = coordinates(addresses["key"], cache)
+    by_ticker = pd.DataFrame({"Latitude": lat.values, "Longitude": lon.values}, index=addresses["Ticker"].values)
+    by_ticker = by_ticker[~by_ticker.index.duplicated()]
+    found = info["Ticker"].isin(by_ticker.index)
+    info.loc[found, "Latitude"] = info.loc[found, "Ticker"].map(by_ticker["Latitude"])
+    info.loc[found, "Longitude"] = info.loc[found, "Ticker"].map(by_ticker["Longitude"])
+    tmp_path = info_file.with_suffix(".tmp")
+    info.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, info_file)
+    return int(info["Latitude"].notna().sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Geocode company headquarters addresses")
+    parser.add_argument("--provider", action="append", choices=["census", "nominatim", "gazetteer", "stub"],
+                        help="Providers to try in order (default: census, then nominatim)")
+    parser.add_argument("--gazetteer", type=Path, help="CSV for the gazetteer provider")
+    parser.add_argument("--cache", type=Path, default=CACHE_FILE, help="Geocode cache file")
+    parser.add_argument("--seed", action="store_true", help="Cache coordinates already in Company-info.csv first")
+    parser.add_argument("--retry-failed", action="store_true", help="Retry addresses no provider could place")
+    parser.add_argument("--refresh", action="append", default=[], metavar="KEY",
+                        help="Geocode this cached address key (or ticker) again; repeatable")
+    parser.add_argument("--refresh-all", action="store_true", help="Ignore the cache and geocode every address")
+    parser.add_argument("--update-info", action="store_true", help="Write the coordinates into Company-info.csv")
+    args = parser.parse_args()
+
+    addresses = load_addresses()
+    cache = {} if args.refresh_all else load_cache(args.cache)
+    if args.refresh:
+        print(f"Refreshing {len(refresh_keys(args.refresh, addresses, cache))} cached addresses")
+    if args.seed:
+        seeded, skipped = seed_cache(addresses, cache)
+        print(f"Seeded {seeded} addresses from {INFO_FILE.name}")
+        for ticker, key in skipped:
+            print(f"  Skipped {ticker}: its coordinates are outside {key}")
+    if args.seed or args.refresh or args.refresh_all:
+        save_cache(cache, args.cache)
+    for key in implausible_entries(cache):
+        print(f"  ! Cached point for {key} is outside its state or country; fix it with --refresh")
+
+    queries = pending_queries(addresses, cache, args.retry_failed)
+    print(f"{len(addresses)} companies, {addresses['key'].nunique()} distinct addresses, {len(queries)} to geocode")
+    if queries:
+        providers = [make_provider(name, args.gazetteer) for name in args.provider or ["census", "nominatim"]]
+        resolved = geocode(queries, providers, cache, args.cache)
+        print(f"✓ Geocoded {resolved}/{len(queries)} addresses")
+
+    if args.update_info:
+        located = update_info(addresses, cache)
+        print(f"✓ Updated {INFO_FILE.name}: {located} companies with coordinates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Incremental daily price ingester for the NASDAQ 100 tickers.
+Keeps each ticker's daily bars in a compact columnar store and only asks the
+provider for bars after the last stored one, so a daily refresh downloads
+days, not years. The yearly and weekly price tables are derived from the
+store instead of being downloaded separately.
+
+Store (raw-data/prices/):
+    <TICKER>.npz     one typed array per column: date, close, volume, dividends, stock_splits
+    index.json       {ticker: {"first", "last", "rows", "shares", "close"}}
+
+Closes are adjusted for splits and dividends, like the committed views, so
+a new split or dividend makes a ticker's stored history stale and it is
+fetched again in full.
+
+Views:
+    raw-data/nasdaq100_yearly_prices.csv   Ticker x year, last close of each year
+    raw-data/nasdaq100_weekly_prices.csv   Date, Ticker, Close, Market Cap, Volume, Dividends, Stock Splits
+
+With --ticker, only those tickers' rows of the views are replaced; every
+other ticker's rows are kept.
+
+--output-dir moves the views (default raw-data/). The stub provider's
+synthetic prices default to a scratch directory for both the store and the
+views (.cache/prices-stub/), and are never written over raw-data/.
+
+    python ingest_prices.py                       # yfinance, incremental
+    python ingest_prices.py --provider stub --full
+    python ingest_prices.py --ticker NVDA --ticker AAPL
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+RAW_DIR = BASE_DIR.parent / "raw-data"
+STORE_DIR = RAW_DIR / "prices"
+SNAPSHOT_FILE = RAW_DIR / "nasdaq100_snapshot.csv"
+YEARLY_FILE = RAW_DIR / "nasdaq100_yearly_prices.csv"
+WEEKLY_FILE = RAW_DIR / "nasdaq100_weekly_prices.csv"
+STUB_DIR = BASE_DIR / ".cache" / "prices-stub"  # store and views of --provider stub
+
+HISTORY_START = "2022-01-01"
+WEEK_ORIGIN = HISTORY_START  # weekly bins are 7 days long, labelled by their first day
+BATCH_SIZE = 25              # tickers per provider call
+CLOSE_BASIS = "adjusted"     # recorded per ticker; stores of another basis are refetched
+
+COLUMNS = {
+    "date": "datetime64[D]",
+    "close": "float64",
+    "volume": "int64",
+    "dividends": "float64",
+    "stock_splits": "float64",
+}
+
+
+class PriceProvider:
+    """
+    A daily bar source. fetch() takes tickers sharing one start date and
+    returns {ticker: DataFrame with the COLUMNS columns}; shares() returns
+    {ticker: shares outstanding} used for the weekly Market Cap.
+    """
+
+    name = "base"
+
+    def fetch(self, tickers, start, end):
+        raise NotImplementedError
+
+    def shares(self, tickers):
+        return {}
+
+
+class YFinanceProvider(PriceProvider):
+    """Yahoo Finance through yfinance; one threaded download per batch of tickers."""
+
+    name = "yfinance"
+
+    def __init__(self):
+        import yfinance as yf
+        self.yf = yf
+
+    def fetch(self, tickers, start, end):
+        # auto_adjust=True: Close is adjusted for splits and dividends, matching the views
+        data = self.yf.download(
+            list(tickers), start=start, end=end + timedelta(days=1), interval="1d",
+            group_by="ticker", actions=True, auto_adjust=True, threads=True, progress=False,
+        )
+        bars = {}
+        for ticker in tickers:
+            if data.empty or ticker not in data.columns.get_level_values(0):
+                continue
+            frame = data[ticker].dropna(subset=["Close"])
+            bars[ticker] = pd.DataFrame({
+                "date": frame.index.tz_localize(None).values.astype("datetime64[D]"),
+                "close": frame["Close"].to_numpy(),
+                "volume": frame["Volume"].fillna(0).to_numpy(),
+                "dividends": frame.get("Dividends", pd.Series(0.0, index=frame.index)).fillna(0).to_numpy(),
+                "stock_splits": frame.get("Stock Splits", pd.Series(0.0, index=frame.index)).fillna(0).to_numpy(),
+            })
+        return bars
+
+    def shares(self, tickers):
+        counts = {}
+        for ticker in tickers:
+            try:
+                counts[ticker] = int(self.yf.Ticker(ticker).fast_info["shares"])
+            except Exception as e:
+                print(f"  ✗ No share count for {ticker}: {e}")
+        return counts
+
+
+class StubProvider(PriceProvider):
+    """Deterministic random-walk bars on weekdays, for offline runs and benchmarks."""
+
+    name = "stub"
+
+    def _seed(self, ticker):
+        return int.from_bytes(hashlib.sha1(ticker.encode()).digest()[:4], "big")
+
+    def fetch(self, tickers, start, end):
+        days = pd.bdate_range(HISTORY_START, end)
+        bars = {}
+        for ticker in tickers:
+            # Separate generators so a bar never depends on how far `end` reaches
+            seed = self._seed(ticker)
+            close = 50 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0.0004, 0.02, len(days))))
+            volume = np.random.default_rng(seed + 1).integers(1_000_000, 50_000_000, len(days))
+            frame = pd.DataFrame({
+                "date": days.values.astype("datetime64[D]"),
+                "close": close,
+                "volume": volume,
+                "dividends": 0.0,
+                "stock_splits": 0.0,
+            })
+            bars[ticker] = frame[frame["date"] >= np.datetime64(start)].reset_index(drop=True)
+        return bars
+
+    def shares(self, tickers):
+        return {t: 100_000_000 + self._seed(t) % 900_000_000 for t in tickers}
+
+
+def make_provider(name):
+    if name == "stub":
+        return StubProvider()
+    if name == "yfinance":
+        return YFinanceProvider()
+    raise ValueError(f"unknown price provider {name!r}")
+
+
+class PriceStore:
+    """Per-ticker columnar files of daily bars plus a JSON index of their extents."""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.json"
+        self.index = json.loads(self.index_path.read_text()) if self.index_path.is_file() else {}
+
+    def path(self, ticker):
+        return self.root / f"{ticker}.npz"
+
+    def read(self, ticker):
+        """Daily bars of a ticker as a DataFrame (empty if never ingested)."""
+        if not self.path(ticker).is_file():
+            return pd.DataFrame({col: np.array([], dtype=dtype) for col, dtype in COLUMNS.items()})
+        with np.load(self.path(ticker)) as arrays:
+            return pd.DataFrame({col: arrays[col] for col in COLUMNS})
+
+    def write(self, ticker, bars):
+        bars = bars.sort_values("date").drop_duplicates("date", keep="last")
+        arrays = {col: bars[col].to_numpy().astype(dtype) for col, dtype in COLUMNS.items()}
+        tmp_path = self.root / f"{ticker}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, self.path(ticker))
+        entry = self.index.setdefault(ticker, {})
+        entry.update(rows=len(bars), close=CLOSE_BASIS)
+        if len(bars):
+            entry.update(first=str(arrays["date"][0]), last=str(arrays["date"][-1]))
+
+    def append(self, ticker, new_bars):
+        """Merge new bars in; bars for dates already stored are replaced."""
+        if new_bars.empty:
+            return 0
+        old = self.read(ticker)
+        old = old[old["date"] < new_bars["date"].min()]
+        self.write(ticker, pd.concat([old, new_bars], ignore_index=True))
+        return len(new_bars)
+
+    def last_date(self, ticker):
+        """Last stored day, or None if the ticker must be fetched from the start."""
+        entry = self.index.get(ticker, {})
+        if entry.get("close") != CLOSE_BASIS:
+            return None
+        return date.fromisoformat(entry["last"]) if entry.get("last") else None
+
+    def set_shares(self, shares):
+        for ticker, count in shares.items():
+            self.index.setdefault(ticker, {})["shares"] = count
+
+    def save_index(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.index, indent=2, sort_keys=True))
+        os.replace(tmp_path, self.index_path)
+
+
+def fetch_plan(store, tickers, end, full=False):
+    """
+    {start date: [tickers]}. Each ticker restarts at its last stored bar, which
+    is refetched because the latest daily bar may have been partial.
+    """
+    plan = {}
+    for ticker in tickers:
+        last = None if full else store.last_date(ticker)
+        start = last or date.fromisoformat(HISTORY_START)
+        if start <= end:
+            plan.setdefault(start, []).append(ticker)
+    return plan
+
+
+def ingest(store, provider, tickers, end, full=False, batch_size=BATCH_SIZE):
+    """
+    Fetch missing bars for `tickers` in batches and append them to the store.
+    A new stock split or dividend changes every earlier adjusted close of that
+    ticker, so its whole history is fetched again. Returns the number of bars
+    stored.
+    """
+    stored = 0
+    refetch = []
+    for start, group in sorted(fetch_plan(store, tickers, end, full).items()):
+        for i in range(0, len(group), batch_size):
+            batch = group[i:i + batch_size]
+            bars = provider.fetch(batch, start, end)
+            for ticker in batch:
+                new = bars.get(ticker)
+                if new is None or new.empty:
+                    continue
+                action = ((new["stock_splits"] > 0) | (new["dividends"] > 0)) & (new["date"] > np.datetime64(start))
+                if store.last_date(ticker) and not full and action.any():
+                    refetch.append(ticker)
+                    continue
+                stored += store.append(ticker, new)
+            store.save_index()
+            print(f"  {provider.name}: {start} +{len(batch)} tickers")
+    if refetch:
+        print(f"  New split or dividend in {', '.join(refetch)}: refetching full history")
+        for i in range(0, len(refetch), batch_size):
+            batch = refetch[i:i + batch_size]
+            bars = provider.fetch(batch, date.fromisoformat(HISTORY_START), end)
+            for ticker in batch:
+                if ticker in bars:
+                    store.write(ticker, bars[ticker])
+                    stored += len(bars[ticker])
+        store.save_index()
+    return stored
+
+
+def yearly_view(store, tickers):
+    """Ticker x year table of each year's last close, like nasdaq100_yearly_prices.csv."""
+    rows = {}
+    for ticker in tickers:
+        bars = store.read(ticker)
+        if bars.empty:
+            continue
+        years = pd.to_datetime(bars["date"]).dt.year
+        rows[ticker] = bars.groupby(years)["close"].last()
+    table = pd.DataFrame(rows).T
+    table.columns = [str(year) for year in table.columns]
+    return table.rename_axis("Ticker").reset_index()
+
+
+def weekly_view(store, tickers, origin=WEEK_ORIGIN):
+    """Weekly Close/Market Cap/Volume/Dividends/Stock Splits per ticker."""
+    frames = []
+    for ticker in tickers:
+        bars = store.read(ticker)
+        if bars.empty:
+            continue
+        offset = (bars["date"] - np.datetime64(origin)).dt.days // 7
+        week = np.datetime64(origin) + pd.to_timedelta(offset * 7, unit="D")
+        weekly = bars.groupby(week, sort=True).agg(
+            {"close": "last", "volume": "sum", "dividends": "sum", "stock_splits": "sum"}
+        )
+        shares = store.index.get(ticker, {}).get("shares")
+        frames.append(pd.DataFrame({
+            "Date": weekly.index.strftime("%Y-%m-%d"),
+            "Ticker": ticker,
+            "Close": weekly["close"].values,
+            "Market Cap": weekly["close"].values * shares if shares else np.nan,
+            "Volume": weekly["volume"].values,
+            "Dividends": weekly["dividends"].values,
+            "Stock Splits": weekly["stock_splits"].values,
+        }))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def merge_view(path, fresh, tickers):
+    """
+    The view in `path` with the rows of `tickers` replaced by `fresh`. Other
+    tickers keep their rows and the file's ticker order; new tickers go last.
+    """
+    if not path.is_file():
+        return fresh
+    existing = pd.read_csv(path)
+    if "Ticker" not in fresh:
+        fresh = existing.iloc[:0]  # nothing stored for these tickers
+    merged = pd.concat([existing[~existing["Ticker"].isin(tickers)], fresh], ignore_index=True)
+    order = {t: i for i, t in enumerate(dict.fromkeys(list(existing["Ticker"]) + list(fresh["Ticker"])))}
+    merged = merged.sort_values("Ticker", key=lambda col: col.map(order), kind="stable")
+    columns = list(existing.columns) + [c for c in fresh.columns if c not in existing.columns]
+    return merged[columns].reset_index(drop=True)
+
+
+def load_tickers(path=SNAPSHOT_FILE):
+    return list(dict.fromkeys(pd.read_csv(path, usecols=["Ticker"])["Ticker"].dropna()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally ingest daily prices and derive price tables")
+    parser.add_argument("--provider", choices=["yfinance", "stub"], default="yfinance")
+    parser.add_argument("--ticker", action="append", help="Only these tickers (default: the snapshot's)")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(), help="Last day to fetch")
+    parser.add_argument("--full", action="store_true", help="Refetch every ticker's whole history")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Tickers per provider call")
+    parser.add_argument("--store", type=Path, default=None,
+                        help=f"Price store directory (default: {STORE_DIR}, or {STUB_DIR} with the stub)")
+    parser.add_argument("--output-dir", type=Path, default=None,
+                        help=f"Folder for the yearly and weekly views (default: {RAW_DIR}, or {STUB_DIR} with the stub)")
+    args = parser.parse_args()
+
+    stub = args.provider == "stub"
+    store_dir = args.store or (STUB_DIR / "store" if stub else STORE_DIR)
+    output_dir = args.output_dir or (STUB_DIR if stub else RAW_DIR)
+    if stub and (output_dir.resolve() == RAW_DIR.resolve() or store_dir.resolve() == STORE_DIR.resolve()):
+        parser.error("the stub provider's synthetic prices would overwrite raw-data/; pick another --output-dir/--store")
+    yearly_file, weekly_file = output_dir / YEARLY_FILE.name, output_dir / WEEKLY_FILE.name
+
+    tickers = args.ticker or load_tickers()
+    store = PriceStore(store_dir)
+    provider = make_provider(args.provider)
+
+    print(f"Ingesting prices for {len(tickers)} tickers...")
+    stored = ingest(store, provider, tickers, args.end, args.full, args.batch_size)
+    missing_shares = [t for t in tickers if "shares" not in store.index.get(t, {})]
+    store.set_shares(provider.shares(missing_shares if not args.full else tickers))
+    store.save_index()
+    print(f"✓ Stored {stored} daily bars")
+
+    yearly = yearly_view(store, tickers)
+    weekly = weekly_view(store, tickers)
+    if args.ticker:
+        yearly = merge_view(yearly_file, yearly, tickers)
+        weekly = merge_view(weekly_file, weekly, tickers)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    yearly.to_csv(yearly_file, index=False)
+    print(f"✓ Created {yearly_file.name} with {len(yearly)} rows")
+    weekly.to_csv(weekly_file, index=False)
+    print(f"✓ Created {weekly_file.name} with {len(weekly)} rows")
+
+
+if __name__ == "__main__":
+    main()
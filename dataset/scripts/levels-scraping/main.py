@@ -4,7 +4,7 @@
 # - If --exists: open company salaries page, detect 404 banner, exit 0/1 accordingly.
 # - Else: collect role links from the company page, visit each role page,
 #   expand the salary table, scrape it, and save CSV under:
-#   data/<company>/<role>/<role>.csv
+#   data/<company>/<role>/<role>.csv  (data/ relative to the cwd, or --data-dir)
 # - Browser is visible (headless=False). All paths/directories are created as needed.
 
 import asyncio
@@ -14,9 +14,24 @@ import json
 import os
 import re
 import sys
+from contextlib import nullcontext
 from urllib.parse import urljoin, urlparse
 from playwright.async_api import async_playwright, TimeoutError as PWTimeoutError
 
+try:
+    # Shared pipeline helpers, importable when run through `python -m marketmap` (see marketmap/cli.py)
+    from marketmap.profiling import add_profile_argument, profiled
+except ImportError:
+    def add_profile_argument(parser):
+        parser.add_argument("--profile", nargs="?", const="", default=None, metavar="RUN_DIR",
+                            help="Unavailable: run through `python -m marketmap` to profile")
+
+    def profiled(stage, profile=None):
+        if profile is not None:
+            print(f"--profile ignored for {stage}: marketmap is not importable, run through `python -m marketmap`",
+                  file=sys.stderr)
+        return nullcontext()
+
 # ---------- Selectors ----------
 SEL_CONTAINER = "div.MuiGrid-root.MuiGrid-container.css-1u20msc"
 SEL_ITEMS = f"{SEL_CONTAINER} > div"
@@ -259,9 +274,9 @@ async def scrape_table_to_csv(page, url: str, csv_path: str, log_case: bool = Fa
     except PWTimeoutError:
         return False
 
-async def scrape_company_benefits(page, company: str):
+async def scrape_company_benefits(page, company: str, data_dir: str = "data"):
     """
-    Scrape all benefit categories and their benefits for a company and write to ./data/<company>/benefits.csv
+    Scrape all benefit categories and their benefits for a company and write to <data_dir>/<company>/benefits.csv
     """
     import csv
     import os
@@ -293,7 +308,7 @@ async def scrape_company_benefits(page, company: str):
                         benefit = (await span_el.inner_text()).strip()
                         results.append({"benefit_category": category, "benefit": benefit})
     # Write to CSV
-    out_dir = os.path.join("data", company)
+    out_dir = os.path.join(data_dir, company)
     os.makedirs(out_dir, exist_ok=True)
     out_path = os.path.join(out_dir, "benefits.csv")
     with open(out_path, "w", newline="", encoding="utf-8") as f:
@@ -301,16 +316,19 @@ async def scrape_company_benefits(page, company: str):
         writer.writeheader()
         writer.writerows(results)
 
-# ---------- Entrypoint ----------
-async def main():
-    parser = argparse.ArgumentParser(description="Scrape Levels.fyi role tables to CSV, or just check if a company exists.")
-    parser.add_argument("company", help="Company slug (e.g., 'shopify')")
-    parser.add_argument("country", help="Country name (e.g., 'canada', 'united states')")
-    parser.add_argument("--limit", type=int, default=10, help="Max number of role links to process")
-    parser.add_argument("--exists", action="store_true", help="Only verify the company page exists; exit 0/1 accordingly")
-    parser.add_argument("--headless", action="store_true", help="Run browser in headless mode (default: False)")
-    args = parser.parse_args()
+def write_summary(path: str, company: str, roles: int, outcomes: dict, data_dir: str = "data"):
+    """
+    Write what this run scraped as JSON for the orchestrator (nasdaq_100_scrape_all.py
+    turns it into metrics): role links found, role pages by outcome, bytes on disk.
+    """
+    company_dir = os.path.join(data_dir, company)
+    bytes_written = sum(os.path.getsize(os.path.join(root, name))
+                        for root, _, names in os.walk(company_dir) for name in names)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"company": company, "roles": roles, "pages": outcomes, "bytes": bytes_written}, f)
 
+# ---------- Entrypoint ----------
+async def scrape_company(args):
     country_slug = slugify(args.country)
 
     async with async_playwright() as p:
@@ -345,13 +363,14 @@ async def main():
             print(json.dumps(roles, indent=2, ensure_ascii=False))
 
             saved = []
+            outcomes = {"table": 0, "median": 0, "range": 0, "failed": 0, "error": 0}
             role_list = list(roles.items())
             total_roles = len(role_list)
             for idx, (role, link) in enumerate(role_list):
                 print(f"\nScraping role {idx+1}/{total_roles}: {role}")
                 print(f"Link: {link}")
                 try:
-                    result = await scrape_table_to_csv(page, link, os.path.join(f"data/{args.company}/{slugify(role)}", f"{slugify(role)}.csv"), log_case=True)
+                    result = await scrape_table_to_csv(page, link, os.path.join(args.data_dir, args.company, slugify(role), f"{slugify(role)}.csv"), log_case=True)
                     if result == "table":
                         print("Detected: table present.")
                     elif result == "median":
@@ -364,16 +383,36 @@ async def main():
                         saved.append(link)
                     elif result is False:
                         print(f"  Failed to scrape role: {role}", file=sys.stderr)
+                    outcomes[result or "failed"] += 1
                 except Exception as e:
                     print(f"  Exception scraping role {role}: {e}", file=sys.stderr)
+                    outcomes["error"] += 1
                     continue
 
             # Scrape company benefits after roles
-            await scrape_company_benefits(page, args.company)
+            await scrape_company_benefits(page, args.company, args.data_dir)
+
+            if args.summary:
+                write_summary(args.summary, args.company, total_roles, outcomes, args.data_dir)
 
         finally:
             # Graceful shutdown
             await browser.close()
 
+async def main():
+    parser = argparse.ArgumentParser(description="Scrape Levels.fyi role tables to CSV, or just check if a company exists.")
+    parser.add_argument("company", help="Company slug (e.g., 'shopify')")
+    parser.add_argument("country", help="Country name (e.g., 'canada', 'united states')")
+    parser.add_argument("--limit", type=int, default=10, help="Max number of role links to process")
+    parser.add_argument("--exists", action="store_true", help="Only verify the company page exists; exit 0/1 accordingly")
+    parser.add_argument("--headless", action="store_true", help="Run browser in headless mode (default: False)")
+    parser.add_argument("--data-dir", default="data", help="Write <company>/ folders here (default: ./data)")
+    parser.add_argument("--summary", default=None, help="Write role and page outcome counts to this JSON file")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled(f"scrape-{args.company}", args.profile):
+        await scrape_company(args)
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,18 +1,47 @@
 import csv
+import json
 import subprocess
 import os
+import shutil
 import sys
 import argparse
+import tempfile
+import time
+
+try:
+    # Shared pipeline helpers, importable when run through `python -m marketmap` (see marketmap/cli.py)
+    from marketmap import stage_env
+    from marketmap.metrics import BYTES_WRITTEN, COUNT_BUCKETS, REGISTRY, add_metrics_arguments, exported, timed
+    from marketmap.profiling import add_profile_argument, profiled, resolve_run_dir
+except ImportError:
+    sys.exit('nasdaq_100_scrape_all.py reports metrics through marketmap: '
+             'run `python -m marketmap scrape roles` from dataset/scripts')
 
 CSV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'nasdaq_100_levels.csv'))
 MAIN_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'main.py'))
 
-def main():
-    parser = argparse.ArgumentParser(description='Run main.py for all companies in CSV that have not been scraped.')
-    parser.add_argument('--limit', type=int, default=10, help='Max number of role links to process (passed to main.py)')
-    parser.add_argument('--headless', action='store_true', help='Run browser in headless mode (passed to main.py)')
-    args = parser.parse_args()
+COMPANIES = REGISTRY.counter('marketmap_scrape_companies', 'Companies processed, by result (scraped, failed, error, skipped)', ['outcome'])
+COMPANIES_REMAINING = REGISTRY.gauge('marketmap_scrape_companies_remaining', 'Companies left in this run')
+COMPANY_SECONDS = REGISTRY.histogram('marketmap_scrape_company_seconds', 'Time to scrape one company',
+                                     buckets=(10, 30, 60, 120, 180, 300, 600, 1200))
+PAGES = REGISTRY.counter('marketmap_scrape_pages', 'Role pages scraped, by what was found on them', ['outcome'])
+ROLES = REGISTRY.histogram('marketmap_scrape_roles_per_company', 'Role links found per company',
+                           buckets=COUNT_BUCKETS)
+
+
+def record_summary(path):
+    """Fold a main.py --summary file into the metrics; missing if main.py failed early."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return
+    ROLES.observe(summary['roles'])
+    for outcome, count in summary['pages'].items():
+        PAGES.inc(count, outcome=outcome)
+    BYTES_WRITTEN.inc(summary['bytes'], stage='scrape', file='data')
 
+def scrape_all(args, run_dir=None):
     # Read CSV and add 'scraped' and 'skip' columns if missing, set all to 'false' if new
     with open(CSV_PATH, newline='', encoding='utf-8') as f:
         reader = list(csv.DictReader(f))
@@ -47,6 +76,8 @@ def main():
     # For each row with 'scraped' == 'false', run main.py
     total_companies = sum(1 for row in rows if row.get('scraped', 'false') == 'false' and row.get('skip', 'false') != 'true' and row.get('exists-on-levels', 'false') == 'true')
     company_counter = 0
+    COMPANIES_REMAINING.set(total_companies)
+    summary_path = os.path.join(tempfile.mkdtemp(prefix='scrape-all-'), 'summary.json')
     for i, row in enumerate(rows):
         if row.get('scraped', 'false') == 'true':
             continue
@@ -61,24 +92,52 @@ def main():
         country = row.get('country', '').strip()
         if not country or country == 'unknown':
             print(f"Skipping {company}: country unknown.")
+            COMPANIES.inc(outcome='skipped')
+            COMPANIES_REMAINING.dec()
             continue
         print(f"Scraping company {company_counter}/{total_companies}: {company} ({country})")
-        cmd = [sys.executable, MAIN_PATH, company, country, '--limit', str(args.limit)]
+        cmd = [sys.executable, MAIN_PATH, company, country, '--limit', str(args.limit), '--summary', summary_path]
         if args.headless:
             cmd.append('--headless')
+        if run_dir is not None:
+            cmd += ['--profile', str(run_dir)]
+        if os.path.exists(summary_path):
+            os.remove(summary_path)
+        started = time.perf_counter()
         try:
-            result = subprocess.run(cmd, text=True)
+            result = subprocess.run(cmd, text=True, env=stage_env())
             if result.returncode == 0:
                 rows[i]['scraped'] = 'true'
+                COMPANIES.inc(outcome='scraped')
             else:
                 print(f"  main.py failed for {company}", file=sys.stderr)
+                COMPANIES.inc(outcome='failed')
         except Exception as e:
             print(f"  Error scraping {company}: {e}")
+            COMPANIES.inc(outcome='error')
+        COMPANY_SECONDS.observe(time.perf_counter() - started)
+        COMPANIES_REMAINING.dec()
+        record_summary(summary_path)
         # Write after each check to persist progress
         with open(CSV_PATH, 'w', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
             writer.writerows(rows)
+    shutil.rmtree(os.path.dirname(summary_path), ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Run main.py for all companies in CSV that have not been scraped.')
+    parser.add_argument('--limit', type=int, default=10, help='Max number of role links to process (passed to main.py)')
+    parser.add_argument('--headless', action='store_true', help='Run browser in headless mode (passed to main.py)')
+    add_metrics_arguments(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    # One run directory for this process and every main.py it starts
+    run_dir = resolve_run_dir(args.profile)
+    with profiled('scrape-all', None if run_dir is None else str(run_dir)), \
+            exported(args.metrics_port, args.metrics_file, stage='scrape-all'), timed('scrape-all', 'total'):
+        scrape_all(args, run_dir)
 
 if __name__ == '__main__':
     main()
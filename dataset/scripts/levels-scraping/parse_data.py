@@ -2,6 +2,22 @@ import os
 import csv
 import argparse
 import re
+import sys
+from contextlib import nullcontext
+
+try:
+    # Shared pipeline helpers, importable when run through `python -m marketmap` (see marketmap/cli.py)
+    from marketmap.profiling import add_profile_argument, profiled
+except ImportError:
+    def add_profile_argument(parser):
+        parser.add_argument('--profile', nargs='?', const='', default=None, metavar='RUN_DIR',
+                            help='Unavailable: run through `python -m marketmap` to profile')
+
+    def profiled(stage, profile=None):
+        if profile is not None:
+            print(f"--profile ignored for {stage}: marketmap is not importable, run through `python -m marketmap`",
+                  file=sys.stderr)
+        return nullcontext()
 
 # Output columns
 OUTPUT_COLS = [
@@ -162,68 +178,81 @@ def parse_benefits_csv(path):
         return out
 
 
+# Parse one company folder into output rows for salaries and benefits
+def parse_company(company_dir, company, company_info):
+    rows = []
+    benefits = []
+    cslug = company.strip().lower().replace(' ', '-')
+    cinfo = company_info.get(cslug, {})
+    # Salaries under role subfolders
+    for role in os.listdir(company_dir):
+        role_dir = os.path.join(company_dir, role)
+        if not os.path.isdir(role_dir):
+            continue
+        csv_path = os.path.join(role_dir, f'{role}.csv')
+        if not os.path.isfile(csv_path):
+            continue
+        parsed = parse_salary_csv(csv_path, role)
+        for row in parsed:
+            out_row = {col: '' for col in OUTPUT_COLS}
+            out_row['company name'] = cinfo.get('company name', company)
+            out_row['company ticker'] = cinfo.get('company ticker', '')
+            out_row['company location'] = cinfo.get('company location', '')
+            for k, v in row.items():
+                if k in out_row:
+                    out_row[k] = v
+            rows.append(out_row)
+    # Benefits at company root
+    benefits_path = os.path.join(company_dir, 'benefits.csv')
+    if os.path.isfile(benefits_path):
+        parsed_b = parse_benefits_csv(benefits_path)
+        for row in parsed_b:
+            out_b = {col: '' for col in BENEFIT_OUTPUT_COLS}
+            out_b['company name'] = cinfo.get('company name', company)
+            out_b['company ticker'] = cinfo.get('company ticker', '')
+            out_b['company location'] = cinfo.get('company location', '')
+            out_b['benefit category'] = row.get('benefit category', '')
+            out_b['benefit'] = row.get('benefit', '')
+            benefits.append(out_b)
+    return rows, benefits
+
+
 def main():
     parser = argparse.ArgumentParser(description='Combine all role salary CSVs and benefits CSVs into unified outputs')
     parser.add_argument('root', help='Root folder to search for company data')
+    parser.add_argument('--company-csv', default=os.path.join(os.path.dirname(__file__), 'nasdaq_100_levels.csv'),
+                        help='Company list with names, tickers and countries')
+    parser.add_argument('--output-dir', default='.', help='Where to write salaries.csv and benefits.csv')
+    add_profile_argument(parser)
     args = parser.parse_args()
 
-    # Read company info
-    company_info = read_company_info(os.path.join(os.path.dirname(__file__), 'nasdaq_100_levels.csv'))
+    with profiled('parse', args.profile):
+        # Read company info
+        company_info = read_company_info(args.company_csv)
 
-    # Combine salaries
-    all_rows = []
-    # Combine benefits
-    all_benefits = []
+        # Combine salaries
+        all_rows = []
+        # Combine benefits
+        all_benefits = []
 
-    for company in os.listdir(args.root):
-        company_dir = os.path.join(args.root, company)
-        if not os.path.isdir(company_dir):
-            continue
-        # Salaries under role subfolders
-        for role in os.listdir(company_dir):
-            role_dir = os.path.join(company_dir, role)
-            if not os.path.isdir(role_dir):
-                continue
-            csv_path = os.path.join(role_dir, f'{role}.csv')
-            if not os.path.isfile(csv_path):
+        for company in os.listdir(args.root):
+            company_dir = os.path.join(args.root, company)
+            if not os.path.isdir(company_dir):
                 continue
-            parsed = parse_salary_csv(csv_path, role)
-            for row in parsed:
-                out_row = {col: '' for col in OUTPUT_COLS}
-                cslug = company.strip().lower().replace(' ', '-')
-                cinfo = company_info.get(cslug, {})
-                out_row['company name'] = cinfo.get('company name', company)
-                out_row['company ticker'] = cinfo.get('company ticker', '')
-                out_row['company location'] = cinfo.get('company location', '')
-                for k, v in row.items():
-                    if k in out_row:
-                        out_row[k] = v
-                all_rows.append(out_row)
-        # Benefits at company root
-        benefits_path = os.path.join(company_dir, 'benefits.csv')
-        if os.path.isfile(benefits_path):
-            parsed_b = parse_benefits_csv(benefits_path)
-            cslug = company.strip().lower().replace(' ', '-')
-            cinfo = company_info.get(cslug, {})
-            for row in parsed_b:
-                out_b = {col: '' for col in BENEFIT_OUTPUT_COLS}
-                out_b['company name'] = cinfo.get('company name', company)
-                out_b['company ticker'] = cinfo.get('company ticker', '')
-                out_b['company location'] = cinfo.get('company location', '')
-                out_b['benefit category'] = row.get('benefit category', '')
-                out_b['benefit'] = row.get('benefit', '')
-                all_benefits.append(out_b)
-
-    # Write outputs
-    with open('salaries.csv', 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=OUTPUT_COLS)
-        writer.writeheader()
-        writer.writerows(all_rows)
-
-    with open('benefits.csv', 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=BENEFIT_OUTPUT_COLS)
-        writer.writeheader()
-        writer.writerows(all_benefits)
+            rows, benefits = parse_company(company_dir, company, company_info)
+            all_rows.extend(rows)
+            all_benefits.extend(benefits)
+
+        # Write outputs
+        with open(os.path.join(args.output_dir, 'salaries.csv'), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=OUTPUT_COLS)
+            writer.writeheader()
+            writer.writerows(all_rows)
+
+        with open(os.path.join(args.output_dir, 'benefits.csv'), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=BENEFIT_OUTPUT_COLS)
+            writer.writeheader()
+            writer.writerows(all_benefits)
 
 if __name__ == '__main__':
     main()
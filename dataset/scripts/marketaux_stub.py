@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the MarketAux /v1/news/all endpoint.
+Serves deterministic fake articles so nasdag100_sentiment.py can be run
+end-to-end without spending API quota:
+
+    python marketaux_stub.py --port 8765 --quota 500 --error-rate 0.05
+    python nasdag100_sentiment.py --base-url http://127.0.0.1:8765/v1/news/all
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Tickers that get many articles per week, to exercise the per-call limit
+BUSY_TICKERS = {"AAPL", "NVDA", "MSFT", "AMZN", "TSLA", "META", "GOOG"}
+BUSY_ARTICLES_PER_WEEK = 40
+QUIET_ARTICLES_PER_WEEK = 3
+MAX_LIMIT = 50
+QUOTA_HEADER = "X-UsageLimit-Remaining"  # sent with --quota; read by nasdag100_sentiment.py
+
+
+def seeded(*parts):
+    """Deterministic RNG for a given set of request parts."""
+    digest = hashlib.sha1("|".join(parts).encode()).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def articles_for(symbol, start, end):
+    """All fake articles mentioning `symbol` published in [start, end]."""
+    rng = seeded(symbol, start.date().isoformat())
+    count = BUSY_ARTICLES_PER_WEEK if symbol in BUSY_TICKERS else QUIET_ARTICLES_PER_WEEK
+    span = max((end - start).total_seconds(), 1)
+    out = []
+    for i in range(rng.randint(0, count)):
+        published = start + timedelta(seconds=rng.uniform(0, span))
+        out.append({
+            "uuid": f"{symbol}-{start.date().isoformat()}-{i}",
+            "published_at": published.strftime("%Y-%m-%dT%H:%M:%S.000000Z"),
+            "entities": [{"symbol": symbol, "sentiment_score": round(rng.uniform(-1, 1), 4)}],
+        })
+    return out
+
+
+class StubState:
+    def __init__(self, quota, error_rate, seed):
+        self.quota = quota
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.served = 0  # 200 responses, i.e. calls that cost quota
+        self.lock = threading.Lock()
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/v1/news/all":
+                self.send_json(404, {"error": {"code": "not_found"}})
+                return
+
+            with state.lock:
+                state.requests += 1
+                over_quota = state.quota is not None and state.requests > state.quota
+                flaky = state.rng.random() < state.error_rate
+            if over_quota:
+                self.send_json(402, {"error": {"code": "usage_limit_reached"}})
+                return
+            if flaky:
+                self.send_json(429, {"error": {"code": "rate_limit_reached"}}, {"Retry-After": "1"})
+                return
+
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            symbols = [s for s in query.get("symbols", "").split(",") if s]
+            start = datetime.fromisoformat(query["published_after"])
+            end = datetime.fromisoformat(query["published_before"])
+            limit = min(int(query.get("limit", MAX_LIMIT)), MAX_LIMIT)
+            page = int(query.get("page", 1))
+
+            found = sorted((a for s in symbols for a in articles_for(s, start, end)),
+                           key=lambda a: a["published_at"], reverse=True)
+            data = found[(page - 1) * limit:page * limit]
+            with state.lock:
+                state.served += 1
+            headers = {}
+            if state.quota is not None:
+                headers[QUOTA_HEADER] = str(max(state.quota - state.requests, 0))
+            self.send_json(200, {
+                "meta": {"found": len(found), "returned": len(data), "limit": limit, "page": page},
+                "data": data,
+            }, headers)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake MarketAux responses on localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--quota", type=int, default=None, help="Answer 402 after this many requests")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(StubState(args.quota, args.error_rate, args.seed)))
+    print(f"MarketAux stub listening on http://127.0.0.1:{args.port}/v1/news/all")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+MarketMap data pipeline as an importable package.
+
+The stage scripts stay where they are (dataset/scripts, levels-scraping/,
+dataset/logos/) and keep working standalone; this package only registers
+them and loads each one on demand, so importing `marketmap` or running
+`python -m marketmap --help` never pulls in pandas, playwright or yfinance.
+
+    from marketmap import run_stage
+    run_stage("classify", ["--no-cache"])
+"""
+
+from .cli import STAGES, load_stage, main, run_stage, stage_env
+
+__all__ = ["STAGES", "load_stage", "main", "run_stage", "stage_env"]
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the MarketMap pipeline stages:
+
+    python -m marketmap scrape [countries|exists|roles] [--limit N --headless]
+    python -m marketmap parse data/
+    python -m marketmap consolidate
+    python -m marketmap classify --no-cache
+    python -m marketmap sentiment --base-url http://127.0.0.1:8765/v1/news/all
+    python -m marketmap logos --workers 16
+    python -m marketmap pipeline --no-scrape
+
+Everything after the subcommand is passed to the stage's own argument
+parser. A stage module is imported only when its subcommand runs, and it
+runs from its script's directory, since several stages read and write paths
+relative to where they live. Every stage accepts `--profile [RUN_DIR]`
+(see profiling.py).
+
+Scripts outside dataset/scripts (levels-scraping/, logos/) import marketmap
+only when it is importable: through this entry point, or as a subprocess
+started with stage_env(). Run directly, they still accept --profile but say
+that profiling is unavailable.
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = BASE_DIR.parent
+DATASET_DIR = SCRIPTS_DIR.parent
+
+# stage -> (script, help); scrape has one script per step
+STAGES = {
+    "scrape": ({
+        "countries": SCRIPTS_DIR / "levels-scraping" / "nasdaq_100_country_lookup.py",
+        "exists": SCRIPTS_DIR / "levels-scraping" / "nasdaq_100_levels_exists_check.py",
+        "roles": SCRIPTS_DIR / "levels-scraping" / "nasdaq_100_scrape_all.py",
+    }, "Scrape levels.fyi: look up countries, check companies exist, scrape role tables"),
+    "parse": (SCRIPTS_DIR / "levels-scraping" / "parse_data.py", "Combine scraped role and benefit CSVs"),
+    "consolidate": (SCRIPTS_DIR / "consolidate_data.py", "Build the cleaned Company-*.csv datasets"),
+    "classify": (SCRIPTS_DIR / "benefits_classifier.py", "Classify benefits for the benefits vis"),
+    "sentiment": (SCRIPTS_DIR / "nasdag100_sentiment.py", "Backfill weekly MarketAux sentiment"),
+    "logos": (DATASET_DIR / "logos" / "scrape.py", "Download company logos"),
+    "pipeline": (SCRIPTS_DIR / "stream_pipeline.py", "Scrape, parse, normalize and classify company by company"),
+}
+DEFAULT_SCRAPE_STEP = "roles"
+
+
+def stage_script(stage, step=None):
+    script, _ = STAGES[stage]
+    if isinstance(script, dict):
+        return script[step or DEFAULT_SCRAPE_STEP]
+    return script
+
+
+def load_stage(stage, step=None):
+    """
+    Import a stage script as a module. Its directory goes on sys.path first,
+    so the script's own sibling imports (e.g. `from sentiment_store import ...`)
+    resolve exactly as when it is run directly.
+    """
+    script = stage_script(stage, step)
+    name = f"marketmap_{stage}" + (f"_{step}" if step else "")
+    if name in sys.modules:
+        return sys.modules[name]
+    script_dir = str(script.parent)
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    spec = importlib.util.spec_from_file_location(name, script)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+def stage_env(env=None):
+    """
+    Environment for a stage script started as a subprocess (e.g. main.py from
+    nasdaq_100_scrape_all.py), with marketmap importable wherever it lives.
+    """
+    env = dict(os.environ if env is None else env)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SCRIPTS_DIR), env.get("PYTHONPATH")]))
+    return env
+
+
+@contextmanager
+def stage_context(script, argv):
+    """Run with the stage's directory as cwd and `argv` as its command line."""
+    saved_cwd, saved_argv = os.getcwd(), sys.argv
+    os.chdir(script.parent)
+    sys.argv = [script.name] + list(argv)
+    try:
+        yield
+    finally:
+        os.chdir(saved_cwd)
+        sys.argv = saved_argv
+
+
+def run_stage(stage, argv=(), step=None):
+    """Run one stage's main() in-process with the given arguments."""
+    if stage not in STAGES:
+        raise KeyError(f"unknown stage {stage!r}")
+    module = load_stage(stage, step)
+    with stage_context(stage_script(stage, step), argv):
+        return module.main()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="marketmap", description="Run a MarketMap pipeline stage")
+    sub = parser.add_subparsers(dest="stage", required=True)
+    for stage, (script, help_text) in STAGES.items():
+        stage_parser = sub.add_parser(stage, help=help_text, add_help=False)
+        if isinstance(script, dict):
+            stage_parser.add_argument("step", nargs="?", choices=sorted(script), default=DEFAULT_SCRAPE_STEP)
+    # Anything not consumed here (including --help) belongs to the stage script
+    args, stage_argv = parser.parse_known_args(argv)
+
+    run_stage(args.stage, stage_argv, getattr(args, "step", None))
+
+
+if __name__ == "__main__":
+    main()
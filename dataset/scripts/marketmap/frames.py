@@ -0,0 +1,154 @@
+"""
+Parsed-frame cache shared by the pipeline stages.
+
+`read_csv(path, **kwargs)` is a drop-in for `pd.read_csv` that keeps the
+parsed frame in a binary cache next to the CSV:
+
+    <csv dir>/.cache/frames/<csv name>.<options hash>/
+        meta.json     source size, mtime and sha256, read_csv options, pandas version
+        <n>.npy       numeric / bool / datetime columns, one array per dtype, memory-mapped on load
+        frame.pkl     column labels, index, column layout, and every other column
+                      (strings, categoricals, nullable dtypes)
+
+A cache entry is keyed by the read_csv options (dtype spec, usecols, ...)
+and validated against the file's sha256, so an edited CSV is re-parsed and
+its cache rebuilt on the next read. The hash is only recomputed when the
+file's size or mtime changed. Warm loads map numeric columns straight from
+the page cache without copying, so stages that run one after another share
+the memory instead of each parsing its own copy.
+
+Set MARKETMAP_FRAME_CACHE=0 to always parse.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ENV_VAR = "MARKETMAP_FRAME_CACHE"
+CACHE_DIR = Path(".cache") / "frames"  # relative to each CSV's directory
+FORMAT_VERSION = 1
+NUMPY_KINDS = "biufcmM"  # dtypes saved as .npy: bool, ints, floats, complex, timedelta, datetime
+
+# read_csv options that do not return one frame, or cannot be keyed reliably
+UNCACHEABLE = {"chunksize", "iterator", "converters", "date_parser", "date_format", "skiprows", "storage_options"}
+
+
+def enabled():
+    return os.environ.get(ENV_VAR, "1") not in ("0", "false", "no")
+
+
+def options_spec(kwargs):
+    """Stable JSON for the read_csv options; None if they cannot be cached."""
+    if UNCACHEABLE & set(kwargs):
+        return None
+
+    def default(value):
+        if isinstance(value, (type, np.dtype, pd.api.extensions.ExtensionDtype)):
+            return str(value)
+        if isinstance(value, (set, frozenset)):
+            return sorted(map(str, value))
+        raise TypeError(type(value).__name__)
+
+    try:
+        return json.dumps(kwargs, sort_keys=True, default=default)
+    except TypeError:
+        return None
+
+
+def file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def entry_dir(path, spec):
+    key = hashlib.sha256(spec.encode()).hexdigest()[:12]
+    return path.parent / CACHE_DIR / f"{path.name}.{key}"
+
+
+def write_entry(df, entry, meta):
+    """Write the frame into a temporary directory and swap it in as `entry`."""
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=entry.name + ".", suffix=".tmp", dir=entry.parent))
+    try:
+        # Numeric columns of one dtype share a (columns, rows) array, so each column is a contiguous row of it
+        layout, by_dtype, other = [], {}, {}
+        for i in range(df.shape[1]):
+            col = df.iloc[:, i]
+            if isinstance(col.dtype, np.dtype) and col.dtype.kind in NUMPY_KINDS:
+                arrays = by_dtype.setdefault(col.dtype.str, [])
+                layout.append((col.dtype.str, len(arrays)))
+                arrays.append(col.to_numpy())
+            else:
+                layout.append((None, i))
+                other[i] = col.array
+        files = {}
+        for n, (dtype, arrays) in enumerate(by_dtype.items()):
+            files[dtype] = f"{n}.npy"
+            np.save(tmp_dir / files[dtype], np.stack(arrays), allow_pickle=False)
+        with open(tmp_dir / "frame.pkl", "wb") as f:
+            pickle.dump({"columns": df.columns, "index": df.index, "layout": layout, "files": files, "other": other},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+
+        if entry.exists():
+            shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp_dir, entry)
+    except OSError:
+        # Another process swapped in the same entry first; theirs is as good
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def load_entry(entry):
+    with open(entry / "frame.pkl", "rb") as f:
+        frame = pickle.load(f)
+    # Copy-on-write mappings: pages are shared until a caller modifies the frame, and writes
+    # never reach the cache file. Plain ndarray views, so no np.memmap subclass leaks out.
+    arrays = {dtype: np.load(entry / name, mmap_mode="c").view(np.ndarray) for dtype, name in frame["files"].items()}
+    data = {i: frame["other"][row] if dtype is None else arrays[dtype][row]
+            for i, (dtype, row) in enumerate(frame["layout"])}
+    df = pd.DataFrame(data, index=frame["index"], copy=False)
+    df.columns = frame["columns"]
+    return df
+
+
+def read_csv(path, **kwargs):
+    """`pd.read_csv(path, **kwargs)`, answered from the frame cache when it is current."""
+    path = Path(path)
+    spec = options_spec(kwargs) if enabled() else None
+    if spec is None:
+        return pd.read_csv(path, **kwargs)
+
+    stat = path.stat()
+    entry = entry_dir(path, spec)
+    meta = {"version": FORMAT_VERSION, "pandas": pd.__version__, "source": path.name, "options": spec,
+            "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    try:
+        cached = json.loads((entry / "meta.json").read_text())
+    except (OSError, ValueError):
+        cached = None
+
+    if cached is not None and all(cached.get(k) == meta[k] for k in ("version", "pandas", "options")):
+        same_stat = cached["size"] == meta["size"] and cached["mtime_ns"] == meta["mtime_ns"]
+        if same_stat or cached["sha256"] == file_sha256(path):
+            try:
+                df = load_entry(entry)
+            except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+                df = None  # half-removed or corrupt entry: parse and rebuild below
+            if df is not None:
+                if not same_stat:
+                    # Touched but unchanged: remember the new mtime so the next read skips hashing
+                    cached.update(size=meta["size"], mtime_ns=meta["mtime_ns"])
+                    (entry / "meta.json").write_text(json.dumps(cached, indent=2))
+                return df
+
+    meta["sha256"] = file_sha256(path)
+    df = pd.read_csv(path, **kwargs)
+    write_entry(df, entry, meta)
+    return df
@@ -0,0 +1,305 @@
+"""
+OpenMetrics export for long-running pipeline stages.
+
+Stages register counters, gauges and histograms on the shared REGISTRY and
+update them as they go. With `--metrics-port` the registry is served at
+http://127.0.0.1:<port>/metrics while the stage runs; with `--metrics-file`
+it is rewritten (atomically) every few seconds and once more on exit, for
+node_exporter's textfile collector or anything else that tails a file.
+
+    from marketmap.metrics import REGISTRY, add_metrics_arguments, exported
+
+    PAGES = REGISTRY.counter("marketmap_scrape_pages", "Role pages scraped", ["outcome"])
+    ...
+    with exported(args.metrics_port, args.metrics_file):
+        PAGES.inc(outcome="table")
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+WRITE_INTERVAL = 5.0  # seconds between textfile rewrites
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels):
+    labels = list(labels)
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels) + "}"
+
+
+class Metric:
+    """One metric family; samples are keyed by their label values."""
+
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# TYPE {self.name} {self.kind}", f"# HELP {self.name} {self.help}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("counters only go up")
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}_total{format_labels(zip(self.labelnames, key))} {format_value(value)}"
+                for key, value in items]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.functions = {}
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn, **labels):
+        """Read the value from `fn()` at export time (e.g. a queue's qsize)."""
+        key = self.key(labels)
+        with self.lock:
+            self.functions[key] = fn
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+            functions = dict(self.functions)
+        for key, fn in functions.items():
+            values[key] = fn()
+        return [f"{self.name}{format_labels(zip(self.labelnames, key))} {format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self.lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self.values.items())
+        lines = []
+        for key, (counts, total) in items:
+            labels = list(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{format_labels(labels + [('le', format_value(float(bound)))])} {count}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {counts[-1]}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(total)}")
+        return lines
+
+
+class Registry:
+    """Metric families by name. Asking for an existing name returns that family."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, cls, name, help_text, labelnames=(), **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"{name} is already registered as a different metric")
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self.register(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS):
+        return self.register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.header() + metric.samples()
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Shared by every stage, so dashboards can compare them
+STAGE_SECONDS = REGISTRY.gauge("marketmap_stage_duration_seconds", "Wall time of the last run of a stage step",
+                               ["stage", "step"])
+BYTES_WRITTEN = REGISTRY.counter("marketmap_bytes_written", "Bytes written to output files", ["stage", "file"])
+ROWS_WRITTEN = REGISTRY.counter("marketmap_rows_written", "Rows written to output files", ["stage", "file"])
+STAGE_UP = REGISTRY.gauge("marketmap_stage_running", "1 while the stage is running", ["stage"])
+
+
+@contextmanager
+def timed(stage, step):
+    """Record the wall time of a step in marketmap_stage_duration_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.set(round(time.perf_counter() - start, 4), stage=stage, step=step)
+
+
+class StepTimer:
+    """Durations of consecutive steps: mark(step) records the time since the previous mark."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.last = time.perf_counter()
+
+    def mark(self, step):
+        now = time.perf_counter()
+        STAGE_SECONDS.set(round(now - self.last, 4), stage=self.stage, step=step)
+        self.last = now
+
+
+def record_write(stage, path, rows=None):
+    """Count a finished output file in marketmap_bytes_written (and _rows_written)."""
+    path = Path(path)
+    if path.is_file():
+        BYTES_WRITTEN.inc(path.stat().st_size, stage=stage, file=path.name)
+    if rows is not None:
+        ROWS_WRITTEN.inc(rows, stage=stage, file=path.name)
+
+
+def make_handler(registry):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def write_textfile(registry, path):
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(registry.render(), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def add_metrics_arguments(parser):
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve OpenMetrics at http://127.0.0.1:PORT/metrics while running")
+    parser.add_argument("--metrics-file", type=Path, default=None,
+                        help="Rewrite OpenMetrics text to this file every few seconds (textfile collector)")
+
+
+@contextmanager
+def exported(port=None, path=None, stage=None, registry=REGISTRY, interval=WRITE_INTERVAL):
+    """Export `registry` over HTTP and/or to a file for the duration of the block."""
+    server = writer = None
+    stop = threading.Event()
+    if stage is not None:
+        STAGE_UP.set(1, stage=stage)
+    if port is not None:
+        server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(registry))
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"Metrics at http://127.0.0.1:{server.server_address[1]}/metrics")
+    if path is not None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        def write_periodically():
+            while not stop.wait(interval):
+                write_textfile(registry, path)
+
+        write_textfile(registry, path)
+        writer = threading.Thread(target=write_periodically, name="metrics-file", daemon=True)
+        writer.start()
+    try:
+        yield registry
+    finally:
+        if stage is not None:
+            STAGE_UP.set(0, stage=stage)
+        stop.set()
+        if writer is not None:
+            writer.join()
+            write_textfile(registry, path)
+        if server is not None:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,198 @@
+"""
+Opt-in CPU and memory profiling shared by the pipeline stages.
+
+Every stage accepts `--profile [RUN_DIR]` and wraps its work in
+`profiled(stage, args.profile)`, which writes into the run directory:
+
+    <stage>.pstats   cProfile dump (all threads, see ThreadProfiles), for `python -m pstats` or snakeviz
+    <stage>.txt      top functions by cumulative time and top allocation sites
+    <stage>.json     wall/CPU time, tracemalloc peak, the same top lists
+    summary.txt      one line per stage profiled into this directory
+    summary.json
+
+Stages that share a run directory (pass the same RUN_DIR, or set
+MARKETMAP_PROFILE_DIR) end up in one combined summary; without either,
+each run gets a fresh .profiles/<timestamp>/ directory.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+PROFILES_DIR = BASE_DIR.parent / ".profiles"
+ENV_VAR = "MARKETMAP_PROFILE_DIR"
+
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 15
+TRACE_FRAMES = 4  # stack depth kept per allocation; deeper is slower
+
+# From 3.12 cProfile hooks sys.monitoring, which is process-wide: the main
+# thread's profiler already sees every thread, and a second one cannot start
+PER_THREAD = sys.version_info < (3, 12)
+
+
+def add_profile_argument(parser):
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="RUN_DIR",
+                        help=f"Profile CPU and memory into RUN_DIR (default: ${ENV_VAR} or a new .profiles/<timestamp>/)")
+
+
+def resolve_run_dir(value):
+    """RUN_DIR for a --profile value: None (not profiling), "" (default) or a path."""
+    if value is None:
+        return None
+    if value:
+        return Path(value)
+    if os.environ.get(ENV_VAR):
+        return Path(os.environ[ENV_VAR])
+    return PROFILES_DIR / time.strftime("%Y%m%d-%H%M%S")
+
+
+def write_atomic(path, text):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class ThreadProfiles:
+    """
+    Before 3.12 cProfile only sees the thread that enabled it, so every
+    thread started while this is installed gets its own profiler; merged
+    into one Stats. On 3.12+ (PER_THREAD false) installing is a no-op.
+    """
+
+    def __init__(self):
+        self.profiles = []
+        self.lock = threading.Lock()
+
+    def hook(self, *_):
+        # First profile event in a new thread: swap this hook for a real profiler
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with self.lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def install(self):
+        if PER_THREAD:
+            threading.setprofile(self.hook)
+
+    def uninstall(self):
+        if PER_THREAD:
+            threading.setprofile(None)
+
+
+def top_functions(stats, limit=TOP_FUNCTIONS):
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({"function": f"{Path(filename).name}:{line}({name})", "calls": calls,
+                     "tottime": round(tottime, 4), "cumtime": round(cumtime, 4)})
+    rows.sort(key=lambda r: r["cumtime"], reverse=True)
+    return rows[:limit]
+
+
+def top_allocations(snapshot, limit=TOP_ALLOCATIONS):
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    return [{"site": f"{Path(stat.traceback[0].filename).name}:{stat.traceback[0].lineno}",
+             "bytes": stat.size, "blocks": stat.count}
+            for stat in snapshot.statistics("lineno")[:limit]]
+
+
+def format_report(record):
+    lines = [
+        f"stage      {record['stage']}",
+        f"command    {' '.join(record['argv'])}",
+        f"wall       {record['wall_s']:.3f} s",
+        f"cpu        {record['cpu_s']:.3f} s",
+        f"peak mem   {record['peak_bytes'] / 2**20:.1f} MiB (tracemalloc)",
+        "",
+        f"{'cumtime':>9} {'tottime':>9} {'calls':>9}  function",
+    ]
+    lines += [f"{r['cumtime']:9.3f} {r['tottime']:9.3f} {r['calls']:9d}  {r['function']}" for r in record["functions"]]
+    lines += ["", f"{'KiB':>9} {'blocks':>9}  allocation site (live at exit)"]
+    lines += [f"{r['bytes'] / 1024:9.1f} {r['blocks']:9d}  {r['site']}" for r in record["allocations"]]
+    return "\n".join(lines) + "\n"
+
+
+def write_summary(run_dir):
+    """Combine every <stage>.json in the run directory, slowest stage first."""
+    records = []
+    for path in sorted(run_dir.glob("*.json")):
+        if path.name == "summary.json":
+            continue
+        records.append(json.loads(path.read_text(encoding="utf-8")))
+    records.sort(key=lambda r: r["wall_s"], reverse=True)
+
+    summary = [{"stage": r["stage"], "wall_s": r["wall_s"], "cpu_s": r["cpu_s"], "peak_bytes": r["peak_bytes"],
+                "top_function": r["functions"][0]["function"] if r["functions"] else None} for r in records]
+    write_atomic(run_dir / "summary.json", json.dumps({"stages": summary}, indent=2))
+
+    width = max([len(r["stage"]) for r in summary] + [5])
+    lines = [f"{'stage':<{width}} {'wall s':>9} {'cpu s':>9} {'peak MiB':>9}  top function (cumulative)"]
+    lines += [f"{r['stage']:<{width}} {r['wall_s']:9.2f} {r['cpu_s']:9.2f} {r['peak_bytes'] / 2**20:9.1f}  {r['top_function']}"
+              for r in summary]
+    lines.append(f"{'total':<{width}} {sum(r['wall_s'] for r in summary):9.2f}")
+    write_atomic(run_dir / "summary.txt", "\n".join(lines) + "\n")
+
+
+@contextmanager
+def profiled(stage, profile=None):
+    """
+    Profile the enclosed block as `stage` when `profile` (a --profile value)
+    is not None; otherwise do nothing. Reports are written even when the
+    block raises or exits.
+    """
+    run_dir = resolve_run_dir(profile)
+    if run_dir is None:
+        yield None
+        return
+    run_dir.mkdir(parents=True, exist_ok=True)
+
+    threads = ThreadProfiles()
+    profile = cProfile.Profile()
+    tracemalloc.start(TRACE_FRAMES)
+    threads.install()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    profile.enable()
+    try:
+        yield run_dir
+    finally:
+        profile.disable()
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        threads.uninstall()
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        stats = pstats.Stats(profile, stream=io.StringIO())
+        for thread_profile in threads.profiles:
+            thread_profile.create_stats()
+            if thread_profile.stats:
+                stats.add(thread_profile)
+        stats.dump_stats(run_dir / f"{stage}.pstats")
+
+        record = {
+            "stage": stage,
+            "argv": sys.argv,
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "peak_bytes": peak,
+            "functions": top_functions(stats),
+            "allocations": top_allocations(snapshot),
+        }
+        write_atomic(run_dir / f"{stage}.txt", format_report(record))
+        write_atomic(run_dir / f"{stage}.json", json.dumps(record, indent=2))
+        write_summary(run_dir)
+        print(f"✓ Profiled {stage} ({wall:.2f}s wall, {peak / 2**20:.1f} MiB peak) into {run_dir}", file=sys.stderr)
@@ -1,12 +1,20 @@
-import requests
+import aiohttp
+import argparse
+import asyncio
+import collections
 import csv
 from datetime import datetime, timedelta
 import time
 import json
 import os
+import random
+from marketmap.metrics import BYTES_WRITTEN, REGISTRY, add_metrics_arguments, exported, timed
+from marketmap.profiling import add_profile_argument, profiled
+from sentiment_store import STORE_FILE, ArticleStore, flatten
 
 # ===================== CONFIG =====================
-API_TOKEN = "YOUR API HERE"
+API_TOKEN = os.getenv("MARKETAUX_API_TOKEN", "YOUR API HERE")
+API_URL = "https://api.marketaux.com/v1/news/all"
 # Replace with the full list of NASDAQ-100 tickers
 TICKERS = [
     "AAPL","MSFT","GOOG","AMZN","TSLA","META","NVDA","NFLX","PEP","ADBE",
@@ -21,14 +29,63 @@ TICKERS = [
     "BKNG","MXIM","PAYC","CTAS","TECH","WDAY"
 ]
 MAX_TICKERS_PER_CALL = 10  # Batch size
+ARTICLE_LIMIT = 50         # max articles per request
+BATCH_FILL_TARGET = 0.8    # plan batches to use this share of ARTICLE_LIMIT
+MAX_PAGES_PER_TICKER = 4   # pages fetched for a single ticker that still saturates
 START_DATE = datetime(2024, 1, 1)
 END_DATE = datetime(2025, 9, 30)
 CSV_FILE = "nasdaq100_weekly_sentiment.csv"
+CALL_LOG_FILE = "nasdaq100_weekly_calls.csv"
 PROGRESS_FILE = "progress.json"
 
+# Request pacing (tune to the API plan)
+RATE_LIMIT_PER_SEC = 5     # sustained requests per second
+RATE_LIMIT_BURST = 10      # requests allowed back-to-back after an idle period
+MAX_CONCURRENCY = 8        # (batch, week) jobs in flight at once
+MAX_RETRIES = 5            # retries on 429 / 5xx / network errors
+BACKOFF_BASE = 1.0         # seconds, doubled on each retry
+REQUEST_TIMEOUT = 30       # seconds
+# Response headers that may carry the plan's remaining requests
+QUOTA_HEADERS = ("X-UsageLimit-Remaining", "X-RateLimit-Remaining")
+
+API_CALLS = REGISTRY.counter("marketmap_sentiment_api_calls", "MarketAux requests by HTTP status "
+                             "(cache: answered from the store, network: no response)", ["status"])
+API_SECONDS = REGISTRY.histogram("marketmap_sentiment_api_seconds", "MarketAux request latency")
+QUOTA_REMAINING = REGISTRY.gauge("marketmap_sentiment_quota_remaining", "Requests left on the API plan, as last reported")
+WEEKS_WRITTEN = REGISTRY.counter("marketmap_sentiment_weeks", "Weeks written to the sentiment CSV")
+WEEKS_REMAINING = REGISTRY.gauge("marketmap_sentiment_weeks_remaining", "Weeks left in this backfill")
+JOBS_QUEUED = REGISTRY.gauge("marketmap_sentiment_jobs_queued", "Planned calls waiting for a worker")
+
+class ApiLimitReached(Exception):
+    """Raised when the API reports the plan's usage limit (HTTP 402)."""
+
+class ApiError(Exception):
+    """Raised on a non-retryable API error."""
+
 # =========================
 # HELPER FUNCTIONS
 # =========================
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
 def week_ranges(start, end):
     current = start
     while current <= end:
@@ -36,40 +93,140 @@ def week_ranges(start, end):
         yield current, week_end
         current = week_end + timedelta(days=1)
 
-def fetch_news(tickers_batch, start, end):
-    url = "https://api.marketaux.com/v1/news/all"
+def unique_tickers(tickers):
+    """Drop repeated tickers, keeping first-seen order."""
+    return list(dict.fromkeys(tickers))
+
+class BatchPlanner:
+    """
+    Groups tickers into API calls using each ticker's recent article volume.
+    Busy tickers get their own call, quiet ones are packed together so a call
+    fills about BATCH_FILL_TARGET of the article limit.
+    """
+
+    def __init__(self, tickers, limit=ARTICLE_LIMIT, max_per_call=MAX_TICKERS_PER_CALL):
+        self.tickers = unique_tickers(tickers)
+        self.limit = limit
+        self.max_per_call = max_per_call
+        self.capacity = limit * BATCH_FILL_TARGET
+        # Unknown tickers are assumed to share a call evenly, as the fixed batches did
+        self.volume = {t: limit / max_per_call for t in self.tickers}
+
+    def observe(self, ticker, articles):
+        """Update a ticker's volume estimate from a complete (unsaturated) count."""
+        self.volume[ticker] = 0.5 * self.volume[ticker] + 0.5 * articles
+
+    def plan(self):
+        """First-fit decreasing packing of tickers into calls."""
+        calls = []
+        for ticker in sorted(self.tickers, key=lambda t: -self.volume[t]):
+            for call in calls:
+                if len(call["tickers"]) < self.max_per_call and call["volume"] + self.volume[ticker] <= self.capacity:
+                    call["tickers"].append(ticker)
+                    call["volume"] += self.volume[ticker]
+                    break
+            else:
+                calls.append({"tickers": [ticker], "volume": self.volume[ticker]})
+        return [call["tickers"] for call in calls]
+
+    def split(self, batch):
+        """Split a saturated batch into two halves of similar expected volume."""
+        halves = ([], [])
+        load = [0.0, 0.0]
+        for ticker in sorted(batch, key=lambda t: -self.volume[t]):
+            # Ties (e.g. all-zero estimates) go by size, so both halves are never empty
+            side = 0 if (load[0], len(halves[0])) <= (load[1], len(halves[1])) else 1
+            halves[side].append(ticker)
+            load[side] += self.volume[ticker]
+        return [h for h in halves if h]
+
+def open_session(concurrency=MAX_CONCURRENCY):
+    """Keep-alive client session with a connection pool sized to the concurrency."""
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=60)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+async def fetch_news(session, limiter, tickers_batch, start, end, api_url=API_URL, page=1, cache=None):
+    """
+    Return the API response for one call, from `cache` (an ArticleStore) when
+    the same request was answered before. The second value is True if an
+    API call was actually spent.
+    """
     params = {
         "countries": "us",
         "symbols": ",".join(tickers_batch),
         "filter_entities": "true",
-        "limit": 50,  # max articles per request
+        "limit": ARTICLE_LIMIT,
+        "page": page,
         "published_after": start.isoformat(),
         "published_before": end.isoformat(),
         "api_token": API_TOKEN
     }
-    response = requests.get(url, params=params)
-    
-    if response.status_code == 402:  # usage limit reached
-        print("API limit reached. Stopping script.")
-        return None
-    
-    if response.status_code != 200:
-        print(f"API error: {response.status_code} {response.text}")
-        return None
-    
-    return response.json()
-
-def calculate_weekly_sentiment(news_data, tickers_batch):
+    if cache is not None:
+        cached = cache.cached_response(params)
+        if cached is not None:
+            API_CALLS.inc(status="cache")
+            return cached, False
+    for attempt in range(MAX_RETRIES + 1):
+        await limiter.acquire()
+        started = time.perf_counter()
+        try:
+            async with session.get(api_url, params=params) as response:
+                API_CALLS.inc(status=response.status)
+                API_SECONDS.observe(time.perf_counter() - started)
+                record_quota(response)
+                if response.status == 402:  # usage limit reached
+                    QUOTA_REMAINING.set(0)
+                    raise ApiLimitReached()
+                if response.status == 200:
+                    body = await response.json()
+                    if cache is not None:
+                        cache.cache_response(params, body)
+                    return body, True
+                body = await response.text()
+                if response.status != 429 and response.status < 500:
+                    raise ApiError(f"API error: {response.status} {body}")
+                retry_after = response.headers.get("Retry-After")
+                reason = f"HTTP {response.status}"
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            API_CALLS.inc(status="network")
+            retry_after = None
+            reason = repr(e)
+
+        if attempt == MAX_RETRIES:
+            raise ApiError(f"Giving up on {tickers_batch[0]}.. {start.date()} after {reason}")
+        delay = float(retry_after) if retry_after and retry_after.isdigit() else BACKOFF_BASE * 2 ** attempt
+        delay += random.uniform(0, BACKOFF_BASE)
+        print(f"  {reason} for week {start.date()}, retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+def record_quota(response):
+    for header in QUOTA_HEADERS:
+        value = response.headers.get(header)
+        if value is not None and value.isdigit():
+            QUOTA_REMAINING.set(int(value))
+            return
+
+def is_saturated(news_data, page=1):
+    """True if the response hit the article limit and more articles exist."""
+    meta = news_data.get("meta") or {}
+    if "found" in meta:
+        return meta["found"] > page * meta.get("limit", ARTICLE_LIMIT)
+    return len(news_data.get("data", [])) >= ARTICLE_LIMIT
+
+def rows_per_ticker(rows, tickers_batch):
+    counts = {ticker: 0 for ticker in tickers_batch}
+    for _, ticker, _, _ in rows:
+        if ticker in counts:
+            counts[ticker] += 1
+    return counts
+
+def calculate_weekly_sentiment(week_stats, tickers):
+    """Rounded mean score per ticker; 0 if the ticker had no scored articles."""
     weekly_scores = {}
-    for ticker in tickers_batch:
-        ticker_scores = []
-        for article in news_data.get("data", []):
-            for entity in article.get("entities", []):
-                if entity.get("symbol") == ticker and entity.get("sentiment_score") is not None:
-                    ticker_scores.append(entity["sentiment_score"])
-        # if no news, sentiment = 0
-        avg_sentiment = round(sum(ticker_scores)/len(ticker_scores), 2) if ticker_scores else 0
-        weekly_scores[ticker] = avg_sentiment
+    for ticker in tickers:
+        count, mean, _ = week_stats.get(ticker, (0, 0.0, 0.0))
+        weekly_scores[ticker] = round(mean, 2) if count else 0
     return weekly_scores
 
 def save_weekly_sentiment(csv_file, week_start, week_end, weekly_scores):
@@ -81,6 +238,41 @@ def save_weekly_sentiment(csv_file, week_start, week_end, weekly_scores):
         for ticker, score in weekly_scores.items():
             writer.writerow([ticker, week_start.strftime("%Y-%m-%d"), week_end.strftime("%Y-%m-%d"), score])
 
+def save_call_log(csv_file, week_start, week_end, calls, articles):
+    file_exists = os.path.isfile(csv_file)
+    with open(csv_file, "a", newline="") as f:
+        writer = csv.writer(f)
+        if not file_exists:
+            writer.writerow(["ticker", "start_date", "end_date", "calls", "articles"])
+        for ticker in calls:
+            writer.writerow([ticker, week_start.strftime("%Y-%m-%d"), week_end.strftime("%Y-%m-%d"),
+                             round(calls[ticker], 3), articles.get(ticker, 0)])
+
+def trim_unrecorded_weeks(csv_file, last_week_start):
+    """
+    Drop rows for weeks after `last_week_start`. They can only exist if a run
+    died between writing a week and recording its progress; the week is
+    rewritten on resume, so keeping them would duplicate rows. Without a
+    recorded week (no progress.json) there is nothing to compare against,
+    and the file is left alone.
+    """
+    if last_week_start is None or not os.path.isfile(csv_file):
+        return
+    cutoff = last_week_start.strftime("%Y-%m-%d")
+    with open(csv_file, newline="") as f:
+        rows = list(csv.reader(f))
+    kept = [rows[0]] + [row for row in rows[1:] if row[1] <= cutoff]
+    if len(kept) == len(rows):
+        return
+    tmp_file = csv_file + ".tmp"
+    with open(tmp_file, "w", newline="") as f:
+        csv.writer(f).writerows(kept)
+    os.replace(tmp_file, csv_file)
+    print(f"Removed {len(rows) - len(kept)} rows of unrecorded weeks from {csv_file}")
+
+def file_size(path):
+    return os.path.getsize(path) if os.path.isfile(path) else 0
+
 def save_progress(progress_file, week_start):
     with open(progress_file, "w") as f:
         json.dump({"last_week_start": week_start.strftime("%Y-%m-%d")}, f)
@@ -96,29 +288,163 @@ def load_progress(progress_file):
             pass  # ignore invalid file
     return None
 
+# =========================
+# FETCH ENGINE
+# =========================
+async def run_backfill(store, weeks, tickers, api_url=API_URL, concurrency=MAX_CONCURRENCY,
+                       rate=RATE_LIMIT_PER_SEC, burst=RATE_LIMIT_BURST):
+    """
+    Fetch every week's planned calls concurrently and write weeks to the CSV in
+    order. `concurrency` workers share one pooled session, so at most that
+    many requests are in flight. A week is written (and progress saved) once
+    all of its calls and all earlier weeks are done, so progress.json keeps
+    its meaning on resume.
+
+    Calls are planned one week at a time, just before they are needed, so each
+    week benefits from the volumes observed in the weeks fetched before it.
+    A saturated multi-ticker call is split in two; a saturated single-ticker
+    call is paged further.
+
+    Every fetched article-entity row goes into `store` (deduplicated by
+    article id), and the CSV score is derived from its running week stats.
+    Week plans, finished batches, raw responses and spent calls are
+    checkpointed in the store, so a resumed run skips finished batches,
+    answers already-paid requests from the cache and still logs the calls
+    the interrupted run spent on its week.
+    """
+    limiter = TokenBucket(rate, burst)
+    planner = BatchPlanner(tickers)
+    WEEKS_REMAINING.set(len(weeks))
+    # Warm the planner from the last stored week so a resumed run plans like the original
+    latest = store.latest_week_counts()
+    if latest:
+        for ticker in planner.tickers:
+            planner.volume[ticker] = latest.get(ticker, 0)
+    jobs = collections.deque()
+    planned = 0
+
+    pending = {}
+    next_week = 0
+    stop = asyncio.Event()
+    JOBS_QUEUED.set_function(lambda: len(jobs))
+
+    def next_job():
+        nonlocal planned
+        while not jobs and planned < len(weeks):
+            week_key = weeks[planned][0].strftime("%Y-%m-%d")
+            saved = store.week_plan(week_key)
+            if saved is None:
+                saved = [(batch, False) for batch in planner.plan()]
+                store.save_plan(week_key, [batch for batch, _ in saved])
+            todo = [batch for batch, done in saved if not done]
+            pending[planned] = len(todo)
+            jobs.extend((planned, batch) for batch in todo)
+            planned += 1
+            flush_completed()
+        return jobs.popleft() if jobs else None
+
+    def flush_completed():
+        nonlocal next_week
+        while next_week < planned and pending[next_week] == 0:
+            week_start, week_end = weeks[next_week]
+            week_key = week_start.strftime("%Y-%m-%d")
+            week_stats = store.week_stats(week_key)
+            weekly_scores = calculate_weekly_sentiment(week_stats, planner.tickers)
+            spent = store.week_calls(week_key)
+            calls = {ticker: spent.get(ticker, 0.0) for ticker in planner.tickers}
+            sizes = {path: file_size(path) for path in (CSV_FILE, CALL_LOG_FILE)}
+            save_weekly_sentiment(CSV_FILE, week_start, week_end, weekly_scores)
+            save_call_log(CALL_LOG_FILE, week_start, week_end, calls,
+                          {ticker: stats[0] for ticker, stats in week_stats.items()})
+            save_progress(PROGRESS_FILE, week_start)
+            for path, size in sizes.items():
+                BYTES_WRITTEN.inc(file_size(path) - size, stage="sentiment", file=os.path.basename(path))
+            WEEKS_WRITTEN.inc()
+            WEEKS_REMAINING.dec()
+            print(f"Processed week {week_start.date()} to {week_end.date()}")
+            next_week += 1
+
+    async def fetch_batch(session, week_idx, batch):
+        """Fetch one planned call (paging if it is a single busy ticker)."""
+        week_start, week_end = weeks[week_idx]
+        fetched = {}  # (article id, ticker) -> row
+        page = 1
+        while True:
+            news_data, spent = await fetch_news(session, limiter, batch, week_start, week_end, api_url, page, store)
+            if spent:
+                store.add_call(week_start.strftime("%Y-%m-%d"), batch)
+            for row in flatten(news_data, batch):
+                fetched[row[:2]] = row
+            if not is_saturated(news_data, page):
+                return fetched, False
+            if len(batch) > 1:
+                return fetched, True
+            if page >= MAX_PAGES_PER_TICKER:
+                print(f"  {batch[0]} still saturated after {page} pages for week {week_start.date()}")
+                return fetched, False
+            page += 1
+
+    async def worker(session):
+        while not stop.is_set():
+            job = next_job()
+            if job is None:
+                return
+            week_idx, batch = job
+            try:
+                fetched, saturated = await fetch_batch(session, week_idx, batch)
+            except ApiLimitReached:
+                if not stop.is_set():
+                    print("API limit reached. Stopping script.")
+                stop.set()
+                return
+            except ApiError as e:
+                print(e)
+                stop.set()
+                return
+            week_key = weeks[week_idx][0].strftime("%Y-%m-%d")
+            if saturated:
+                halves = planner.split(batch)
+                store.save_plan(week_key, halves, replaces=batch)
+                pending[week_idx] += len(halves) - 1
+                jobs.extendleft((week_idx, half) for half in halves)
+                continue
+            for ticker, count in rows_per_ticker(fetched.values(), batch).items():
+                planner.observe(ticker, count)
+            store.add(fetched.values(), week_key, batch)
+            pending[week_idx] -= 1
+            flush_completed()
+
+    async with open_session(concurrency) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+
+    return next_week
+
 # =========================
 # MAIN SCRIPT
 # =========================
 def main():
-    last_processed = load_progress(PROGRESS_FILE)
-    start_date = last_processed + timedelta(days=7) if last_processed else START_DATE
-    
-    for week_start, week_end in week_ranges(start_date, END_DATE):
-        print(f"Processing week {week_start.date()} to {week_end.date()}")
-        
-        # Process tickers in batches
-        for i in range(0, len(TICKERS), MAX_TICKERS_PER_CALL):
-            batch = TICKERS[i:i+MAX_TICKERS_PER_CALL]
-            news_data = fetch_news(batch, week_start, week_end)
-            if news_data is None:
-                # Stop processing if API limit reached
-                return
-            weekly_scores = calculate_weekly_sentiment(news_data, batch)
-            save_weekly_sentiment(CSV_FILE, week_start, week_end, weekly_scores)
-        
-        # Save progress after each week
-        save_progress(PROGRESS_FILE, week_start)
-        time.sleep(1)  # avoid hitting rate limits too fast
+    parser = argparse.ArgumentParser(description="Backfill weekly MarketAux sentiment for NASDAQ-100 tickers")
+    parser.add_argument("--base-url", default=API_URL, help="API endpoint (point at marketaux_stub.py for local runs)")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="Max requests in flight")
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT_PER_SEC, help="Sustained requests per second")
+    parser.add_argument("--burst", type=int, default=RATE_LIMIT_BURST, help="Token bucket capacity")
+    parser.add_argument("--store", default=STORE_FILE, help="Raw article-entity store")
+    add_metrics_arguments(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled("sentiment", args.profile), exported(args.metrics_port, args.metrics_file, stage="sentiment"), \
+            timed("sentiment", "backfill"):
+        last_processed = load_progress(PROGRESS_FILE)
+        trim_unrecorded_weeks(CSV_FILE, last_processed)
+        trim_unrecorded_weeks(CALL_LOG_FILE, last_processed)
+        start_date = last_processed + timedelta(days=7) if last_processed else START_DATE
+        weeks = list(week_ranges(start_date, END_DATE))
+
+        started = time.perf_counter()
+        with ArticleStore(args.store) as store:
+            done = asyncio.run(run_backfill(store, weeks, TICKERS, args.base_url, args.concurrency, args.rate, args.burst))
+        print(f"Wrote {done}/{len(weeks)} weeks in {time.perf_counter() - started:.1f}s")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
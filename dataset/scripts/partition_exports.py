@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Per-ticker and per-role partitions of the cleaned datasets.
+Writes small CSV shards plus an index.json per partitioning so the front end
+can fetch only the slice it displays, e.g.
+
+    cleaned/partitions/salary/by-ticker/AAPL.csv
+    cleaned/partitions/salary/by-ticker/index.json
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+from collections import Counter
+from pathlib import Path
+
+from marketmap import frames
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+CLEANED_DIR = BASE_DIR.parent / "cleaned"
+PARTITIONS_DIR = CLEANED_DIR / "partitions"
+
+# dataset name -> (source CSV in cleaned/, {partition name: key column})
+PARTITIONS = {
+    "salary": ("Company-salary.csv", {"by-ticker": "Ticker", "by-role": "Role Name"}),
+    "financials-weekly": ("Company-financials-sentiment-weekly-snapshot.csv", {"by-ticker": "Ticker"}),
+}
+
+
+def shard_name(key):
+    """File-system safe shard name for a partition key."""
+    name = re.sub(r"[^\w\-.]+", "-", str(key)).strip("-")
+    return name or "_"
+
+
+def shard_names(keys):
+    """
+    {key: shard name} for a partition's keys. Keys whose names would collide
+    (e.g. "A/B" and "A B", or names differing only in case, which clash on
+    case-insensitive file systems) get a short hash of the key appended.
+    """
+    names = {key: shard_name(key) for key in keys}
+    counts = Counter(name.casefold() for name in names.values())
+    for key, name in names.items():
+        if counts[name.casefold()] > 1:
+            names[key] = f"{name}-{hashlib.sha1(str(key).encode()).hexdigest()[:8]}"
+    if len({name.casefold() for name in names.values()}) < len(names):
+        raise ValueError("shard names still collide after adding key hashes")
+    return names
+
+
+def write_partitions(df, key_col, out_dir):
+    """
+    Write one CSV per distinct `key_col` value and an index.json mapping each
+    key to its shard and row count. The new set of shards is built in a
+    temporary directory and swapped in, so readers never see a partial set.
+    """
+    out_dir = Path(out_dir)
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    groups = df.groupby(key_col, sort=True)
+    names = shard_names(groups.groups)
+    index = {}
+    for key, shard in groups:
+        fname = f"{names[key]}.csv"
+        shard.to_csv(tmp_dir / fname, index=False)
+        index[str(key)] = {"file": fname, "rows": len(shard)}
+
+    with open(tmp_dir / "index.json", "w") as f:
+        json.dump({"key": key_col, "columns": list(df.columns), "partitions": index}, f, indent=2)
+
+    old_dir = out_dir.with_name(out_dir.name + ".old")
+    if out_dir.exists():
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+    return index
+
+
+def partition_dataset(name, df=None, cleaned_dir=CLEANED_DIR, partitions_dir=PARTITIONS_DIR):
+    """Partition one dataset from PARTITIONS; reads it from `cleaned_dir` unless given."""
+    source, partitionings = PARTITIONS[name]
+    if df is None:
+        df = frames.read_csv(Path(cleaned_dir) / source)
+    for partition, key_col in partitionings.items():
+        index = write_partitions(df, key_col, Path(partitions_dir) / name / partition)
+        print(f"✓ Partitioned {source} {partition}: {len(index)} shards")
+
+
+def main():
+    for name, (source, _) in PARTITIONS.items():
+        if not (CLEANED_DIR / source).is_file():
+            print(f"Skipping {name}: {source} not found")
+            continue
+        partition_dataset(name)
+
+
+if __name__ == "__main__":
+    main()
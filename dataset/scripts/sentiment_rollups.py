@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Sentiment consolidation script for NASDAQ 100 market data.
+Streams the yearly weekly sentiment files, writes the combined weekly table
+and the monthly / quarterly / yearly rollups used by the front end. Each
+chunk is folded into the deduplicated table as it is read, so memory holds
+one row per ticker-week plus one chunk, not every row of every file.
+"""
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from marketmap import frames
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+DATASET_DIR = BASE_DIR.parent
+WEEKLY_DIR = DATASET_DIR / "raw-data" / "weekly-sentiment"
+OUTPUT_DIR = DATASET_DIR / "cleaned"
+
+WEEKLY_GLOB = "nasdaq100_weekly_s*.csv"
+COMBINED_FILE = "combined_sentiment.csv"
+KEY_COLS = ["ticker", "start_date"]
+WEEKLY_COLS = ["ticker", "start_date", "end_date", "sentiment_score"]
+CHUNK_SIZE = 50_000
+
+# granularity -> (pandas period frequency, output file)
+ROLLUPS = {
+    "monthly": ("M", "sentiment_monthly.csv"),
+    "quarterly": ("Q", "sentiment_quarterly.csv"),
+    "yearly": ("Y", "sentiment_yearly.csv"),
+}
+
+
+def stream_weekly(paths, chunksize=CHUNK_SIZE):
+    """Yield chunks of the yearly weekly files, tagged with their read order."""
+    order = 0
+    for path in paths:
+        for chunk in pd.read_csv(path, usecols=WEEKLY_COLS, chunksize=chunksize):
+            chunk["_order"] = range(order, order + len(chunk))
+            order += len(chunk)
+            yield chunk
+
+
+def latest_weeks(weekly):
+    """
+    Keep one row per (ticker, start_date), with its read order.
+    Later rows win, except that an empty score (0 / NaN means "no news") never
+    overrides a real one from an earlier run. The winner is the maximum of
+    (has score, order), so chunks can be folded in one at a time.
+    """
+    has_score = weekly["sentiment_score"].fillna(0).ne(0)
+    weekly = weekly.assign(_has_score=has_score)
+    weekly = weekly.sort_values(["_has_score", "_order"])
+    weekly = weekly.drop_duplicates(KEY_COLS, keep="last")
+    return weekly.drop(columns="_has_score")
+
+
+def dedupe_weeks(weekly):
+    """latest_weeks() in week order, without the read order column."""
+    weekly = latest_weeks(weekly).sort_values(["start_date", "_order"])
+    return weekly.drop(columns="_order").reset_index(drop=True)
+
+
+def load_weekly(weekly_dir=WEEKLY_DIR):
+    """Stream all yearly weekly files into one deduplicated weekly table."""
+    paths = sorted(weekly_dir.glob(WEEKLY_GLOB))
+    if not paths:
+        raise FileNotFoundError(f"No weekly sentiment files in {weekly_dir}")
+    weekly = None
+    for chunk in stream_weekly(paths):
+        chunk["sentiment_score"] = chunk["sentiment_score"].fillna(0.0).astype(float)
+        weekly = latest_weeks(chunk if weekly is None else pd.concat([weekly, chunk], ignore_index=True))
+    return dedupe_weeks(weekly)
+
+
+def changed_weeks(weekly, previous):
+    """Return the rows of `weekly` that are new or differ from `previous`."""
+    if previous is None or previous.empty:
+        return weekly
+    merged = weekly.merge(previous[KEY_COLS + ["sentiment_score"]], on=KEY_COLS,
+                          how="left", suffixes=("", "_prev"), indicator=True)
+    changed = (merged["_merge"] == "left_only") | (
+        merged["sentiment_score"].round(6) != merged["sentiment_score_prev"].round(6)
+    )
+    return weekly[changed.to_numpy()]
+
+
+def period_keys(weekly):
+    """
+    Stack every weekly row once per granularity so all rollups share one
+    groupby. Weeks are bucketed by their start date.
+    """
+    start = pd.to_datetime(weekly["start_date"])
+    stacked = []
+    for name, (freq, _) in ROLLUPS.items():
+        period = start.dt.to_period(freq)
+        stacked.append(pd.DataFrame({
+            "granularity": name,
+            "ticker": weekly["ticker"].to_numpy(),
+            "start_date": period.dt.start_time.dt.strftime("%Y-%m-%d").to_numpy(),
+            "end_date": period.dt.end_time.dt.strftime("%Y-%m-%d").to_numpy(),
+            "sentiment_score": weekly["sentiment_score"].to_numpy(),
+        }))
+    return pd.concat(stacked, ignore_index=True)
+
+
+def compute_rollups(weekly, changed=None):
+    """
+    Compute the monthly, quarterly and yearly means in a single groupby.
+    Weeks scored 0 ("no news", see dedupe_weeks) are left out of the mean; a
+    period without any news scores 0.
+    If `changed` is given, only the periods touched by those weeks are recomputed.
+    """
+    stacked = period_keys(weekly)
+    if changed is not None:
+        touched = period_keys(changed)[["granularity", "ticker", "start_date"]].drop_duplicates()
+        stacked = stacked.merge(touched, on=["granularity", "ticker", "start_date"])
+
+    scores = stacked["sentiment_score"].mask(stacked["sentiment_score"] == 0)
+    rolled = (stacked.assign(sentiment_score=scores)
+              .groupby(["granularity", "ticker", "start_date", "end_date"], sort=False)["sentiment_score"]
+              .mean()
+              .fillna(0.0)
+              .round(3)
+              .reset_index())
+    return {name: rolled[rolled["granularity"] == name].drop(columns="granularity")
+            for name in ROLLUPS}
+
+
+def merge_rollup(existing, fresh, name):
+    """Replace the recomputed periods in an existing rollup table."""
+    score_col = f"sentiment_score_{name}"
+    fresh = fresh.rename(columns={"sentiment_score": score_col})
+    if existing is not None:
+        keys = ["ticker", "start_date"]
+        stale = existing.set_index(keys).index.isin(fresh.set_index(keys).index)
+        fresh = pd.concat([existing[~stale], fresh], ignore_index=True)
+    return fresh.sort_values(["ticker", "start_date"]).reset_index(drop=True)
+
+
+def read_existing(path):
+    return frames.read_csv(path) if path.is_file() else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Combine weekly sentiment files and build period rollups")
+    parser.add_argument("--full", action="store_true", help="Recompute every rollup instead of only new weeks")
+    parser.add_argument("--weekly-dir", type=Path, default=WEEKLY_DIR, help=f"Folder of {WEEKLY_GLOB} files")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    args = parser.parse_args()
+    output_dir = args.output_dir
+
+    print("Streaming weekly sentiment files...")
+    weekly = load_weekly(args.weekly_dir)
+    print(f"Loaded {len(weekly)} unique ticker-weeks")
+
+    combined_path = output_dir / COMBINED_FILE
+    existing_rollups = {name: read_existing(output_dir / fname) for name, (_, fname) in ROLLUPS.items()}
+    full = args.full or any(r is None for r in existing_rollups.values())
+
+    changed = None if full else changed_weeks(weekly, read_existing(combined_path))
+    if changed is not None and changed.empty:
+        print("No new weeks since last run; nothing to do.")
+        return
+
+    weekly.to_csv(combined_path, index=False)
+    print(f"✓ Created {COMBINED_FILE} with {len(weekly)} rows")
+
+    if changed is not None:
+        print(f"Recomputing rollups for {len(changed)} new or changed weeks")
+    rollups = compute_rollups(weekly, changed)
+    for name, (_, fname) in ROLLUPS.items():
+        existing = None if full else existing_rollups[name]
+        out = merge_rollup(existing, rollups[name], name)
+        out.to_csv(output_dir / fname, index=False)
+        print(f"✓ Created {fname} with {len(out)} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Local store of raw MarketAux article-entity sentiment.
+Keeps one row per (article, ticker) plus running per ticker-week statistics,
+so sentiment can be re-aggregated offline without refetching from the API.
+
+    python sentiment_store.py --granularity month --output monthly.csv
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import sqlite3
+
+STORE_FILE = "nasdaq100_articles.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS article_entities (
+    article_id      TEXT NOT NULL,
+    ticker          TEXT NOT NULL,
+    published_at    TEXT NOT NULL,
+    sentiment_score REAL NOT NULL,
+    PRIMARY KEY (article_id, ticker)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_article_entities_ticker ON article_entities (ticker, published_at);
+
+CREATE TABLE IF NOT EXISTS week_stats (
+    ticker     TEXT NOT NULL,
+    week_start TEXT NOT NULL,
+    count      INTEGER NOT NULL,
+    mean       REAL NOT NULL,
+    m2         REAL NOT NULL,
+    PRIMARY KEY (ticker, week_start)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS responses (
+    request_key TEXT PRIMARY KEY,
+    body        TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS week_batches (
+    week_start TEXT NOT NULL,
+    batch      TEXT NOT NULL,
+    done       INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (week_start, batch)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS week_calls (
+    week_start TEXT NOT NULL,
+    ticker     TEXT NOT NULL,
+    calls      REAL NOT NULL,
+    PRIMARY KEY (week_start, ticker)
+) WITHOUT ROWID;
+"""
+
+# SQLite date expressions for the start of each offline rollup period
+PERIOD_SQL = {
+    "day": "date(published_at)",
+    "week": "date(published_at, '-' || ((CAST(strftime('%w', published_at) AS INTEGER) + 6) % 7) || ' days')",
+    "month": "date(published_at, 'start of month')",
+    "quarter": "printf('%s-%02d-01', strftime('%Y', published_at), "
+               "((CAST(strftime('%m', published_at) AS INTEGER) - 1) / 3) * 3 + 1)",
+    "year": "date(published_at, 'start of year')",
+}
+
+
+def flatten(news_data, tickers=None):
+    """
+    One pass over a MarketAux response: yield (article_id, ticker, published_at,
+    sentiment_score) for every scored entity, optionally restricted to `tickers`.
+    """
+    wanted = set(tickers) if tickers is not None else None
+    for article in news_data.get("data", []):
+        article_id = article.get("uuid")
+        published_at = article.get("published_at", "")
+        if not article_id:
+            continue
+        for entity in article.get("entities", []):
+            symbol = entity.get("symbol")
+            score = entity.get("sentiment_score")
+            if score is None or (wanted is not None and symbol not in wanted):
+                continue
+            yield article_id, symbol, published_at, float(score)
+
+
+def request_key(params):
+    """Cache key for an API request: every parameter except the token."""
+    material = {k: v for k, v in params.items() if k != "api_token"}
+    return hashlib.sha1(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ArticleStore:
+    """
+    SQLite-backed article-entity rows with incremental ticker-week stats.
+    Also holds the API response cache, the per-batch checkpoints of the
+    weekly fetch plan and the API calls spent per ticker-week, so an
+    interrupted backfill resumes without refetching or losing count.
+    """
+
+    def __init__(self, path=STORE_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, rows, week_start, batch=None):
+        """
+        Insert article-entity rows fetched for the week starting `week_start`
+        (YYYY-MM-DD). Rows already stored are ignored; stats are updated with
+        Welford's method for the new ones only. If `batch` is given it is
+        checkpointed as done in the same transaction. Returns the number of
+        new rows.
+        """
+        added = 0
+        with self.conn:
+            if batch is not None:
+                self.conn.execute(
+                    "UPDATE week_batches SET done = 1 WHERE week_start = ? AND batch = ?",
+                    (week_start, ",".join(batch)),
+                )
+            for article_id, ticker, published_at, score in rows:
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO article_entities VALUES (?, ?, ?, ?)",
+                    (article_id, ticker, published_at, score),
+                )
+                if cur.rowcount == 0:
+                    continue
+                added += 1
+                row = self.conn.execute(
+                    "SELECT count, mean, m2 FROM week_stats WHERE ticker = ? AND week_start = ?",
+                    (ticker, week_start),
+                ).fetchone()
+                count, mean, m2 = row if row else (0, 0.0, 0.0)
+                count += 1
+                delta = score - mean
+                mean += delta / count
+                m2 += delta * (score - mean)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO week_stats VALUES (?, ?, ?, ?, ?)",
+                    (ticker, week_start, count, mean, m2),
+                )
+        return added
+
+    def cached_response(self, params):
+        row = self.conn.execute(
+            "SELECT body FROM responses WHERE request_key = ?", (request_key(params),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def cache_response(self, params, body):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?)", (request_key(params), json.dumps(body))
+            )
+
+    def week_plan(self, week_start):
+        """Saved batches for a week as (batch, done) pairs, or None if never planned."""
+        rows = self.conn.execute(
+            "SELECT batch, done FROM week_batches WHERE week_start = ?", (week_start,)
+        ).fetchall()
+        if not rows:
+            return None
+        return [(batch.split(","), bool(done)) for batch, done in rows]
+
+    def save_plan(self, week_start, batches, replaces=None):
+        """Record planned batches for a week, optionally replacing a split batch."""
+        with self.conn:
+            if replaces is not None:
+                self.conn.execute(
+                    "DELETE FROM week_batches WHERE week_start = ? AND batch = ?",
+                    (week_start, ",".join(replaces)),
+                )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO week_batches (week_start, batch) VALUES (?, ?)",
+                [(week_start, ",".join(batch)) for batch in batches],
+            )
+
+    def add_call(self, week_start, batch):
+        """Record one API call spent on `batch`, shared evenly by its tickers."""
+        share = 1 / len(batch)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO week_calls VALUES (?, ?, ?) "
+                "ON CONFLICT (week_start, ticker) DO UPDATE SET calls = calls + excluded.calls",
+                [(week_start, ticker, share) for ticker in batch],
+            )
+
+    def week_calls(self, week_start):
+        """{ticker: API calls spent} for one fetch week, across every run."""
+        rows = self.conn.execute("SELECT ticker, calls FROM week_calls WHERE week_start = ?", (week_start,))
+        return dict(rows.fetchall())
+
+    def latest_week_counts(self):
+        """{ticker: article count} for the most recent week with stored stats."""
+        rows = self.conn.execute(
+            "SELECT ticker, count FROM week_stats WHERE week_start = (SELECT MAX(week_start) FROM week_stats)"
+        )
+        return dict(rows.fetchall())
+
+    def week_stats(self, week_start):
+        """{ticker: (count, mean, variance)} for one fetch week."""
+        rows = self.conn.execute(
+            "SELECT ticker, count, mean, m2 FROM week_stats WHERE week_start = ?", (week_start,)
+        )
+        return {ticker: (count, mean, m2 / count if count else 0.0) for ticker, count, mean, m2 in rows}
+
+    def rollup(self, granularity="month"):
+        """Re-aggregate stored articles by publication date at any granularity."""
+        period = PERIOD_SQL[granularity]
+        return self.conn.execute(
+            f"""
+            SELECT ticker, {period} AS period_start, COUNT(*) AS count,
+                   AVG(sentiment_score) AS mean,
+                   AVG(sentiment_score * sentiment_score) - AVG(sentiment_score) * AVG(sentiment_score) AS variance
+            FROM article_entities
+            GROUP BY ticker, period_start
+            ORDER BY ticker, period_start
+            """
+        ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-aggregate stored article sentiment offline")
+    parser.add_argument("--store", default=STORE_FILE, help="Article store to read")
+    parser.add_argument("--granularity", choices=sorted(PERIOD_SQL), default="month")
+    parser.add_argument("--output", required=True, help="CSV file to write")
+    args = parser.parse_args()
+
+    with ArticleStore(args.store) as store:
+        rows = store.rollup(args.granularity)
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ticker", "period_start", "count", "mean", "variance"])
+        writer.writerows(rows)
+    print(f"✓ Wrote {len(rows)} {args.granularity} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Streaming levels.fyi pipeline: scrape -> parse -> normalize -> classify.
+
+Instead of scraping every company before parse_data.py, consolidate_data.py
+and benefits_classifier.py each run over the full output of the stage before,
+every company flows through the whole chain as soon as its scrape finishes.
+Stages are worker threads joined by bounded queues, so a slow stage holds
+back the ones before it instead of letting work pile up in memory. Outputs
+are written once at the end, each to a temporary file swapped into place.
+A failed scrape falls back to the company's existing data/<company>/; if a
+company with scraped data still fails to come through, nothing is swapped
+in and the run exits non-zero, so the outputs never silently lose it.
+
+    python stream_pipeline.py --scrapers 2 --headless
+    python stream_pipeline.py --no-scrape      # re-process what is already in data/
+
+Outputs:
+    levels-scraping/salaries.csv, benefits.csv         (as parse_data.py)
+    cleaned/Company-salary.csv, Company-benefits.csv  (as consolidate_data.py)
+    cleaned/benefits_classified.csv                   (as benefits_classifier.py)
+    cleaned/partitions/salary/                        (as partition_exports.py)
+    cleaned/versions/salary/, benefits/               (as dataset_versions.py)
+"""
+
+import argparse
+import csv
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benefits_classifier import DEFAULT_CACHE, classify
+from consolidate_data import normalize_benefits, normalize_salaries
+from dataset_versions import snapshot_all
+from marketmap import load_stage, stage_env
+from marketmap.metrics import REGISTRY, add_metrics_arguments, exported, record_write, timed
+from marketmap.profiling import add_profile_argument, profiled
+from partition_exports import partition_dataset
+
+# Define base paths
+BASE_DIR = Path(__file__).resolve().parent
+LEVELS_DIR = BASE_DIR / "levels-scraping"
+CLEANED_DIR = BASE_DIR.parent / "cleaned"
+LEVELS_CSV = LEVELS_DIR / "nasdaq_100_levels.csv"
+SCRAPER = LEVELS_DIR / "main.py"
+DATA_DIR = LEVELS_DIR / "data"
+
+QUEUE_SIZE = 4        # companies waiting between two stages
+SCRAPE_WORKERS = 2    # browsers running at once
+ROLE_LIMIT = 10
+
+# Typed like pd.read_csv infers them on the full salaries.csv, so per-company
+# frames concatenate to the same columns the batch scripts produce
+SALARY_NUMERIC = [
+    "role rank", "total pay (USD)", "base pay (USD)", "stock (USD)", "bonus (USD)",
+    "upper bound (USD)", "lower bound (USD)",
+]
+
+DONE = object()  # end-of-stream marker
+
+ITEMS = REGISTRY.counter("marketmap_pipeline_items", "Companies through each stage, by outcome", ["stage", "outcome"])
+ITEM_SECONDS = REGISTRY.histogram("marketmap_pipeline_item_seconds", "Time one company spends in a stage", ["stage"])
+QUEUE_DEPTH = REGISTRY.gauge("marketmap_pipeline_queue_depth", "Companies waiting in front of a stage", ["stage"])
+
+
+class Stage:
+    """
+    `workers` threads applying `fn` to items from `inbox` and putting the
+    results on `outbox`. A None result or an exception drops the item (the
+    error is reported and the rest of the stream keeps going). DONE is
+    forwarded once every worker has seen it.
+    """
+
+    def __init__(self, name, fn, inbox, outbox, workers=1):
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.active = workers
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self.work, name=f"{name}-{i}", daemon=True)
+                        for i in range(workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def work(self):
+        while True:
+            item = self.inbox.get()
+            if item is DONE:
+                self.inbox.put(DONE)  # let the sibling workers see it too
+                break
+            started = time.perf_counter()
+            try:
+                result = self.fn(item)
+            except Exception as e:
+                print(f"  ✗ {self.name} failed for {item['company']}: {e}", file=sys.stderr)
+                ITEMS.inc(stage=self.name, outcome="failed")
+                continue
+            finally:
+                ITEM_SECONDS.observe(time.perf_counter() - started, stage=self.name)
+            ITEMS.inc(stage=self.name, outcome="dropped" if result is None else "ok")
+            if result is not None:
+                self.outbox.put(result)
+        with self.lock:
+            self.active -= 1
+            last = self.active == 0
+        if last:
+            self.outbox.put(DONE)
+
+
+def write_atomic_csv(df, path):
+    """Write next to `path` and return the temp path; swap_all() moves it in."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    df.to_csv(tmp_path, index=False)
+    return tmp_path, path
+
+
+def swap_all(pending):
+    for tmp_path, path in pending:
+        os.replace(tmp_path, path)
+
+
+class LevelsTable:
+    """nasdaq_100_levels.csv rows with thread-safe progress updates."""
+
+    def __init__(self, path=LEVELS_CSV):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        with open(self.path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            self.rows = list(reader)
+            self.fieldnames = list(reader.fieldnames or [])
+        if "scraped" not in self.fieldnames:
+            self.fieldnames.append("scraped")
+
+    def companies(self, rescrape=False):
+        """(slug, country, needs scrape) in file order, with nasdaq_100_scrape_all.py's filters."""
+        plan = []
+        for row in self.rows:
+            if row.get("skip", "false") == "true" or row.get("exists-on-levels", "false") != "true":
+                continue
+            country = row.get("country", "").strip()
+            if not country or country == "unknown":
+                continue
+            slug = row["Company Name"].strip().lower().replace(" ", "-")
+            plan.append((slug, country, rescrape or row.get("scraped", "false") != "true"))
+        return plan
+
+    def mark_scraped(self, slug):
+        with self.lock:
+            for row in self.rows:
+                if row["Company Name"].strip().lower().replace(" ", "-") == slug:
+                    row["scraped"] = "true"
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=self.fieldnames, restval="false")
+                writer.writeheader()
+                writer.writerows(self.rows)
+            os.replace(tmp_path, self.path)
+
+
+def make_stages(table, data_dir, cache_path, limit, headless):
+    parse_data = load_stage("parse")
+    company_info = parse_data.read_company_info(table.path)
+
+    def scrape(item):
+        if not item["needs_scrape"]:
+            return item
+        company_dir = data_dir / item["company"]
+        scraped_before = company_dir.is_dir()
+        cmd = [sys.executable, str(SCRAPER), item["company"], item["country"], "--limit", str(limit),
+               "--data-dir", str(data_dir)]
+        if headless:
+            cmd.append("--headless")
+        result = subprocess.run(cmd, capture_output=True, text=True, env=stage_env())
+        if result.returncode != 0:
+            last_line = result.stderr.strip().splitlines()[-1:] or [""]
+            error = f"main.py exited with {result.returncode}: {last_line[0]}"
+            if not scraped_before:
+                raise RuntimeError(error)
+            # Keep the company in the outputs with what the last successful scrape left
+            print(f"  ! scrape failed for {item['company']} ({error}); using the existing {company_dir}",
+                  file=sys.stderr)
+            return item
+        table.mark_scraped(item["company"])
+        return item
+
+    def parse(item):
+        company_dir = data_dir / item["company"]
+        if not company_dir.is_dir():
+            raise FileNotFoundError(f"{company_dir} not found")
+        rows, benefits = parse_data.parse_company(str(company_dir), item["company"], company_info)
+        salaries = pd.DataFrame(rows, columns=parse_data.OUTPUT_COLS)
+        salaries[SALARY_NUMERIC] = salaries[SALARY_NUMERIC].apply(pd.to_numeric, errors="coerce")
+        item["salaries"] = salaries
+        item["benefits"] = pd.DataFrame(benefits, columns=parse_data.BENEFIT_OUTPUT_COLS)
+        return item
+
+    def normalize(item):
+        item["company_salary"] = normalize_salaries(item["salaries"])
+        item["company_benefits"] = normalize_benefits(item["benefits"])
+        return item
+
+    def classify_benefits(item):
+        item["classified"] = classify(item["company_benefits"], cache_path=cache_path)
+        return item
+
+    return [("scrape", scrape), ("parse", parse), ("normalize", normalize), ("classify", classify_benefits)]
+
+
+def run_pipeline(plan, stage_fns, scrapers=SCRAPE_WORKERS, queue_size=QUEUE_SIZE):
+    """
+    Stream `plan` through the stages. Returns {company: finished item} and
+    prints each company as it comes out of the last stage.
+    """
+    todo = queue.Queue()
+    for position, (company, country, needs_scrape) in enumerate(plan):
+        todo.put({"position": position, "company": company, "country": country, "needs_scrape": needs_scrape})
+    todo.put(DONE)
+
+    inbox = todo
+    for name, fn in stage_fns:
+        QUEUE_DEPTH.set_function(inbox.qsize, stage=name)
+        outbox = queue.Queue(maxsize=queue_size)
+        Stage(name, fn, inbox, outbox, workers=scrapers if name == "scrape" else 1).start()
+        inbox = outbox
+
+    QUEUE_DEPTH.set_function(inbox.qsize, stage="output")
+    started = time.perf_counter()
+    finished = {}
+    while (item := inbox.get()) is not DONE:
+        finished[item["company"]] = item
+        print(f"  ✓ {item['company']}: {len(item['company_salary'])} salaries, "
+              f"{len(item['classified'])} benefits ({time.perf_counter() - started:.1f}s)")
+    return finished
+
+
+def write_outputs(finished, output_dir, levels_dir):
+    """Concatenate in plan order and swap every output in together."""
+    items = sorted(finished.values(), key=lambda item: item["position"])
+    frames = {key: pd.concat([item[key] for item in items], ignore_index=True)
+              for key in ("salaries", "benefits", "company_salary", "company_benefits", "classified")}
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    pending = [
+        write_atomic_csv(frames["salaries"], levels_dir / "salaries.csv"),
+        write_atomic_csv(frames["benefits"], levels_dir / "benefits.csv"),
+        write_atomic_csv(frames["company_salary"], output_dir / "Company-salary.csv"),
+        write_atomic_csv(frames["company_benefits"], output_dir / "Company-benefits.csv"),
+        write_atomic_csv(frames["classified"], output_dir / "benefits_classified.csv"),
+    ]
+    swap_all(pending)
+    for key, (_, path) in zip(("salaries", "benefits", "company_salary", "company_benefits", "classified"), pending):
+        record_write("pipeline", path, len(frames[key]))
+    partition_dataset("salary", frames["company_salary"], partitions_dir=output_dir / "partitions")
+    snapshot_all(output_dir, output_dir / "versions", ["salary", "benefits"])
+    return frames
+
+
+def run(args):
+    table = LevelsTable(args.levels_csv)
+    plan = table.companies(args.rescrape)
+    if args.no_scrape:
+        plan = [(company, country, False) for company, country, _ in plan if (args.data_dir / company).is_dir()]
+    print(f"Streaming {len(plan)} companies ({sum(s for *_, s in plan)} to scrape)...")
+    # Companies whose rows are in the current outputs
+    had_data = {company for company, *_ in plan if (args.data_dir / company).is_dir()}
+
+    started = time.perf_counter()
+    stage_fns = make_stages(table, args.data_dir, args.cache, args.limit, args.headless)
+    with timed("pipeline", "stream"):
+        finished = run_pipeline(plan, stage_fns, args.scrapers, args.queue_size)
+    lost = [company for company, *_ in plan if company in had_data and company not in finished]
+    if lost:
+        sys.exit(f"{len(lost)} companies with scraped data failed ({', '.join(lost)}); outputs left unchanged")
+    if not finished:
+        print("No companies made it through the pipeline; outputs left unchanged")
+        return
+
+    with timed("pipeline", "write"):
+        frames = write_outputs(finished, args.output_dir, args.levels_csv.parent)
+    print(f"✓ Created Company-salary.csv with {len(frames['company_salary'])} rows")
+    print(f"✓ Created Company-benefits.csv with {len(frames['company_benefits'])} rows")
+    print(f"✓ Created benefits_classified.csv with {len(frames['classified'])} rows")
+    print(f"{len(finished)}/{len(plan)} companies in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape, parse, normalize and classify company by company")
+    parser.add_argument("--levels-csv", type=Path, default=LEVELS_CSV, help="nasdaq_100_levels.csv")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="Scraped data/<company>/ folders")
+    parser.add_argument("--output-dir", type=Path, default=CLEANED_DIR)
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE, help="Benefit keyword match cache file")
+    parser.add_argument("--no-scrape", action="store_true", help="Only process companies already in --data-dir")
+    parser.add_argument("--rescrape", action="store_true", help="Scrape companies already marked scraped")
+    parser.add_argument("--scrapers", type=int, default=SCRAPE_WORKERS, help="Concurrent scrapes")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="Companies buffered between stages")
+    parser.add_argument("--limit", type=int, default=ROLE_LIMIT, help="Max role links per company (main.py)")
+    parser.add_argument("--headless", action="store_true", help="Run browsers in headless mode (main.py)")
+    add_metrics_arguments(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled("pipeline", args.profile), exported(args.metrics_port, args.metrics_file, stage="pipeline"):
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# The scripts import each other as top-level modules, as when run from dataset/scripts
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import marketaux_stub  # noqa: E402
+
+
+@pytest.fixture
+def marketaux():
+    """A marketaux_stub.py server on a free port; yields (endpoint URL, StubState)."""
+    state = marketaux_stub.StubState(quota=None, error_rate=0.0, seed=0)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), marketaux_stub.make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1/news/all", state
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
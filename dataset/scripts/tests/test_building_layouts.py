@@ -0,0 +1,98 @@
+"""building_layouts.py placement against resolveCollisions in js/mapvis.js."""
+
+import json
+import random
+import shutil
+import subprocess
+
+import pandas as pd
+import pytest
+
+from building_layouts import StateShape, icon_size, resolve_layout
+from conftest import SCRIPTS_DIR
+
+MAPVIS = SCRIPTS_DIR.parent.parent / "js" / "mapvis.js"
+
+# A California-sized polygon in map coordinates, and thirty companies around two cities
+RING = [(100, 100), (180, 90), (205, 200), (262, 300), (240, 420), (150, 430), (120, 330), (90, 250)]
+CITIES = [(150, 220), (200, 360)]
+
+# resolveCollisions runs with these stand-ins for d3 and the map: the polygon is
+# already in map coordinates, so the projection is the identity
+HARNESS = """
+const fs = require("fs");
+const input = JSON.parse(fs.readFileSync(0, "utf8"));
+const ring = input.ring;
+const xs = ring.map(p => p[0]), ys = ring.map(p => p[1]);
+function contains(x, y) {
+  if (x < Math.min(...xs) || x > Math.max(...xs) || y < Math.min(...ys) || y > Math.max(...ys)) return false;
+  let inside = false;
+  for (let i = 0; i < ring.length; i++) {
+    const [ax, ay] = ring[i], [bx, by] = ring[(i + 1) % ring.length];
+    if ((ay > y) !== (by > y) && x < ax + (y - ay) * (bx - ax) / (by - ay)) inside = !inside;
+  }
+  return inside;
+}
+const d3 = {
+  group: (data, key) => {
+    const groups = new Map();
+    for (const d of data) {
+      if (!groups.has(key(d))) groups.set(key(d), []);
+      groups.get(key(d)).push(d);
+    }
+    return groups;
+  },
+  geoContains: (geom, [x, y]) => contains(x, y),
+};
+const projection = { invert: p => p };
+const path = {
+  bounds: () => [[Math.min(...xs), Math.min(...ys)], [Math.max(...xs), Math.max(...ys)]],
+  centroid: () => input.centroid,
+};
+const stateGeometries = new Map([["CA", {}]]);
+const stateNameToAbbr = {};
+const pick = (d, keys) => d[keys[0]];
+console.log = console.warn = console.error = () => {};
+"""
+
+
+def mapvis_placement():
+    """isPointInState, seededRandom and resolveCollisions, as mapvis.js defines them."""
+    source = MAPVIS.read_text(encoding="utf-8")
+    start = source.index("    // Helper to check if a point is inside a state's actual polygon geometry")
+    end = source.index("    // ---- Render orchestrators ----")
+    return source[start:end]
+
+
+def dense_state(n=30, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        cx, cy = CITIES[i % len(CITIES)]
+        ticker = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(4))
+        mc = rng.choice([0, 10 ** rng.uniform(9, 12.5)])
+        rows.append({"Ticker": ticker, "State": "CA", "mc": mc, "size": icon_size(mc),
+                     "px": cx + rng.uniform(-15, 15), "py": cy + rng.uniform(-15, 15)})
+    companies = pd.DataFrame(rows).drop_duplicates("Ticker")
+    return companies.sort_values(["mc", "Ticker"], ascending=[False, True]).reset_index(drop=True)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node to run mapvis.js")
+def test_dense_state_matches_mapvis():
+    companies = dense_state()
+    shape = StateShape([[RING]])
+    xs, ys = resolve_layout(companies, {"CA": shape}, zoom=1)
+
+    payload = {"ring": RING, "centroid": shape.centroid(),
+               "companies": companies[["Ticker", "State", "mc", "px", "py"]].to_dict("records")}
+    script = HARNESS + mapvis_placement() + (
+        "process.stdout.write(JSON.stringify(resolveCollisions(input.companies)"
+        ".map(d => [d.Ticker, d.finalX, d.finalY])));\n")
+    result = subprocess.run(["node", "-e", script], input=json.dumps(payload), capture_output=True, text=True,
+                            timeout=60, check=True)
+    expected = {ticker: (x, y) for ticker, x, y in json.loads(result.stdout)}
+
+    assert len(expected) == len(companies)
+    for ticker, x, y in zip(companies["Ticker"], xs, ys):
+        assert (x, y) == pytest.approx(expected[ticker], abs=0.006), ticker
+        assert shape.contains(*expected[ticker])  # before rounding, which can cross an edge
@@ -0,0 +1,18 @@
+import json
+
+import pandas as pd
+
+from partition_exports import write_partitions
+
+
+def test_colliding_keys_get_their_own_shards(tmp_path):
+    df = pd.DataFrame({"Role Name": ["A/B", "A B", "a-b", "Data Scientist"], "Salary": [1, 2, 3, 4]})
+    index = write_partitions(df, "Role Name", tmp_path / "by-role")
+
+    files = [entry["file"] for entry in index.values()]
+    assert len({name.casefold() for name in files}) == 4
+    assert index["Data Scientist"]["file"] == "Data-Scientist.csv"
+    for key, entry in index.items():
+        shard = pd.read_csv(tmp_path / "by-role" / entry["file"])
+        assert shard["Role Name"].tolist() == [key]
+    assert json.loads((tmp_path / "by-role" / "index.json").read_text())["partitions"] == index
@@ -0,0 +1,27 @@
+"""--profile on a stage whose work runs in threads."""
+
+import json
+import pstats
+import subprocess
+import sys
+
+from conftest import SCRIPTS_DIR
+
+
+def test_profiled_pipeline_finishes(tmp_path):
+    subprocess.run([sys.executable, str(SCRIPTS_DIR / "benchmarks" / "synthetic_data.py"), str(tmp_path / "syn"),
+                    "--companies", "4", "--weeks", "2"], check=True, capture_output=True, timeout=120)
+    levels = tmp_path / "syn" / "levels"
+    result = subprocess.run([sys.executable, str(SCRIPTS_DIR / "stream_pipeline.py"), "--no-scrape",
+                             "--levels-csv", str(levels / "nasdaq_100_levels.csv"), "--data-dir", str(levels / "data"),
+                             "--output-dir", str(tmp_path / "out"), "--cache", str(tmp_path / "cache.json"),
+                             "--profile", str(tmp_path / "profile")],
+                            capture_output=True, text=True, timeout=120)
+
+    assert result.returncode == 0, result.stderr
+    assert "4/4 companies" in result.stdout
+    # The stage workers' calls are in the profile, whichever way the Python version collects them
+    stats = pstats.Stats(str(tmp_path / "profile" / "pipeline.pstats"))
+    assert any(name == "parse" and filename.endswith("stream_pipeline.py") for filename, _, name in stats.stats)
+    summary = json.loads((tmp_path / "profile" / "summary.json").read_text())
+    assert [stage["stage"] for stage in summary["stages"]] == ["pipeline"]
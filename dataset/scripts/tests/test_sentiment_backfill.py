@@ -0,0 +1,97 @@
+"""nasdag100_sentiment.py end to end against marketaux_stub.py."""
+
+import csv
+import sys
+import time
+from datetime import datetime
+
+import pytest
+
+import nasdag100_sentiment as sentiment
+
+# Four busy and eight quiet tickers in the stub: about 30 calls for the six weeks
+TICKERS = ["AAPL", "MSFT", "NVDA", "AMZN", "PEP", "ADBE", "INTC", "CSCO", "COST", "QCOM", "AMGN", "SBUX"]
+END_DATE = datetime(2024, 2, 11)  # six weeks from START_DATE
+WEEKS = 6
+QUOTA = 12
+
+
+@pytest.fixture
+def backfill(tmp_path, monkeypatch):
+    """Run the backfill's main() in tmp_path with a few tickers and weeks."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sentiment, "TICKERS", TICKERS)
+    monkeypatch.setattr(sentiment, "END_DATE", END_DATE)
+
+    def run(url, *args):
+        monkeypatch.setattr(sys, "argv", ["nasdag100_sentiment.py", "--base-url", url, *args])
+        sentiment.main()
+
+    return run
+
+
+def read_rows(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_stops_at_usage_limit(marketaux, backfill, capsys):
+    url, stub = marketaux
+    stub.quota = QUOTA
+    backfill(url, "--rate", "1000", "--burst", "1000", "--concurrency", "2")
+
+    assert "API limit reached" in capsys.readouterr().out
+    assert stub.served == QUOTA
+    # Only whole weeks are written, and progress points at the last of them
+    rows = read_rows(sentiment.CSV_FILE)
+    weeks = sorted({row["start_date"] for row in rows})
+    assert 0 < len(weeks) < WEEKS
+    assert len(rows) == len(weeks) * len(TICKERS)
+    assert sentiment.load_progress(sentiment.PROGRESS_FILE).strftime("%Y-%m-%d") == weeks[-1]
+
+
+def test_resume_writes_each_week_once(marketaux, backfill):
+    url, stub = marketaux
+    stub.quota = QUOTA
+    backfill(url, "--rate", "1000", "--burst", "1000")
+    stub.quota = None
+    backfill(url, "--rate", "1000", "--burst", "1000")
+
+    rows = read_rows(sentiment.CSV_FILE)
+    keys = [(row["ticker"], row["start_date"]) for row in rows]
+    assert len(keys) == len(set(keys)) == WEEKS * len(TICKERS)
+    # Calls spent before the stop are logged with their week, not lost on resume
+    calls = read_rows(sentiment.CALL_LOG_FILE)
+    assert len(calls) == WEEKS * len(TICKERS)
+    assert sum(float(row["calls"]) for row in calls) == pytest.approx(stub.served, abs=0.01)
+
+
+def test_paces_requests_to_the_rate(marketaux, backfill):
+    url, stub = marketaux
+    rate = 50
+    started = time.perf_counter()
+    backfill(url, "--rate", str(rate), "--burst", "1")
+    elapsed = time.perf_counter() - started
+
+    assert stub.requests > 20
+    assert elapsed >= (stub.requests - 1) / rate
+
+
+def test_retries_rate_limited_requests(marketaux, backfill):
+    url, stub = marketaux
+    stub.error_rate = 0.2
+    backfill(url, "--rate", "1000", "--burst", "1000")
+
+    assert stub.requests > stub.served  # some calls were answered 429 and retried
+    rows = read_rows(sentiment.CSV_FILE)
+    assert len(rows) == WEEKS * len(TICKERS)
+
+
+def test_trim_keeps_rows_without_progress(tmp_path):
+    path = tmp_path / "weekly.csv"
+    path.write_text("ticker,start_date,end_date,sentiment_score\nAAPL,2024-01-01,2024-01-07,0.5\n")
+    sentiment.trim_unrecorded_weeks(str(path), None)
+    assert len(read_rows(path)) == 1
+
+    sentiment.trim_unrecorded_weeks(str(path), datetime(2023, 12, 25))
+    assert read_rows(path) == []
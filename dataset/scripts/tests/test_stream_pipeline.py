@@ -0,0 +1,77 @@
+"""stream_pipeline.py on a small synthetic scrape tree when companies fail."""
+
+import subprocess
+import sys
+
+import pytest
+
+import stream_pipeline
+from conftest import SCRIPTS_DIR
+
+COMPANIES = 3
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """Run stream_pipeline's main() over a synthetic tree; returns (run, levels dir, output dir)."""
+    subprocess.run([sys.executable, str(SCRIPTS_DIR / "benchmarks" / "synthetic_data.py"), str(tmp_path / "syn"),
+                    "--companies", str(COMPANIES), "--weeks", "2"], check=True, capture_output=True, timeout=120)
+    levels = tmp_path / "syn" / "levels"
+    out = tmp_path / "out"
+
+    def run(*args):
+        monkeypatch.setattr(sys, "argv", [
+            "stream_pipeline.py", "--levels-csv", str(levels / "nasdaq_100_levels.csv"),
+            "--data-dir", str(levels / "data"), "--output-dir", str(out), "--cache", str(tmp_path / "cache.json"),
+            *args])
+        stream_pipeline.main()
+
+    return run, levels, out
+
+
+def output_bytes(levels, out):
+    paths = [levels / "salaries.csv", levels / "benefits.csv"] + sorted(out.rglob("*"))
+    return {path: path.read_bytes() for path in paths if path.is_file()}
+
+
+def test_failed_company_leaves_outputs_unchanged(pipeline, monkeypatch):
+    run, levels, out = pipeline
+    run("--no-scrape")
+    before = output_bytes(levels, out)
+    broken = sorted(p.name for p in (levels / "data").iterdir())[0]
+
+    make_stages = stream_pipeline.make_stages
+
+    def failing_stages(*args):
+        stages = dict(make_stages(*args))
+        parse = stages["parse"]
+
+        def parse_or_fail(item):
+            if item["company"] == broken:
+                raise ValueError("unreadable role table")
+            return parse(item)
+
+        stages["parse"] = parse_or_fail
+        return list(stages.items())
+
+    monkeypatch.setattr(stream_pipeline, "make_stages", failing_stages)
+    with pytest.raises(SystemExit) as exit_info:
+        run("--no-scrape")
+
+    assert broken in str(exit_info.value.code)
+    assert output_bytes(levels, out) == before
+
+
+def test_failed_scrape_uses_existing_data(pipeline, monkeypatch, tmp_path, capsys):
+    run, levels, out = pipeline
+    calls = tmp_path / "calls.txt"
+    scraper = tmp_path / "main.py"
+    scraper.write_text(f"import sys\nopen({str(calls)!r}, 'a').write(' '.join(sys.argv[1:]) + '\\n')\n"
+                       "sys.exit('browser crashed')\n")
+    monkeypatch.setattr(stream_pipeline, "SCRAPER", scraper)
+    run("--rescrape")
+
+    assert f"{COMPANIES}/{COMPANIES} companies" in capsys.readouterr().out
+    lines = calls.read_text().splitlines()
+    assert len(lines) == COMPANIES
+    assert all(f"--data-dir {levels / 'data'}" in line for line in lines)
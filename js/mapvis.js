@@ -198,15 +198,49 @@ class MapVis {
       "West Virginia": "WV", "Wisconsin": "WI", "Wyoming": "WY"
     };
 
+    // State fills and interior borders: the pre-simplified bundle from
+    // build_map_geometry.py named by APP_CONFIG.stateGeometry, or us-atlas
+    // from unpkg if it is unset or fails to load
+    function loadStateGeometry() {
+      const fromAtlas = () => d3.json("https://unpkg.com/us-atlas@3/states-10m.json").then(usTopo => ({
+        states: topojson.feature(usTopo, usTopo.objects.states).features,
+        borders: topojson.mesh(usTopo, usTopo.objects.states, (a, b) => a !== b)
+      }));
+      if (!cfg.stateGeometry) return fromAtlas();
+      return d3.json(cfg.stateGeometry)
+        .then(bundle => {
+          Object.assign(stateNameToAbbr, bundle.abbr);
+          return { states: bundle.states.features, borders: bundle.borders };
+        })
+        .catch(fromAtlas);
+    }
+
+    // Data file URLs: APP_CONFIG's plain files, or the content-hashed copies
+    // listed in the build_data_bundle.py manifest when APP_CONFIG.dataManifest
+    // points at one (falling back to the plain files if it fails to load)
+    function loadDataUrls() {
+      const urls = Object.fromEntries(Object.entries(cfg.files).map(([name, file]) => [name, `${cfg.dataDir}/${file}`]));
+      if (!cfg.dataManifest) return Promise.resolve(urls);
+      const base = cfg.dataManifest.slice(0, cfg.dataManifest.lastIndexOf("/") + 1);
+      return d3.json(cfg.dataManifest)
+        .then(manifest => {
+          for (const name of Object.keys(urls)) {
+            if (manifest.files[name]) urls[name] = base + manifest.files[name].path;
+          }
+          return urls;
+        })
+        .catch(() => urls);
+    }
+
     // Load
-    Promise.all([
-      d3.csv(`${cfg.dataDir}/${cfg.files.info}`),
-      d3.csv(`${cfg.dataDir}/${cfg.files.salary}`),
-      d3.csv(`${cfg.dataDir}/${cfg.files.financials}`),
-      d3.csv(`${cfg.dataDir}/${cfg.files.prices}`),
-      d3.json("https://unpkg.com/us-atlas@3/states-10m.json"),
+    loadDataUrls().then(urls => Promise.all([
+      d3.csv(urls.info),
+      d3.csv(urls.salary),
+      d3.csv(urls.financials),
+      d3.csv(urls.prices),
+      loadStateGeometry(),
       d3.json("dataset/building-icons/industry-mapping.json")
-    ]).then(([info, salary, fin, price, usTopo, indMapping]) => {
+    ])).then(([info, salary, fin, price, usGeo, indMapping]) => {
       companies = sanitizeInfo(info);
       salaries = salary;
       financials = fin;
@@ -243,7 +277,7 @@ class MapVis {
       // Build legend overlay panel (collapsed by default from HTML)
       renderLegend();
 
-      const states = topojson.feature(usTopo, usTopo.objects.states).features;
+      const states = usGeo.states;
 
       // Store state geometries for boundary checking
       states.forEach(s => {
@@ -273,7 +307,7 @@ class MapVis {
         .attr("fill", "none")
         .attr("stroke", "#2a3357")
         .attr("stroke-linejoin", "round")
-        .attr("d", path(topojson.mesh(usTopo, usTopo.objects.states, (a, b) => a !== b)));
+        .attr("d", path(usGeo.borders));
 
       // No UI controls needed - filters removed
       render();